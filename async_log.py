@@ -0,0 +1,72 @@
+import queue
+import threading
+
+
+def _write_all(opener, writes, errors):
+    ''' Body of the writer thread. It holds no reference to its QueuedFile, so a
+    QueuedFile nobody closes can still be collected, which stops the thread.
+
+    errors is never cleared: once anything fails, every later write is skipped.
+    '''
+    f = None
+    try:
+        f = opener()
+    except Exception as error:
+        errors.append(error)
+    while True:
+        data = writes.get()
+        if data is None:
+            break
+        if errors:
+            continue
+        try:
+            f.write(data)
+            f.flush()
+        except Exception as error:
+            errors.append(error)
+    if f is not None:
+        f.close()
+
+
+class QueuedFile(object):
+    ''' Write-only file whose writes are done by a background writer thread.
+
+    The writer thread opens the file with opener. write() puts the data on a bounded
+    queue and returns, and the writer thread does the writing and any compression, so
+    a slow disk stalls it instead of the caller. Once queue_size writes are waiting,
+    the next write waits for room, so memory stays bounded however slow the disk is.
+    close() drains the queue and closes the file. Once the writer thread has failed,
+    every later write, flush and close raises its error again, and nothing more is
+    written. A QueuedFile that is dropped without being closed stops its thread.
+    '''
+
+    def __init__(self, opener, queue_size=64):
+        self._queue = queue.Queue(queue_size)
+        self._errors = [] # errors of the writer thread, in the order they happened
+        self._thread = threading.Thread(target=_write_all, args=(opener, self._queue, self._errors),
+                                        name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _raise(self):
+        if self._errors:
+            raise self._errors[0]
+
+    def write(self, data):
+        self._raise()
+        self._queue.put(data)
+
+    def flush(self):
+        ''' Writes are already on their way; only errors are reported here. '''
+        self._raise()
+
+    def close(self):
+        ''' Waits for every queued write, then closes the file. '''
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise()
+
+    def __del__(self):
+        #Lets the thread write what is queued and exit; nobody is left to wait for it
+        if self._thread.is_alive():
+            self._queue.put(None)
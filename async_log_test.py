@@ -0,0 +1,138 @@
+import gc, gzip, os, threading, time
+from logger import Logger
+from async_log import QueuedFile
+from person import Person
+from virus import Virus
+from simulation import Simulation
+import pytest
+
+#Test that the writer thread writes exactly what the logger would
+def test_queued_logger_matches_logger():
+    person = Person(1, False)
+    random_person = Person(2, True)
+    for log in (Logger('test_sync.txt'), Logger('test_queued.txt', 100, queue_size=2)):
+        with log:
+            log.write_metadata(1000, 0.5, "Queued", 0.3, 0.25)
+            for step in range(50):
+                log.log_interaction(person, random_person, False, True, did_infect=True)
+                log.log_infection_survival(person, step % 2 == 0)
+                log.log_time_step(step, 1, 2, 3, 4)
+
+    with open('test_sync.txt') as f, open('test_queued.txt') as g:
+        assert f.read() == g.read()
+
+    os.remove('test_sync.txt')
+    os.remove('test_queued.txt')
+
+class SlowFile(object):
+    ''' File that waits for the test before every write. '''
+
+    def __init__(self):
+        self.go = threading.Event()
+        self.data = []
+
+    def write(self, data):
+        self.go.wait()
+        self.data.append(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+#Test that a full queue holds the writer back instead of growing
+def test_backpressure():
+    slow = SlowFile()
+    queued = QueuedFile(lambda: slow, queue_size=2)
+    done = threading.Event()
+
+    def produce():
+        for step in range(10):
+            queued.write(f"{step}\n")
+        done.set()
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    assert not done.wait(.2)
+    assert queued._queue.qsize() <= 2
+
+    slow.go.set()
+    producer.join()
+    queued.close()
+    assert slow.data == [f"{step}\n" for step in range(10)]
+
+def test_writer_error_is_raised():
+    def opener():
+        raise OSError("disk full")
+
+    queued = QueuedFile(opener)
+    with pytest.raises(OSError):
+        try:
+            queued.write("lost\n")
+        finally:
+            queued.close()
+
+#Test that once a write fails nothing more is written, even after the error is raised
+def test_writer_error_is_sticky():
+    class Failing(object):
+        def __init__(self):
+            self.data = []
+        def write(self, data):
+            if data == "bad\n":
+                raise OSError("disk full")
+            self.data.append(data)
+        def flush(self):
+            pass
+        def close(self):
+            pass
+
+    target = Failing()
+    queued = QueuedFile(lambda: target)
+    queued.write("good\n")
+    queued.write("bad\n")
+    with pytest.raises(OSError):
+        for _ in range(1000):
+            queued.write("after\n")
+            time.sleep(.001)
+    #the file stays failed: every later write and close raises too
+    with pytest.raises(OSError, match="disk full"):
+        queued.write("after\n")
+    with pytest.raises(OSError, match="disk full"):
+        queued.close()
+    with pytest.raises(OSError, match="disk full"):
+        queued.close()
+    assert target.data == ["good\n"]
+
+#Test that a simulation dropped without running stops its log writer thread
+def test_unrun_simulation_stops_writer():
+    def writers():
+        return [thread for thread in threading.enumerate() if thread.name == "log-writer"]
+    before = writers()
+    sim = Simulation(100, .5, Virus("Queued", .3, .3), file_name=os.devnull, verbose=False, log_queue_size=4)
+    thread, = [thread for thread in writers() if thread not in before]
+    del sim
+    gc.collect()
+    thread.join(5)
+    assert not thread.is_alive()
+
+#Test that queued and compressed logging leave the run and its log unchanged
+@pytest.mark.parametrize("log_format", Simulation.LOG_FORMATS)
+def test_simulation_queued_log(log_format):
+    v = Virus("Queued", .3, .3)
+    plain = Simulation(1000, .5, v, initial_infected=5, log_format=log_format, log_buffer_size=1 << 16,
+                       file_name="test_plain.log", verbose=False, rng=6)
+    plain.run()
+    queued = Simulation(1000, .5, v, initial_infected=5, log_format=log_format, log_buffer_size=1 << 16,
+                        file_name="test_queued.log", verbose=False, rng=6, log_queue_size=4, log_compress=True)
+    queued.run()
+
+    assert queued.total_infected == plain.total_infected
+    with open("test_plain.log", 'rb') as f, gzip.open("test_queued.log", 'rb') as g:
+        assert f.read() == g.read()
+
+    with pytest.raises(ValueError):
+        Simulation(1000, .5, v, log_compress=True, checkpoint_every=1, file_name=os.devnull)
+
+    os.remove("test_plain.log")
+    os.remove("test_queued.log")
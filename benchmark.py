@@ -0,0 +1,243 @@
+import argparse, json, os, platform, subprocess, sys, tempfile, time, tracemalloc
+from logger import Logger, SUMMARY
+from person import Person
+from population import Population
+from simulation import Simulation
+from virus import Virus
+
+#Calls made per repeat by the benchmarks of single calls
+CALLS = 100000
+
+
+def measure(setup, run, repeat=3):
+    ''' Times run(setup()) repeat times and traces the memory of one more call.
+
+    setup is not timed, so state a call changes can be rebuilt between repeats.
+
+    Returns:
+        tuple: Best wall time in seconds and peak traced memory in bytes.
+    '''
+    best = float("inf")
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        best = min(best, time.perf_counter() - start)
+
+    #Tracing slows the call down, so the peak is measured on a separate run
+    state = setup()
+    tracemalloc.start()
+    run(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def _result(name, config, seconds, peak, ops, unit, **extra):
+    result = dict(name=name, **config, seconds=seconds, ops=ops, unit=unit,
+                  throughput=ops / seconds if seconds else float("inf"), peak_bytes=peak)
+    result.update(extra)
+    return result
+
+
+def bench_simulation(pop_size, vacc_percentage, infected_fraction, interaction_mode="pairwise", repeat=3, seed=42,
+                     calls=CALLS):
+    ''' Times the Simulation hot paths for one population configuration.
+
+    Returns:
+        list: One result dict per benchmark.
+    '''
+    initial_infected = max(1, int(pop_size * infected_fraction))
+    virus = Virus("Benchmark", 0.25, 0.3)
+    config = dict(pop_size=pop_size, vacc_percentage=vacc_percentage,
+                  initial_infected=initial_infected, interaction_mode=interaction_mode)
+
+    def new_sim():
+        return Simulation(pop_size, vacc_percentage, virus, initial_infected, interaction_mode=interaction_mode,
+                          log_level=SUMMARY, file_name=os.devnull, verbose=False, rng=seed)
+
+    results = []
+    sim = new_sim()
+
+    seconds, peak = measure(lambda: sim, lambda sim: sim._create_population(initial_infected), repeat)
+    results.append(_result("create_population", config, seconds, peak, pop_size, "people/sec"))
+
+    seconds, peak = measure(new_sim, lambda sim: sim.time_step(), repeat)
+    interactions = 100 * len(new_sim().population.infected_ids())
+    results.append(_result("time_step", config, seconds, peak, interactions, "interactions/sec",
+                           people_steps_per_sec=pop_size / seconds))
+
+    #The pair comes from the population of the simulation being timed
+    def new_pair():
+        sim = new_sim()
+        population = sim.population
+        return sim, population[population.infected_ids()[0]], population[population.living[-1]]
+
+    def interact(state):
+        sim, person, partner = state
+        for _ in range(calls):
+            sim.interaction(person, partner)
+    seconds, peak = measure(new_pair, interact, repeat)
+    results.append(_result("interaction", config, seconds, peak, calls, "interactions/sec"))
+
+    seconds, peak = measure(lambda: sim, lambda sim: [sim._simulation_should_continue() for _ in range(calls)], repeat)
+    results.append(_result("simulation_should_continue", config, seconds, peak, calls, "calls/sec"))
+    return results
+
+
+def bench_logger(buffer_size=0, repeat=3, calls=CALLS):
+    ''' Times every Logger method writing to a temporary file.
+
+    Returns:
+        list: One result dict per method.
+    '''
+    person = Person(1, False)
+    random_person = Person(2, True)
+    methods = {
+        "log_interaction": lambda log: log.log_interaction(person, random_person, False, True, True),
+        "log_infection_survival": lambda log: log.log_infection_survival(person, False),
+        "log_time_step": lambda log: log.log_time_step(1, 10, 2, 100, 20),
+        "write_metadata": lambda log: log.write_metadata(100000, 0.9, "Benchmark", 0.3, 0.25),
+    }
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, "benchmark_log.txt")
+
+        def new_logger():
+            log = Logger(file_name, buffer_size)
+            log.write_metadata(100000, 0.9, "Benchmark", 0.3, 0.25)
+            return log
+
+        def run(call):
+            def calls_then_close(log):
+                for _ in range(calls):
+                    call(log)
+                log.close()
+            return calls_then_close
+
+        for name, call in methods.items():
+            seconds, peak = measure(new_logger, run(call), repeat)
+            results.append(_result(f"Logger.{name}", dict(buffer_size=buffer_size), seconds, peak, calls, "calls/sec"))
+    return results
+
+
+class DictPerson(object):
+    ''' Person as it was stored before __slots__, with an instance __dict__. '''
+
+    def __init__(self, _id, is_vaccinated, infection=None):
+        self._id = _id
+        self.is_alive = True
+        self.is_vaccinated = is_vaccinated
+        self.infection = infection
+
+
+def memory_report(count=100000):
+    ''' Measures the bytes each person costs in every way the simulation can store
+    people: a list of Person objects with a __dict__ (the original layout), a list of
+    Person objects with __slots__, and the array-backed Population.
+
+    Returns:
+        dict: Bytes per person for each layout.
+    '''
+    layouts = {
+        "Person with __dict__": lambda: [DictPerson(_id, False) for _id in range(count)],
+        "Person with __slots__": lambda: [Person(_id, False) for _id in range(count)],
+        "Population arrays": lambda: Population(count),
+    }
+    report = {}
+    for name, build in layouts.items():
+        tracemalloc.start()
+        people = build()
+        report[name] = tracemalloc.get_traced_memory()[0] / count
+        tracemalloc.stop()
+        del people
+    return report
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(sizes, vacc_percentages, infected_fractions, interaction_modes, buffer_sizes, repeat=3):
+    ''' Runs every benchmark over the grid of configurations.
+
+    Returns:
+        dict: Run metadata under "meta" and the result dicts under "results".
+    '''
+    results = []
+    for pop_size in sizes:
+        for vacc_percentage in vacc_percentages:
+            for infected_fraction in infected_fractions:
+                for interaction_mode in interaction_modes:
+                    results += bench_simulation(pop_size, vacc_percentage, infected_fraction, interaction_mode, repeat)
+    for buffer_size in buffer_sizes:
+        results += bench_logger(buffer_size, repeat)
+
+    meta = dict(commit=_commit(), python=platform.python_version(), platform=platform.platform(),
+                time=time.strftime("%Y-%m-%dT%H:%M:%S%z"), repeat=repeat, calls=CALLS)
+    return dict(meta=meta, results=results)
+
+
+def _key(result):
+    return tuple(sorted((name, value) for name, value in result.items()
+                        if name not in ("seconds", "ops", "throughput", "peak_bytes", "people_steps_per_sec")))
+
+
+def compare(baseline, current, threshold=1.2):
+    ''' Matches the results of two suite runs and finds the ones that got slower.
+
+    Returns:
+        list: (name, configuration, slowdown) for every result at least threshold
+        times slower than the baseline.
+    '''
+    before = {_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = before.get(_key(result))
+        if old is not None and old["seconds"] and result["seconds"] / old["seconds"] >= threshold:
+            config = {name: value for name, value in _key(result) if name not in ("name", "unit")}
+            regressions.append((result["name"], config, result["seconds"] / old["seconds"]))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the simulation hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="population sizes, 1000 to 100000 by default")
+    parser.add_argument("--vacc-percentage", type=float, nargs="+", default=[0.1, 0.9])
+    parser.add_argument("--infected", type=float, nargs="+", default=[0.001, 0.01],
+                        help="fractions of the population initially infected")
+    parser.add_argument("--modes", nargs="+", default=list(Simulation.INTERACTION_MODES))
+    parser.add_argument("--buffer-sizes", type=int, nargs="+", default=[0, 1 << 20])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file to check for regressions against")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    parser.add_argument("--memory-report", type=int, metavar="PEOPLE",
+                        help="only report the bytes per person of each storage layout")
+    args = parser.parse_args()
+
+    if args.memory_report:
+        for name, per_person in memory_report(args.memory_report).items():
+            print(f"{name:<24} {per_person:>8.1f} bytes/person")
+        sys.exit(0)
+
+    suite = run_suite(args.sizes, args.vacc_percentage, args.infected, args.modes, args.buffer_sizes, args.repeat)
+    with open(args.output, 'w') as f:
+        json.dump(suite, f, indent=2)
+
+    for result in suite["results"]:
+        print(f"{result['name']:<30} {result.get('pop_size', ''):>10} {result['throughput']:>16,.0f} {result['unit']:<18} "
+              f"{result['peak_bytes'] / 2**20:>10.1f} MiB")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), suite, args.threshold)
+        for name, config, slowdown in regressions:
+            print(f"REGRESSION {name} {config} {slowdown:.2f}x slower")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,33 @@
+from benchmark import bench_simulation, bench_logger, compare, memory_report
+
+#Smoke test the benchmarks on a tiny population
+def test_bench_simulation():
+    results = bench_simulation(1000, .5, .01, "batched", repeat=1, calls=100)
+    assert [result["name"] for result in results] == ["create_population", "time_step", "interaction",
+                                                      "simulation_should_continue"]
+    for result in results:
+        assert result["pop_size"] == 1000
+        assert result["initial_infected"] == 10
+        assert result["seconds"] > 0
+        assert result["throughput"] > 0
+        assert result["peak_bytes"] >= 0
+    assert results[1]["ops"] == 1000
+
+def test_bench_logger():
+    results = bench_logger(buffer_size=1 << 16, repeat=1, calls=100)
+    assert [result["name"] for result in results] == ["Logger.log_interaction", "Logger.log_infection_survival",
+                                                      "Logger.log_time_step", "Logger.write_metadata"]
+    assert all(result["buffer_size"] == 1 << 16 for result in results)
+
+def test_compare():
+    baseline = {"results": [dict(name="time_step", pop_size=1000, seconds=1.0),
+                            dict(name="interaction", pop_size=1000, seconds=1.0)]}
+    current = {"results": [dict(name="time_step", pop_size=1000, seconds=1.5),
+                           dict(name="interaction", pop_size=1000, seconds=1.1),
+                           dict(name="time_step", pop_size=10000, seconds=9.0)]}
+    assert compare(baseline, current, threshold=1.2) == [("time_step", {"pop_size": 1000}, 1.5)]
+
+def test_memory_report():
+    report = memory_report(10000)
+    assert report["Population arrays"] < report["Person with __slots__"] < report["Person with __dict__"]
+    assert report["Population arrays"] < 16
@@ -0,0 +1,185 @@
+import gzip
+import mmap
+import struct
+from collections import namedtuple
+from logger import Logger, SUMMARY, EVENTS, metadata_line
+from person import Person
+
+# Files start with MAGIC, a byte holding the log level, then the same metadata
+# line the text Logger writes, then one fixed-width RECORD per event. Logs that
+# start with OLD_MAGIC have no level byte and are EVENTS logs.
+MAGIC = b"HERDLOG2\n"
+OLD_MAGIC = b"HERDLOG1\n"
+
+# event type, outcome flags, time step, source id, target id
+RECORD = struct.Struct('<BBIII')
+MAX_PEOPLE = 1 << 32 # ids must fit the 4-byte source and target fields
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+#Event types
+INTERACTION = 0
+INFECTION_SURVIVAL = 1
+TIME_STEP = 2
+TOTALS = 3
+
+#Outcome flags
+SICK = 1 # interaction target was already sick
+VACCINATED = 2 # interaction target was vaccinated
+INFECTED = 4 # interaction rolled an infection
+IMMUNE = 8 # interaction target was protected by an earlier infection
+DIED = 1 # person died from the infection
+
+LogRecord = namedtuple('LogRecord', ['event', 'flags', 'time_step', 'source', 'target'])
+
+
+class BinaryLogger(Logger):
+    ''' Logger that writes every event as a fixed-width binary record instead of a line
+    of text. Records carry the time step they happened in, so the log can be read back
+    without parsing strings.
+
+    Time step records store the step's newly infected count as the source and the
+    newly dead count as the target. At SUMMARY level, a totals record before the
+    first time step a logger writes stores the total infected and dead before that
+    step the same way, so the running totals can be rebuilt from the step counts.
+    Ids are stored in 4 bytes, so populations of more than MAX_PEOPLE cannot be
+    logged in binary.
+    '''
+
+    _mode = 'b'
+    _empty = b''
+
+    def __init__(self, file_name, buffer_size=0, level=EVENTS, compress=False, queue_size=0):
+        super().__init__(file_name, buffer_size, level, compress, queue_size)
+        self.time_step_number = 0
+        self._totals_written = False # bool, whether this logger has written a totals record
+
+    def write_metadata(self, pop_size, vacc_percentage, virus_name, mortality_rate,
+                       basic_repro_num):
+        ''' Starts a new log file with the magic bytes and the text metadata line. '''
+        if int(pop_size) > MAX_PEOPLE:
+            raise ValueError(f"binary logs hold at most {MAX_PEOPLE} people, not {pop_size}")
+        self._buffer = []
+        self._buffered = 0
+        self.time_step_number = 0
+        self._totals_written = False
+        if self._file is not None:
+            self._file.close()
+        self._file = self._open('w')
+        self._write(MAGIC + bytes([self.level]) + metadata_line(pop_size, vacc_percentage, virus_name, mortality_rate,
+                                          basic_repro_num).encode())
+
+    def resume_at(self, offset, time_step_number):
+        super().resume_at(offset, time_step_number)
+        self.time_step_number = time_step_number
+
+    def log_interaction(self, person, random_person, random_person_sick=None,
+                        random_person_vacc=None, did_infect=None, random_person_immune=None):
+        if self.level < EVENTS:
+            return
+
+        flags = 0
+        if random_person_sick:
+            flags |= SICK
+        if random_person_vacc:
+            flags |= VACCINATED
+        if did_infect:
+            flags |= INFECTED
+        if random_person_immune:
+            flags |= IMMUNE
+        self._write(RECORD.pack(INTERACTION, flags, self.time_step_number, person._id, random_person._id))
+
+    def log_infection_survival(self, person, did_die_from_infection):
+        if self.level < EVENTS:
+            return
+
+        flags = DIED if did_die_from_infection else 0
+        self._write(RECORD.pack(INFECTION_SURVIVAL, flags, self.time_step_number, person._id, 0))
+
+    def log_time_step(self, time_step_number, newly_infected_count, newly_dead_count, total_infected_count, total_dead_count):
+        if self.level == SUMMARY and not self._totals_written:
+            self._write(RECORD.pack(TOTALS, 0, time_step_number, total_infected_count - newly_infected_count,
+                                    total_dead_count - newly_dead_count))
+            self._totals_written = True
+        self._write(RECORD.pack(TIME_STEP, 0, time_step_number, newly_infected_count, newly_dead_count))
+        self.time_step_number = time_step_number + 1
+
+
+class BinaryLogReader(object):
+    ''' Streams the records of a log written by BinaryLogger.
+
+    The file is memory-mapped and records are unpacked as they are iterated, so a log
+    of any size can be read without loading it into memory. Logs written with
+    compress on are decompressed as they are streamed instead.
+    '''
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        with open(file_name, 'rb') as f:
+            self.compressed = f.read(len(GZIP_MAGIC)) == GZIP_MAGIC # bool, gzip rather than plain
+        with self._open() as f:
+            magic = f.read(len(MAGIC))
+            if magic == MAGIC:
+                self.level = f.read(1)[0] # Int, SUMMARY or EVENTS
+            elif magic == OLD_MAGIC:
+                self.level = EVENTS
+            else:
+                raise ValueError(f"{file_name} is not a binary simulation log")
+            self.metadata = f.readline().decode()
+            self._offset = f.tell()
+
+    def _open(self):
+        return gzip.open(self.file_name, 'rb') if self.compressed else open(self.file_name, 'rb')
+
+    def __len__(self):
+        with self._open() as f:
+            if self.compressed:
+                size = sum(len(block) for block in iter(lambda: f.read(1 << 20), b""))
+            else:
+                size = f.seek(0, 2)
+            return (size - self._offset) // RECORD.size
+
+    def __iter__(self):
+        if self.compressed:
+            yield from self._iter_compressed()
+            return
+        with open(self.file_name, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                end = self._offset + len(self) * RECORD.size
+                with memoryview(data)[self._offset:end] as records:
+                    for record in RECORD.iter_unpack(records):
+                        yield LogRecord(*record)
+
+    def _iter_compressed(self, records_per_read=1 << 16):
+        with self._open() as f:
+            f.seek(self._offset)
+            while True:
+                block = f.read(RECORD.size * records_per_read)
+                whole = len(block) - len(block) % RECORD.size
+                for record in RECORD.iter_unpack(block[:whole]):
+                    yield LogRecord(*record)
+                if len(block) < RECORD.size * records_per_read:
+                    break
+
+    def to_text(self, text_file_name, buffer_size=1 << 20):
+        ''' Rewrites the log in the text format Logger writes at the log's level. '''
+        total_infected = total_dead = 0
+        with Logger(text_file_name, buffer_size, self.level) as log:
+            pop_size, vacc_percentage, virus_name, *rates = self.metadata.rstrip("\n").split("\t")
+            strains = len(rates) // 2
+            mortality_rate, basic_repro_num = (rates[0], rates[1]) if strains == 1 else (rates[:strains], rates[strains:])
+            log.write_metadata(pop_size, vacc_percentage, virus_name, mortality_rate, basic_repro_num)
+
+            for record in self:
+                if record.event == INTERACTION:
+                    log.log_interaction(Person(record.source, False), Person(record.target, False),
+                                        bool(record.flags & SICK), bool(record.flags & VACCINATED),
+                                        bool(record.flags & INFECTED), bool(record.flags & IMMUNE))
+                elif record.event == INFECTION_SURVIVAL:
+                    log.log_infection_survival(Person(record.source, False), bool(record.flags & DIED))
+                elif record.event == TIME_STEP:
+                    total_infected += record.source
+                    total_dead += record.target
+                    log.log_time_step(record.time_step, record.source, record.target, total_infected, total_dead)
+                elif record.event == TOTALS:
+                    total_infected, total_dead = record.source, record.target
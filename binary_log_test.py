@@ -0,0 +1,110 @@
+import os
+from person import Person
+from logger import Logger, SUMMARY, EVENTS
+from virus import Virus
+from simulation import Simulation
+from binary_log import BinaryLogger, BinaryLogReader, LogRecord, RECORD, INTERACTION, INFECTION_SURVIVAL, TIME_STEP
+import pytest
+
+def test_binary_records():
+    log = BinaryLogger('test_binary.bin')
+    person = Person(1, True)
+    random_person = Person(2, False)
+
+    log.write_metadata(100000, 0.90, "Ebola", 0.70, 0.25)
+    log.log_interaction(person, random_person, random_person_sick=False, random_person_vacc=True, did_infect=True)
+    log.log_time_step(0, 3, 1, 13, 1)
+    log.log_infection_survival(random_person, True)
+    log.close()
+
+    reader = BinaryLogReader('test_binary.bin')
+    assert reader.level == EVENTS
+    assert reader.metadata == "100000\t0.9\tEbola\t0.7\t0.25\n"
+    assert len(reader) == 3
+    assert list(reader) == [LogRecord(INTERACTION, 6, 0, 1, 2),
+                            LogRecord(TIME_STEP, 0, 0, 3, 1),
+                            LogRecord(INFECTION_SURVIVAL, 1, 1, 2, 0)]
+
+    os.remove('test_binary.bin')
+
+def test_not_a_binary_log():
+    log = Logger('test_text.txt')
+    log.write_metadata(100, 0.5, "Test", 0.25, 0.5)
+    log.close()
+
+    with pytest.raises(ValueError):
+        BinaryLogReader('test_text.txt')
+
+    os.remove('test_text.txt')
+
+#Converting a binary log back gives the same text the text logger writes
+def test_to_text_matches_text_log():
+    v = Virus("Convert", .3, .3)
+    text_sim = Simulation(1000, .5, v, initial_infected=5, rng=7)
+    text_sim.run()
+    binary_sim = Simulation(1000, .5, v, initial_infected=5, log_format="binary", rng=7)
+    binary_sim.run()
+    assert binary_sim.file_name == "Convert_simulation_pop_1000_vp_0.5_infected_5.bin"
+
+    reader = BinaryLogReader(binary_sim.file_name)
+    reader.to_text('test_converted.txt')
+
+    with open(text_sim.file_name, 'r') as f:
+        text_log = f.read()
+    with open('test_converted.txt', 'r') as f:
+        assert f.read() == text_log
+    assert os.path.getsize(binary_sim.file_name) < len(text_log)
+    assert len(reader) * RECORD.size + 100 > os.path.getsize(binary_sim.file_name)
+
+    os.remove(text_sim.file_name)
+    os.remove(binary_sim.file_name)
+    os.remove('test_converted.txt')
+
+#Test that a summary log converts to the summary text, totals and all
+def test_summary_to_text():
+    v = Virus("Convert", .3, .3)
+    text_sim = Simulation(1000, .5, v, initial_infected=5, log_level=SUMMARY, file_name="test_summary.txt",
+                          verbose=False, rng=7)
+    text_sim.run()
+    binary_sim = Simulation(1000, .5, v, initial_infected=5, log_level=SUMMARY, log_format="binary",
+                            file_name="test_summary.bin", verbose=False, rng=7)
+    binary_sim.run()
+
+    reader = BinaryLogReader("test_summary.bin")
+    assert reader.level == SUMMARY
+    reader.to_text("test_summary_converted.txt")
+    with open("test_summary.txt") as f, open("test_summary_converted.txt") as g:
+        text_log = f.read()
+        assert g.read() == text_log
+    assert text_log.splitlines()[-1].endswith(f"{text_sim.total_infected} total infected, "
+                                              f"{text_sim.total_dead} total dead")
+
+    for file_name in ("test_summary.txt", "test_summary.bin", "test_summary_converted.txt"):
+        os.remove(file_name)
+
+#Test that compressed logs are streamed through gzip rather than memory-mapped
+def test_compressed_log():
+    v = Virus("Convert", .3, .3)
+    plain = Simulation(1000, .5, v, initial_infected=5, log_format="binary", file_name="test_plain.bin",
+                       verbose=False, rng=7)
+    plain.run()
+    zipped = Simulation(1000, .5, v, initial_infected=5, log_format="binary", log_compress=True,
+                        file_name="test_zipped.bin.gz", verbose=False, rng=7)
+    zipped.run()
+
+    plain_reader = BinaryLogReader("test_plain.bin")
+    reader = BinaryLogReader("test_zipped.bin.gz")
+    assert reader.compressed and not plain_reader.compressed
+    assert reader.metadata == plain_reader.metadata
+    assert len(reader) == len(plain_reader)
+    assert list(reader._iter_compressed(records_per_read=7)) == list(plain_reader)
+
+    os.remove("test_plain.bin")
+    os.remove("test_zipped.bin.gz")
+
+#Test that populations whose ids do not fit a record are turned down
+def test_too_many_people():
+    with pytest.raises(ValueError):
+        BinaryLogger(os.devnull).write_metadata(1 << 33, 0.5, "Huge", 0.25, 0.5)
+    with pytest.raises(ValueError):
+        Simulation(1 << 33, .5, Virus("Huge", .3, .3), log_format="binary", file_name=os.devnull)
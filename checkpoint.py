@@ -0,0 +1,67 @@
+import json
+import os
+import random
+import struct
+from array import array
+from population import Population
+
+# Checkpoint files hold this header and a JSON description of the simulation, then
+# the population state exactly as Population.write_state lays it out, then the
+# living index. Every array sits at a fixed offset, so a checkpoint can be
+# memory-mapped as well as read.
+MAGIC = b"HERDCKP1"
+HEADER = struct.Struct('<8sQ')
+
+
+def write_checkpoint(file_name, state, population):
+    ''' Writes a checkpoint, replacing any earlier one only once it is complete.
+
+    Args:
+        file_name (str): Checkpoint file to write.
+        state (dict): JSON-serializable settings and counters of the simulation.
+        population (Population): The population to store.
+    '''
+    state = dict(state, living_typecode=population.living.typecode)
+    description = json.dumps(state).encode()
+
+    temporary = file_name + ".tmp"
+    with open(temporary, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(description)))
+        f.write(description)
+        population.write_state(f)
+        f.write(population.living)
+    os.replace(temporary, file_name)
+
+
+def read_checkpoint(file_name, virus=None):
+    ''' Reads a checkpoint written by write_checkpoint.
+
+    Returns:
+        tuple: The state dict and the Population, with its living index restored.
+    '''
+    with open(file_name, 'rb') as f:
+        magic, length = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{file_name} is not a simulation checkpoint")
+        state = json.loads(f.read(length))
+        population = Population.read_state(f, virus)
+
+        living = array(state["living_typecode"])
+        living.frombytes(f.read(population.num_alive * living.itemsize))
+    population.restore_living(living)
+    return state, population
+
+
+def rng_state(rng):
+    ''' Returns the state of a random.Random in a form json can store. Raises
+    ValueError for other generators, whose state cannot be saved.
+    '''
+    if not isinstance(rng, random.Random) or isinstance(rng, random.SystemRandom):
+        raise ValueError(f"only random.Random generators can be checkpointed, not {type(rng).__name__}")
+    version, internal, gauss_next = rng.getstate()
+    return [version, list(internal), gauss_next]
+
+
+def set_rng_state(rng, state):
+    version, internal, gauss_next = state
+    rng.setstate((version, tuple(internal), gauss_next))
@@ -0,0 +1,75 @@
+import json, os, random
+from virus import Virus
+from simulation import Simulation
+import pytest
+
+class Preempted(Exception):
+    pass
+
+def preempt_after(step):
+    def observer(profile):
+        if profile.time_step == step:
+            raise Preempted()
+    return observer
+
+#Test that a resumed run finishes exactly like an uninterrupted one
+@pytest.mark.parametrize("interaction_mode, log_format", [("pairwise", "text"), ("batched", "binary")])
+def test_resume_matches_uninterrupted_run(interaction_mode, log_format):
+    v = Virus("Checkpoint", .3, .3)
+    whole = Simulation(2000, .5, v, initial_infected=5, interaction_mode=interaction_mode, log_format=log_format,
+                       log_buffer_size=4096, file_name="test_whole.log", verbose=False, rng=9, placement="random")
+    whole.run()
+
+    interrupted = Simulation(2000, .5, v, initial_infected=5, interaction_mode=interaction_mode, log_format=log_format,
+                             log_buffer_size=4096, file_name="test_interrupted.log", verbose=False, rng=9,
+                             placement="random", checkpoint_every=1, checkpoint_file="test.ckpt")
+    interrupted.add_observer(preempt_after(2))
+    with pytest.raises(Preempted):
+        interrupted.run()
+
+    resumed = Simulation.resume("test.ckpt")
+    assert resumed.time_step_counter == 2
+    resumed.run()
+
+    assert (resumed.time_step_counter, resumed.total_infected, resumed.total_dead, resumed.vaccine_saved) == \
+        (whole.time_step_counter, whole.total_infected, whole.total_dead, whole.vaccine_saved)
+    assert resumed.population.is_alive == whole.population.is_alive
+    with open("test_whole.log", 'rb') as f:
+        whole_log = f.read()
+    with open("test_interrupted.log", 'rb') as f:
+        assert f.read() == whole_log
+
+    for name in ("test_whole.log", "test_interrupted.log", "test.ckpt"):
+        os.remove(name)
+
+def test_not_a_checkpoint():
+    with open("test_bad.ckpt", 'wb') as f:
+        f.write(b"\0" * 64)
+    with pytest.raises(ValueError):
+        Simulation.resume("test_bad.ckpt")
+    os.remove("test_bad.ckpt")
+
+#Test that a resumed run keeps the profile lines written before the checkpoint
+def test_resume_keeps_profile():
+    v = Virus("Checkpoint", .3, .3)
+    interrupted = Simulation(1000, .5, v, initial_infected=5, file_name="test_profiled.log", verbose=False, rng=9,
+                             profile=True, checkpoint_every=1, checkpoint_file="test.ckpt")
+    interrupted.add_observer(preempt_after(2))
+    with pytest.raises(Preempted):
+        interrupted.run()
+
+    resumed = Simulation.resume("test.ckpt")
+    resumed.run()
+    with open("test_profiled.log.profile.jsonl") as f:
+        steps = [json.loads(line)["time_step"] for line in f]
+    assert steps == list(range(resumed.time_step_counter))
+
+    for name in ("test_profiled.log", "test_profiled.log.profile.jsonl", "test.ckpt"):
+        os.remove(name)
+
+#Test that generators whose state cannot be saved are turned down before the run
+def test_unsaveable_rng():
+    v = Virus("Checkpoint", .3, .3)
+    for rng in (random.SystemRandom(), object()):
+        with pytest.raises(ValueError, match="checkpointed"):
+            Simulation(100, .5, v, rng=rng, checkpoint_every=1, file_name=os.devnull)
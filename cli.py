@@ -0,0 +1,334 @@
+import argparse, json, sys
+from importlib import import_module
+from time import perf_counter
+
+#Engine name -> (module, class); modules are imported only when a job picks them
+ENGINES = {
+    "simulation": ("simulation", "Simulation"),
+    "event": ("event_simulation", "EventSimulation"),
+    "progression": ("progression", "ProgressionSimulation"),
+    "multistrain": ("multistrain", "MultiStrainSimulation"),
+    "sharded": ("shard", "ShardedSimulation"),
+}
+
+#Keyword arguments each engine takes from a job's options
+SIMULATION_OPTIONS = {
+    "interaction_mode": str, "log_buffer_size": int, "log_format": str, "log_level": (int, str),
+    "debug": bool, "file_name": str, "profile": bool, "placement": str, "initial_state": str,
+    "checkpoint_every": int, "checkpoint_file": str, "network": str, "log_queue_size": int,
+    "log_compress": bool, "timeseries": str, "metrics_address": (str, list),
+}
+OPTIONS = {
+    "simulation": SIMULATION_OPTIONS,
+    "event": SIMULATION_OPTIONS,
+    "progression": SIMULATION_OPTIONS,
+    "multistrain": {name: kind for name, kind in SIMULATION_OPTIONS.items()
+                    if name not in ("interaction_mode", "initial_state")},
+    "sharded": {"shards": int, "file_name": str, "placement": str},
+}
+LOG_LEVELS = {"summary": 1, "events": 2}
+
+#Values of the options that take one of a few, as Simulation checks them
+CHOICES = {
+    "interaction_mode": ("pairwise", "batched"),
+    "log_format": ("text", "binary"),
+    "placement": ("ordered", "random"),
+    "log_level": tuple(LOG_LEVELS) + tuple(LOG_LEVELS.values()),
+}
+#Options that are counts and cannot be negative
+COUNTS = ("log_buffer_size", "log_queue_size", "checkpoint_every", "shards")
+#Options an engine takes from Simulation but turns down when they are set
+UNSUPPORTED = {
+    "event": ("network", "checkpoint_every", "profile", "timeseries", "metrics_address"),
+    "progression": ("checkpoint_every",),
+    "multistrain": ("checkpoint_every",),
+}
+
+FIELDS = ("engine", "pop_size", "vacc_percentage", "virus", "strains", "cross_immunity",
+          "initial_infected", "seed", "options")
+RESULTS = ("job", "engine", "time_steps", "total_infected", "total_dead", "total_interactions",
+           "vaccine_saved", "seconds", "file_name", "error")
+
+
+class JobError(ValueError):
+    ''' A job that failed validation; the message names the job and every problem. '''
+
+
+def read_jobs(file_name, defaults=None):
+    ''' Reads the jobs in file_name: one JSON object per line for a .jsonl file or "-"
+    (standard input), otherwise a JSON file holding one job object or a list of them.
+    Blank lines and lines starting with # are skipped.
+
+    Every job starts from a copy of defaults, with the job's options merged over the
+    default options, so a job list only needs to hold what changes between runs.
+    '''
+    if file_name == "-" or file_name.endswith(".jsonl"):
+        f = sys.stdin if file_name == "-" else open(file_name)
+        try:
+            jobs = [json.loads(line) for line in f if line.strip() and not line.lstrip().startswith("#")]
+        finally:
+            if f is not sys.stdin:
+                f.close()
+    else:
+        with open(file_name) as f:
+            jobs = json.load(f)
+        if isinstance(jobs, dict):
+            jobs = [jobs]
+    return [_merge(defaults or {}, job) for job in jobs]
+
+
+def _merge(defaults, job):
+    if not isinstance(job, dict):
+        return job
+    merged = dict(defaults)
+    merged.update(job)
+    if isinstance(defaults.get("options"), dict) and isinstance(job.get("options"), dict):
+        merged["options"] = dict(defaults["options"], **job["options"])
+    return merged
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_rate(errors, where, value):
+    if not _is_number(value) or not 0 <= value <= 1:
+        errors.append(f"{where} must be a number from 0 to 1, not {value!r}")
+
+
+def _check_virus(errors, where, virus, progression):
+    if not isinstance(virus, dict):
+        errors.append(f"{where} must be an object with name, repro_rate and mortality_rate")
+        return
+    unknown = set(virus) - {"name", "repro_rate", "mortality_rate", "progression"}
+    if unknown:
+        errors.append(f"{where} has unknown fields {sorted(unknown)}")
+    if not isinstance(virus.get("name"), str):
+        errors.append(f"{where}.name must be a string")
+    _check_rate(errors, f"{where}.repro_rate", virus.get("repro_rate"))
+    _check_rate(errors, f"{where}.mortality_rate", virus.get("mortality_rate"))
+    if "progression" not in virus:
+        return
+    if not progression:
+        errors.append(f"{where}.progression needs the progression engine")
+        return
+    stages = virus["progression"]
+    if not isinstance(stages, dict) or set(stages) - {"latent", "infectious", "recovery"}:
+        errors.append(f"{where}.progression must be an object with latent, infectious and recovery lengths")
+        return
+    for stage, length in stages.items():
+        lengths = length if isinstance(length, dict) else {str(length): 1}
+        if (not lengths or any(not key.isdigit() for key in lengths)
+                or any(not _is_number(weight) or weight < 0 for weight in lengths.values())):
+            errors.append(f"{where}.progression.{stage} must be a whole number of steps "
+                          f"or an object mapping them to weights")
+
+
+def validate(job):
+    ''' Returns the list of problems with job, empty if it can be run. Nothing is
+    imported to check a job, so a whole job list is checked before anything runs.
+    '''
+    if not isinstance(job, dict):
+        return ["a job must be a JSON object"]
+    errors = []
+    unknown = set(job) - set(FIELDS)
+    if unknown:
+        errors.append(f"unknown fields {sorted(unknown)}")
+
+    engine = job.get("engine", "simulation")
+    if engine not in ENGINES:
+        errors.append(f"engine must be one of {sorted(ENGINES)}, not {engine!r}")
+        return errors
+    pop_size = job.get("pop_size")
+    if not isinstance(pop_size, int) or isinstance(pop_size, bool) or pop_size < 1:
+        errors.append(f"pop_size must be a whole number above 0, not {pop_size!r}")
+    _check_rate(errors, "vacc_percentage", job.get("vacc_percentage"))
+    seed = job.get("seed")
+    if seed is not None and (not isinstance(seed, (int, str)) or isinstance(seed, bool)):
+        errors.append(f"seed must be a whole number or a string, not {seed!r}")
+
+    initial_infected = job.get("initial_infected", 1)
+    if engine == "multistrain":
+        strains = job.get("strains")
+        if "virus" in job or not isinstance(strains, list) or not strains:
+            errors.append("a multistrain job needs a list of strains instead of a virus")
+            strains = []
+        for n, virus in enumerate(strains):
+            _check_virus(errors, f"strains[{n}]", virus, progression=False)
+        initial_infected = initial_infected if "initial_infected" in job else [1] * len(strains)
+        if (not isinstance(initial_infected, list) or len(initial_infected) != len(strains)
+                or any(not isinstance(count, int) or isinstance(count, bool) or count < 0
+                       for count in initial_infected)):
+            errors.append(f"initial_infected must list a whole number for each of the {len(strains)} strains")
+        cross_immunity = job.get("cross_immunity")
+        if cross_immunity is not None and (
+                not isinstance(cross_immunity, list) or len(cross_immunity) != len(strains)
+                or any(not isinstance(row, list) or len(row) != len(strains) for row in cross_immunity)):
+            errors.append(f"cross_immunity must be a {len(strains)} by {len(strains)} list of lists")
+        elif cross_immunity is not None:
+            for i, row in enumerate(cross_immunity):
+                for j, value in enumerate(row):
+                    _check_rate(errors, f"cross_immunity[{i}][{j}]", value)
+    else:
+        for field in ("strains", "cross_immunity"):
+            if field in job:
+                errors.append(f"{field} needs the multistrain engine")
+        _check_virus(errors, "virus", job.get("virus"), progression=engine == "progression")
+        if not isinstance(initial_infected, int) or isinstance(initial_infected, bool) or initial_infected < 0:
+            errors.append(f"initial_infected must be a whole number, not {initial_infected!r}")
+
+    options = job.get("options", {})
+    if not isinstance(options, dict):
+        errors.append("options must be an object")
+        return errors
+    allowed = OPTIONS[engine]
+    for name, value in options.items():
+        if name not in allowed:
+            errors.append(f"option {name!r} is not taken by the {engine} engine")
+        elif not isinstance(value, allowed[name]) or isinstance(value, bool) != (allowed[name] is bool):
+            errors.append(f"option {name!r} has the wrong type: {value!r}")
+        elif name in CHOICES and value not in CHOICES[name]:
+            errors.append(f"option {name!r} must be one of {list(CHOICES[name])}, not {value!r}")
+        elif name in COUNTS and value < (1 if name == "shards" else 0):
+            errors.append(f"option {name!r} must be a whole number{' above 0' if name == 'shards' else ''}, "
+                          f"not {value!r}")
+        elif value and name in UNSUPPORTED.get(engine, ()):
+            errors.append(f"the {engine} engine does not support option {name!r}")
+    if options.get("checkpoint_every") and options.get("log_compress"):
+        errors.append("compressed logs cannot be checkpointed")
+
+    #There must be enough unvaccinated people to infect
+    if not errors and "initial_state" not in options:
+        unvaccinated = pop_size - int(pop_size * job["vacc_percentage"])
+        infected = sum(initial_infected) if engine == "multistrain" else initial_infected
+        if infected > unvaccinated:
+            errors.append(f"initial_infected must be at most the {unvaccinated} unvaccinated people, not {infected}")
+    return errors
+
+
+def validate_all(jobs):
+    ''' Raises JobError listing the problems of every invalid job. '''
+    problems = [f"job {n}: {error}" for n, job in enumerate(jobs) for error in validate(job)]
+    if problems:
+        raise JobError("\n".join(problems))
+
+
+def load_engine(name):
+    ''' Imports the module of engine name, if not yet imported, and returns its class. '''
+    module, cls = ENGINES[name]
+    return getattr(import_module(module), cls)
+
+
+def _virus(spec):
+    from virus import Progression, Virus
+
+    progression = spec.get("progression")
+    if progression is not None:
+        progression = Progression(**{stage: {int(key): weight for key, weight in length.items()}
+                                     if isinstance(length, dict) else length
+                                     for stage, length in progression.items()})
+    return Virus(spec["name"], spec["repro_rate"], spec["mortality_rate"], progression)
+
+
+def build(job):
+    ''' Builds the simulation a validated job describes, without running it. '''
+    engine = job.get("engine", "simulation")
+    options = dict(job.get("options", {}))
+    if isinstance(options.get("log_level"), str):
+        options["log_level"] = LOG_LEVELS[options["log_level"]]
+    if "network" in options:
+        from network import ContactNetwork
+
+        options["network"] = ContactNetwork.load(options["network"])
+    if "metrics_address" in options and isinstance(options["metrics_address"], list):
+        options["metrics_address"] = tuple(options["metrics_address"])
+
+    cls = load_engine(engine)
+    if engine == "sharded":
+        return cls(job["pop_size"], job["vacc_percentage"], _virus(job["virus"]), job.get("initial_infected", 1),
+                   verbose=False, seed=job.get("seed"), **options)
+    options.setdefault("log_buffer_size", 1 << 20)
+    if engine == "multistrain":
+        from virus import Strains
+
+        strains = Strains([_virus(spec) for spec in job["strains"]], job.get("cross_immunity"))
+        return cls(job["pop_size"], job["vacc_percentage"], strains, job.get("initial_infected"),
+                   verbose=False, rng=job.get("seed"), **options)
+    return cls(job["pop_size"], job["vacc_percentage"], _virus(job["virus"]), job.get("initial_infected", 1),
+               verbose=False, rng=job.get("seed"), **options)
+
+
+def run_job(number, job):
+    ''' Builds and runs one job and returns its row of results. A job that raises is
+    recorded with its error instead, so the jobs after it still run.
+    '''
+    row = dict.fromkeys(RESULTS, "")
+    row.update(job=number, engine=job.get("engine", "simulation"))
+    start = perf_counter()
+    try:
+        sim = build(job)
+        sim.run()
+    except Exception as error:
+        row.update(seconds=perf_counter() - start, error=repr(error))
+        return row
+    row.update(time_steps=sim.time_step_counter, total_infected=sim.total_infected, total_dead=sim.total_dead,
+               total_interactions=sim.total_interactions, vaccine_saved=sim.vaccine_saved,
+               seconds=perf_counter() - start, file_name=sim.file_name)
+    return row
+
+
+def run_jobs(jobs, out=None):
+    ''' Validates every job, then runs them one after another in this process, so
+    the interpreter and the engines are loaded once for the whole list. Each result
+    is written to out as a JSON line as soon as its job finishes.
+
+    Returns:
+        list: One result row per job, in job order.
+    '''
+    validate_all(jobs)
+    rows = []
+    for number, job in enumerate(jobs):
+        row = run_job(number, job)
+        rows.append(row)
+        if out is not None:
+            out.write(json.dumps(row) + "\n")
+            out.flush()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run herd immunity simulations from job files, one after another in one process.",
+        epilog=f"Engines: {', '.join(ENGINES)}. A job holds pop_size, vacc_percentage, virus "
+               "(name, repro_rate, mortality_rate), initial_infected, seed, engine and options.")
+    parser.add_argument("jobs", nargs="+", help="job files: .jsonl, .json, or - for JSON lines on standard input")
+    parser.add_argument("--defaults", help="JSON file of settings every job starts from")
+    parser.add_argument("--results", help="file to write the result JSON lines to, standard output by default")
+    parser.add_argument("--check", action="store_true", help="only validate the jobs")
+    args = parser.parse_args(argv)
+
+    try:
+        defaults = None
+        if args.defaults:
+            with open(args.defaults) as f:
+                defaults = json.load(f)
+        jobs = [job for file_name in args.jobs for job in read_jobs(file_name, defaults)]
+        validate_all(jobs)
+    except (OSError, ValueError) as error:
+        print(error, file=sys.stderr)
+        return 2
+    if args.check:
+        print(f"{len(jobs)} jobs are valid", file=sys.stderr)
+        return 0
+
+    out = open(args.results, 'w') if args.results else sys.stdout
+    try:
+        rows = run_jobs(jobs, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if any(row["error"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import io, json, os, subprocess, sys
+import cli
+from cli import validate, read_jobs, run_jobs, main, JobError
+from simulation import Simulation
+from virus import Virus
+import pytest
+
+VIRUS = {"name": "Test", "repro_rate": .3, "mortality_rate": .3}
+JOB = {"pop_size": 500, "vacc_percentage": .5, "virus": VIRUS, "initial_infected": 5, "seed": 1,
+       "options": {"log_level": "summary", "file_name": os.devnull}}
+
+def test_validate():
+    assert validate(JOB) == []
+    assert validate(dict(JOB, engine="progression", virus=dict(VIRUS, progression={"latent": {"1": 2, "3": 1}}))) == []
+    assert validate({"engine": "multistrain", "pop_size": 500, "vacc_percentage": .5,
+                     "strains": [VIRUS, VIRUS], "initial_infected": [1, 2]}) == []
+
+    assert validate(dict(JOB, pop_size=0)) == ["pop_size must be a whole number above 0, not 0"]
+    assert validate(dict(JOB, vacc_percentage=1.5))
+    assert validate(dict(JOB, virus=dict(VIRUS, repro_rate="high")))
+    assert validate(dict(JOB, engine="quantum")) == [
+        "engine must be one of ['event', 'multistrain', 'progression', 'sharded', 'simulation'], not 'quantum'"]
+    assert validate(dict(JOB, pop_sise=500)) == ["unknown fields ['pop_sise']"]
+    #progressions need their engine, strains need theirs
+    assert validate(dict(JOB, virus=dict(VIRUS, progression={"latent": 2})))
+    assert validate(dict(JOB, engine="progression", virus=dict(VIRUS, progression={"latent": -1})))
+    assert validate(dict(JOB, strains=[VIRUS]))
+    assert validate({"engine": "multistrain", "pop_size": 500, "vacc_percentage": .5,
+                     "strains": [VIRUS, VIRUS], "initial_infected": [1]})
+    #options are checked against the engine
+    assert validate(dict(JOB, options={"shards": 2})) == ["option 'shards' is not taken by the simulation engine"]
+    assert validate(dict(JOB, options={"debug": 1})) == ["option 'debug' has the wrong type: 1"]
+    assert validate(dict(JOB, options={"log_level": "loud"}))
+
+#Test that every job is checked before any runs
+def test_run_jobs_validates_first(monkeypatch):
+    monkeypatch.setattr(cli, "run_job", lambda number, job: pytest.fail("ran a job"))
+    with pytest.raises(JobError, match="job 1: pop_size"):
+        run_jobs([JOB, dict(JOB, pop_size=-1)])
+
+#Test that the jobs give the results of the simulations they describe
+def test_run_jobs():
+    out = io.StringIO()
+    rows = run_jobs([JOB, dict(JOB, seed=2), dict(JOB, engine="event")], out)
+    assert [row["job"] for row in rows] == [0, 1, 2]
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == rows
+
+    sim = Simulation(500, .5, Virus("Test", .3, .3), 5, log_level=1, file_name=os.devnull, verbose=False, rng=1)
+    sim.run()
+    assert rows[0]["error"] == ""
+    assert (rows[0]["time_steps"], rows[0]["total_infected"], rows[0]["total_dead"]) == \
+        (sim.time_step_counter, sim.total_infected, sim.total_dead)
+    assert rows[2]["engine"] == "event" and rows[2]["error"] == ""
+
+#Test that a job that fails is recorded and the jobs after it still run
+def test_run_jobs_failure():
+    rows = run_jobs([dict(JOB, options={"file_name": "no_such_dir/log.txt"}), JOB])
+    assert "No such file" in rows[0]["error"]
+    assert rows[1]["error"] == ""
+
+def test_read_jobs():
+    with open("test_cli_jobs.jsonl", "w") as f:
+        f.write(json.dumps({"pop_size": 100}) + "\n\n# comment\n" + json.dumps({"pop_size": 200, "options": {"debug": True}}) + "\n")
+    with open("test_cli_jobs.json", "w") as f:
+        json.dump({"pop_size": 300}, f)
+
+    defaults = {"vacc_percentage": .5, "options": {"log_level": "summary"}}
+    jobs = read_jobs("test_cli_jobs.jsonl", defaults)
+    assert jobs == [{"pop_size": 100, "vacc_percentage": .5, "options": {"log_level": "summary"}},
+                    {"pop_size": 200, "vacc_percentage": .5, "options": {"log_level": "summary", "debug": True}}]
+    assert read_jobs("test_cli_jobs.json") == [{"pop_size": 300}]
+
+    os.remove("test_cli_jobs.jsonl")
+    os.remove("test_cli_jobs.json")
+
+def test_main(capsys):
+    with open("test_cli_jobs.jsonl", "w") as f:
+        f.write(json.dumps(JOB) + "\n" + json.dumps(dict(JOB, seed=2)) + "\n")
+
+    assert main(["test_cli_jobs.jsonl", "--check"]) == 0
+    assert main(["test_cli_jobs.jsonl", "--results", "test_cli_results.jsonl"]) == 0
+    with open("test_cli_results.jsonl") as f:
+        assert len(f.readlines()) == 2
+
+    with open("test_cli_jobs.jsonl", "a") as f:
+        f.write(json.dumps(dict(JOB, engine="nope")) + "\n")
+    assert main(["test_cli_jobs.jsonl"]) == 2
+    assert "job 2: engine" in capsys.readouterr().err
+
+    os.remove("test_cli_jobs.jsonl")
+    os.remove("test_cli_results.jsonl")
+
+#Modules only the engines and options that ask for them may load
+OPTIONAL = ("shard", "multistrain", "progression", "event_simulation", "network", "async_log", "binary_log",
+            "profiling", "timeseries", "checkpoint", "gzip", "http.server", "socketserver", "multiprocessing",
+            "concurrent.futures")
+
+#Test that starting the CLI loads no engine, and a plain job no optional backend
+def test_lazy_imports():
+    code = ("import sys, cli; before = set(sys.modules); "
+            "cli.run_jobs([%r]); "
+            "print(sorted(m for m in ('simulation', 'logger', 'population', 'rng') + %r if m in before), "
+            "sorted(m for m in %r if m in sys.modules))") % (JOB, OPTIONAL, OPTIONAL)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.split("\n")[0] == "[] []"
+
+#Test that the values the CLI checks options against are the ones Simulation takes
+def test_choices_match_simulation():
+    assert cli.CHOICES["interaction_mode"] == Simulation.INTERACTION_MODES
+    assert cli.CHOICES["log_format"] == Simulation.LOG_FORMATS
+    assert cli.CHOICES["placement"] == Simulation.PLACEMENTS
+
+#Test that option values are checked up front
+def test_validate_option_values():
+    def problems(**options):
+        return validate(dict(JOB, options=options))
+    assert problems(interaction_mode="batch") == [
+        "option 'interaction_mode' must be one of ['pairwise', 'batched'], not 'batch'"]
+    assert problems(placement="scattered")
+    assert problems(log_format="csv")
+    assert problems(log_buffer_size=-1)
+    assert problems(checkpoint_every=2, log_compress=True) == ["compressed logs cannot be checkpointed"]
+    assert validate(dict(JOB, engine="event", options={"checkpoint_every": 2})) == [
+        "the event engine does not support option 'checkpoint_every'"]
+    assert validate(dict(JOB, engine="event", options={"network": "net.bin"}))
+    assert validate(dict(JOB, engine="event", options={"profile": False})) == []
+    assert validate(dict(JOB, engine="sharded", options={"shards": 0}))
+
+    #there must be enough unvaccinated people to infect
+    assert validate(dict(JOB, initial_infected=251)) == [
+        "initial_infected must be at most the 250 unvaccinated people, not 251"]
+    assert validate(dict(JOB, initial_infected=250)) == []
+    assert validate({"engine": "multistrain", "pop_size": 10, "vacc_percentage": .5,
+                     "strains": [VIRUS, VIRUS], "initial_infected": [3, 3]})
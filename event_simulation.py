@@ -0,0 +1,132 @@
+import heapq
+from bisect import bisect_right
+from itertools import accumulate, count
+from simulation import Simulation
+
+#Event kinds, in the order they run within a time step
+CONTACT = 0 # an infected person's contact rolled an infection
+RESOLVE = 1 # an infected person survives or dies at the end of the step
+
+
+class EventSimulation(Simulation):
+    ''' Runs the same model as Simulation by processing events from a priority queue
+    instead of sweeping the infected people every step.
+
+    When someone is infected, the number of their 100 interactions next step that
+    roll an infection is drawn in one go from the binomial distribution, and only
+    those contacts are queued, together with the roll of whether they survive. Work
+    therefore grows with the infections and deaths that happen, not with the
+    interactions or the population: a step where ten people are sick costs ten
+    draws plus their infecting contacts.
+
+    Events are keyed by time step, so contacts still reach the people alive when the
+    step began and everyone infected in a step is resolved at the end of the next,
+    as in Simulation. Totals and the per-step log lines follow the same
+    distribution as Simulation.run, though not the same random draws. At the EVENTS
+    level only contacts that rolled an infection are logged, since the others are
+    never drawn. Contact networks, checkpoints, profiling, time series and
+    observers are not supported.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if (self.network is not None or self.checkpoint_every or self.profile or self.timeseries
+                or self.metrics_address):
+            raise ValueError("EventSimulation does not support networks, checkpoints, profiling or time series")
+        self.events = [] # heap of (time step, kind, order, person id)
+        self._order = count()
+        #Chance of at most k infecting contacts out of 100, for k = 0 to 100
+        p = self.virus.repro_rate
+        pmf = []
+        ways = 1 # 100 choose k, built up one k at a time
+        for k in range(101):
+            pmf.append(ways * p ** k * (1 - p) ** (100 - k))
+            ways = ways * (100 - k) // (k + 1)
+        self._hits_cdf = list(accumulate(pmf))
+
+    def add_observer(self, observer):
+        raise ValueError("EventSimulation does not support observers")
+
+    def save_checkpoint(self, file_name=None):
+        raise ValueError("EventSimulation does not support checkpoints")
+
+    def _schedule(self, time_step, person_id):
+        ''' Queues the infecting contacts and the survival roll of a person who is
+        infectious during time_step.
+        '''
+        hits = min(bisect_right(self._hits_cdf, self.rng.random()), 100)
+        self.total_interactions += 100
+        events = self.events
+        order = self._order
+        for _ in range(hits):
+            heapq.heappush(events, (time_step, CONTACT, next(order), person_id))
+        heapq.heappush(events, (time_step, RESOLVE, next(order), person_id))
+
+    def run(self):
+        ''' Runs the simulation until all requirements for ending it are met, one time
+        step of events at a time.
+        '''
+        for person_id in self.population.infected_ids():
+            self._schedule(self.time_step_counter, person_id)
+
+        with self.logger:
+            while self._simulation_should_continue():
+                self.time_step()
+                self.logger.log_time_step(self.time_step_counter, len(self.newly_infected), len(self.newly_dead),
+                                          self.total_infected, self.total_dead)
+                self.newly_infected = []
+                self.newly_dead = []
+                self.time_step_counter += 1
+
+        if self.verbose:
+            print(f"The simulation has ended after {self.time_step_counter} turns.\n")
+            print(f"Population: {self.pop_size} Total Dead: {self.total_dead} Total Infected: {self.total_infected}\n")
+            print(f"Interactions: {self.total_interactions} Saved by Vaccination: {self.vaccine_saved}\n")
+
+    def time_step(self):
+        ''' Processes every event queued for the current time step. People infected
+        during it are infected straight away and queued for the next step.
+        '''
+        population = self.population
+        infected = population.infected
+        is_vaccinated = population.is_vaccinated
+        living = population.living
+        events = self.events
+        rng = self.rng
+        log_events = self.log_events
+        mortality_rate = self.virus.mortality_rate
+        time_step = self.time_step_counter
+
+        while events and events[0][0] == time_step:
+            _, kind, _, person_id = heapq.heappop(events)
+
+            if kind == CONTACT:
+                rand_id = living[rng.randrange(len(living))]
+                sick = infected[rand_id] == 1
+                vaccinated = is_vaccinated[rand_id] == 1
+                if log_events:
+                    self.logger.log_interaction(population[person_id], population[rand_id], sick, vaccinated,
+                                                did_infect=True)
+                if sick:
+                    continue
+                if vaccinated:
+                    self.vaccine_saved += 1
+                    continue
+                population.set_infected(rand_id, 1)
+                self.current_infected += 1
+                self.total_infected += 1
+                self.newly_infected.append(rand_id)
+                self._schedule(time_step + 1, rand_id)
+
+            else:
+                population.set_infected(person_id, 0)
+                self.current_infected -= 1
+                died = rng.random() <= mortality_rate
+                if died:
+                    population.set_alive(person_id, 0)
+                    self.total_dead += 1
+                    self.newly_dead.append(person_id)
+                else:
+                    population.set_vaccinated(person_id, 1)
+                if log_events:
+                    self.logger.log_infection_survival(population[person_id], died)
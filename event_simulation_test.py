@@ -0,0 +1,81 @@
+import os
+from logger import SUMMARY
+from virus import Virus
+from simulation import Simulation
+from event_simulation import EventSimulation
+from network import ContactNetwork
+import pytest
+
+#Test that an event-driven run keeps the population and totals consistent
+def test_event_run():
+    v = Virus("Events", .3, .3)
+    sim = EventSimulation(2000, .5, v, initial_infected=5, debug=True, verbose=False, rng=4)
+    sim.run()
+
+    population = sim.population
+    population.check_counts()
+    assert sim.events == []
+    assert sim.current_infected == 0
+    assert sim.total_dead == population.count_dead()
+    assert 5 <= sim.total_infected <= 1000
+    assert sim.total_interactions == 100 * sim.total_infected
+
+    #one time step line per step, and every infecting contact and survival logged
+    with open(sim.file_name) as f:
+        lines = f.readlines()
+    assert sum(line.startswith("Time step") for line in lines) == sim.time_step_counter
+    assert sum("survived infection" in line or "died from infection" in line for line in lines) == sim.total_infected
+    assert sum("because already vaccinated" in line for line in lines) == sim.vaccine_saved
+
+    os.remove(sim.file_name)
+
+#Test that the event engine follows the same distribution as Simulation.run
+def test_matches_simulation():
+    v = Virus("Compare", .02, .2)
+    totals = {}
+    for engine in (Simulation, EventSimulation):
+        infected = dead = 0
+        for seed in range(30):
+            sim = engine(2000, .3, v, initial_infected=10, interaction_mode="batched", log_level=SUMMARY,
+                         file_name=os.devnull, verbose=False, rng=seed)
+            sim.run()
+            infected += sim.total_infected
+            dead += sim.total_dead
+        totals[engine] = (infected / 30, dead / 30)
+
+    (infected, dead), (event_infected, event_dead) = totals[Simulation], totals[EventSimulation]
+    assert abs(event_infected - infected) < .1 * infected
+    assert abs(event_dead - dead) < .15 * dead
+
+def test_unsupported_options():
+    v = Virus("Events", .3, .3)
+    network = ContactNetwork.from_edges(100, [0], [1])
+    with pytest.raises(ValueError):
+        EventSimulation(100, .5, v, network=network, file_name=os.devnull)
+    with pytest.raises(ValueError):
+        EventSimulation(100, .5, v, checkpoint_every=1, file_name=os.devnull)
+    with pytest.raises(ValueError):
+        EventSimulation(100, .5, v, file_name=os.devnull).add_observer(print)
+    with pytest.raises(ValueError):
+        EventSimulation(100, .5, v, file_name=os.devnull).save_checkpoint("test_event.ckpt")
+    assert not os.path.exists("test_event.ckpt")
+
+#Test that a run starting after step 0 queues its infected people in that step
+def test_run_from_later_step():
+    sim = EventSimulation(1000, .5, Virus("Late", .3, .3), initial_infected=5, file_name=os.devnull,
+                          verbose=False, rng=1)
+    sim.time_step_counter = 4
+    sim.run()
+    assert sim.time_step_counter > 4
+    assert sim.current_infected == 0
+
+#Test that the chances of 0 to 100 infecting contacts match the binomial distribution
+def test_hits_cdf():
+    for p in (0, .3, 1):
+        sim = EventSimulation(100, .5, Virus("Events", p, .3), file_name=os.devnull, verbose=False)
+        assert sim._hits_cdf[-1] == pytest.approx(1)
+        assert sim._hits_cdf[0] == pytest.approx((1 - p) ** 100)
+    assert sim._hits_cdf[99] == 0
+    #P(at most 30 of 100 at p = .3)
+    assert EventSimulation(100, .5, Virus("Events", .3, .3), file_name=os.devnull)._hits_cdf[30] == \
+        pytest.approx(0.5491236, abs=1e-6)
@@ -0,0 +1,344 @@
+import argparse, gzip, os, struct
+from array import array
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+#Event types of the text log, in the order their counts are kept
+EVENTS = ("infects", "not_infected", "already_sick", "vaccine_saved", "immune", "died", "survived")
+INFECTS, NOT_INFECTED, ALREADY_SICK, VACCINE_SAVED, IMMUNE, DIED, SURVIVED = range(len(EVENTS))
+TARGET = 0x80 # set on a person's event when they were the one contacted
+
+#Last word of the "didn't infect ... because" lines
+_REASONS = {b"sick": ALREADY_SICK, b"vaccinated": VACCINE_SAVED, b"immune": IMMUNE}
+
+# Index files hold this header (magic, log size, step count, chunk count, person
+# offset count, person event count, metadata length), the metadata line, then every
+# array of the index in turn, so an index loads straight into memory.
+MAGIC = b"HERDIDX2"
+HEADER = struct.Struct('<8sQQQQQQ')
+
+PersonEvent = namedtuple("PersonEvent", "step event other target")
+
+
+def _open_log(file_name):
+    return gzip.open(file_name, 'rb') if file_name.endswith(".gz") else open(file_name, 'rb')
+
+
+def _index_chunk(file_name, start, end=None):
+    ''' Indexes the lines of the log from byte start up to byte end, both at line
+    starts, or to the end of the log when end is None. Steps are numbered from the
+    start of the chunk: segment k holds the events after the chunk's k-th time step
+    line.
+
+    The chunk's person events come back sorted by person, so the process building
+    the index only has to append them.
+
+    Returns:
+        tuple: Offsets just past each time step line, the counts of every event type
+        per segment, the offsets of every person's events, their segments, kinds and
+        other people, and the offset the chunk ended at.
+    '''
+    boundaries = array('Q')
+    counts = array('Q', bytes(8 * len(EVENTS)))
+    people = array('Q')
+    segments = array('I')
+    kinds = array('B')
+    others = array('Q')
+    segment = 0
+    offset = start
+    with _open_log(file_name) as f:
+        f.seek(start)
+        for line in f:
+            if end is not None and offset >= end:
+                break
+            offset += len(line)
+            words = line.split()
+            if len(words) < 2:
+                continue
+            verb = words[1]
+            if verb == b"infects" or verb == b"didn't":
+                if verb == b"infects":
+                    kind = INFECTS
+                elif len(words) == 4:
+                    kind = NOT_INFECTED
+                else:
+                    kind = _REASONS.get(words[-1])
+                    if kind is None:
+                        continue
+                source = int(words[0])
+                target = int(words[2] if kind == INFECTS else words[3])
+                people.append(source)
+                segments.append(segment)
+                kinds.append(kind)
+                others.append(target)
+                people.append(target)
+                segments.append(segment)
+                kinds.append(kind | TARGET)
+                others.append(source)
+            elif verb == b"died" or verb == b"survived":
+                kind = DIED if verb == b"died" else SURVIVED
+                person = int(words[0])
+                people.append(person)
+                segments.append(segment)
+                kinds.append(kind)
+                others.append(person)
+            elif words[0] == b"Time" and verb == b"step":
+                boundaries.append(offset)
+                segment += 1
+                counts.frombytes(bytes(8 * len(EVENTS)))
+                continue
+            else:
+                continue
+            counts[segment * len(EVENTS) + kind] += 1
+
+    #Counting sort by person, as ContactNetwork.from_edges sorts edges
+    size_people = max(people, default=-1) + 1
+    offsets = array('Q', bytes(8 * (size_people + 1)))
+    for person in people:
+        offsets[person + 1] += 1
+    for person in range(size_people):
+        offsets[person + 1] += offsets[person]
+    entries = len(people)
+    sorted_segments = array('I', bytes(4 * entries))
+    sorted_kinds = array('B', bytes(entries))
+    sorted_others = array('Q', bytes(8 * entries))
+    fill = offsets[:size_people]
+    for person, segment, kind, other in zip(people, segments, kinds, others):
+        at = fill[person]
+        sorted_segments[at] = segment
+        sorted_kinds[at] = kind
+        sorted_others[at] = other
+        fill[person] = at + 1
+    return boundaries, counts, offsets, sorted_segments, sorted_kinds, sorted_others, offset
+
+
+def _chunk_bounds(file_name, start, size, chunks):
+    ''' Splits bytes start to size of the log into chunks that begin at line starts. '''
+    bounds = [start]
+    if chunks == 1:
+        return [start, size]
+    with open(file_name, 'rb') as f:
+        for chunk in range(1, chunks):
+            f.seek(max(start + (size - start) * chunk // chunks - 1, bounds[-1]))
+            f.readline()
+            bounds.append(max(min(f.tell(), size), bounds[-1]))
+    bounds.append(size)
+    return bounds
+
+
+class LogIndex(object):
+    ''' Index of a text log written by Logger, built in one streaming pass and
+    answering questions about the run without reading the log again.
+
+    Step i's lines, ending with its "Time step i ended" line, are the bytes from
+    step_offsets[i] to step_offsets[i + 1]. counts holds the count of every type in
+    EVENTS for every step, EVENTS entries per step.
+
+    Every person's events are stored chunk by chunk, in the order the chunks were
+    indexed, each chunk in compressed sparse row form as ContactNetwork stores
+    neighbors. Chunk c starts in step chunk_steps[c], its events are entries
+    chunk_entries[c] to chunk_entries[c + 1] and its person offsets are entries
+    chunk_people[c] to chunk_people[c + 1] of person_offsets. Person i's events in
+    chunk c then run from person_offsets[chunk_people[c] + i] to the offset after it,
+    counted from chunk_entries[c], in person_steps (counted from chunk_steps[c]),
+    person_kinds (an EVENTS index, with TARGET set where i was the one contacted)
+    and person_others (the other person of an interaction, or i).
+
+    A log cut off mid-step gets one more step for the lines after its last time step.
+    '''
+
+    def __init__(self, file_name, log_size, metadata, step_offsets, counts, chunk_steps, chunk_entries,
+                 chunk_people, person_offsets, person_steps, person_kinds, person_others):
+        self.file_name = file_name # name of the log
+        self.log_size = log_size # Int, bytes of the log when indexed
+        self.metadata = metadata # first line of the log, without its newline
+        self.step_offsets = step_offsets # array('Q'), one entry per step plus one
+        self.counts = counts # array('Q'), len(EVENTS) entries per step
+        self.chunk_steps = chunk_steps # array('Q'), one entry per chunk
+        self.chunk_entries = chunk_entries # array('Q'), one entry per chunk plus one
+        self.chunk_people = chunk_people # array('Q'), one entry per chunk plus one
+        self.person_offsets = person_offsets # array('Q'), one entry per person plus one in every chunk
+        self.person_steps = person_steps # array('I')
+        self.person_kinds = person_kinds # array('B')
+        self.person_others = person_others # array('Q')
+
+    def __len__(self):
+        return len(self.step_offsets) - 1
+
+    @classmethod
+    def build(cls, file_name, processes=None, chunk_size=64 << 20):
+        ''' Indexes file_name. Logs bigger than chunk_size are split into chunks at
+        line starts and indexed by up to processes worker processes (every core when
+        None), each of which also sorts its chunk's events by person. The chunks are
+        then appended in order as they come back, so only one chunk's events are held
+        twice at a time. Gzipped logs are read in one process, since they cannot be
+        entered in the middle.
+        '''
+        with _open_log(file_name) as f:
+            metadata = f.readline()
+        start = len(metadata)
+        processes = processes or os.cpu_count()
+        if file_name.endswith(".gz"):
+            chunks = 1
+            jobs = [(file_name, start)]
+        else:
+            size = os.path.getsize(file_name)
+            chunks = max(1, min(processes, (size - start) // chunk_size))
+            bounds = _chunk_bounds(file_name, start, size, chunks)
+            jobs = [(file_name, bounds[chunk], bounds[chunk + 1]) for chunk in range(chunks)]
+
+        width = len(EVENTS)
+        step_offsets = array('Q', [start])
+        counts = array('Q', bytes(8 * width))
+        chunk_steps = array('Q')
+        chunk_entries = array('Q', [0])
+        chunk_people = array('Q', [0])
+        person_offsets = array('Q')
+        person_steps = array('I')
+        person_kinds = array('B')
+        person_others = array('Q')
+        pool = None
+        if processes == 1 or chunks == 1:
+            parts = (_index_chunk(*job) for job in jobs)
+        else:
+            pool = ProcessPoolExecutor(processes)
+            parts = pool.map(_index_chunk, *zip(*jobs))
+        try:
+            #A chunk's first segment continues the step the chunk before ended in
+            for boundaries, chunk_counts, offsets, segments, kinds, others, size in parts:
+                base = len(step_offsets) - 1
+                step_offsets.extend(boundaries)
+                counts.frombytes(bytes(8 * width * len(boundaries)))
+                for n, count in enumerate(chunk_counts):
+                    counts[base * width + n] += count
+                chunk_steps.append(base)
+                chunk_entries.append(chunk_entries[-1] + len(segments))
+                chunk_people.append(chunk_people[-1] + len(offsets))
+                person_offsets.extend(offsets)
+                person_steps.extend(segments)
+                person_kinds.extend(kinds)
+                person_others.extend(others)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        #The lines after the last time step line make one more, partial step
+        if step_offsets[-1] < size:
+            step_offsets.append(size)
+        else:
+            del counts[-width:]
+        return cls(file_name, size, metadata.decode().rstrip("\n"), step_offsets, counts, chunk_steps,
+                   chunk_entries, chunk_people, person_offsets, person_steps, person_kinds, person_others)
+
+    @classmethod
+    def load(cls, file_name, log_file_name):
+        ''' Reads an index written by save() for the log log_file_name. '''
+        with open(file_name, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{file_name} is not a log index file")
+            _, log_size, steps, chunks, offsets, entries, metadata_size = HEADER.unpack(header)
+            metadata = f.read(metadata_size).decode()
+            arrays = [array('Q', bytes(8 * (steps + 1))), array('Q', bytes(8 * steps * len(EVENTS))),
+                      array('Q', bytes(8 * chunks)), array('Q', bytes(8 * (chunks + 1))),
+                      array('Q', bytes(8 * (chunks + 1))), array('Q', bytes(8 * offsets)),
+                      array('I', bytes(4 * entries)), array('B', bytes(entries)), array('Q', bytes(8 * entries))]
+            for values in arrays:
+                if f.readinto(values) != values.itemsize * len(values):
+                    raise ValueError(f"{file_name} is truncated")
+        return cls(log_file_name, log_size, metadata, *arrays)
+
+    def save(self, file_name):
+        metadata = self.metadata.encode()
+        with open(file_name, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, self.log_size, len(self), len(self.chunk_steps), len(self.person_offsets),
+                                len(self.person_steps), len(metadata)))
+            f.write(metadata)
+            for values in (self.step_offsets, self.counts, self.chunk_steps, self.chunk_entries,
+                           self.chunk_people, self.person_offsets, self.person_steps, self.person_kinds,
+                           self.person_others):
+                f.write(values)
+
+    def events_for(self, person_id):
+        ''' Every event person_id took part in, in log order, as PersonEvents: the
+        step, the EVENTS name, the other person and whether person_id was contacted.
+        '''
+        events = []
+        for chunk, base in enumerate(self.chunk_steps):
+            at = self.chunk_people[chunk] + person_id
+            if at + 1 >= self.chunk_people[chunk + 1]:
+                continue
+            start = self.chunk_entries[chunk] + self.person_offsets[at]
+            end = self.chunk_entries[chunk] + self.person_offsets[at + 1]
+            events.extend(PersonEvent(base + step, EVENTS[kind & ~TARGET], other, bool(kind & TARGET))
+                          for step, kind, other in zip(self.person_steps[start:end], self.person_kinds[start:end],
+                                                       self.person_others[start:end]))
+        return events
+
+    def per_step(self, event):
+        ''' Count of event, a name in EVENTS, in every step. '''
+        return list(self.counts[EVENTS.index(event)::len(EVENTS)])
+
+    def count(self, event, first_step=0, last_step=None):
+        ''' Count of event in steps first_step to last_step, both included. '''
+        if last_step is None:
+            last_step = len(self) - 1
+        if not 0 <= first_step <= last_step + 1 <= len(self):
+            raise ValueError(f"steps {first_step} to {last_step} are not within the {len(self)} steps of the log")
+        width = len(EVENTS)
+        return sum(self.counts[first_step * width + EVENTS.index(event):(last_step + 1) * width:width])
+
+    def totals(self):
+        return {event: self.count(event) for event in EVENTS}
+
+    def step_lines(self, step):
+        ''' Reads the lines of one step from the log, seeking straight to them. '''
+        if not 0 <= step < len(self):
+            raise ValueError(f"step {step} is not within the {len(self)} steps of the log")
+        with _open_log(self.file_name) as f:
+            f.seek(self.step_offsets[step])
+            return f.read(self.step_offsets[step + 1] - self.step_offsets[step]).decode().splitlines()
+
+
+def open_index(log_file_name, index_file_name=None, processes=None):
+    ''' Loads the index of a log, or builds and saves it if it is missing, unreadable
+    or the log has changed size since. The index is kept next to the log, with ".idx"
+    added.
+    '''
+    index_file_name = index_file_name or log_file_name + ".idx"
+    if os.path.exists(index_file_name) and os.path.getmtime(index_file_name) >= os.path.getmtime(log_file_name):
+        try:
+            index = LogIndex.load(index_file_name, log_file_name)
+        except ValueError:
+            index = None
+        if index is not None and (log_file_name.endswith(".gz") or index.log_size == os.path.getsize(log_file_name)):
+            return index
+    index = LogIndex.build(log_file_name, processes)
+    index.save(index_file_name)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index a simulation log and answer questions from the index.")
+    parser.add_argument("log")
+    parser.add_argument("--index", help="index file, the log name plus .idx by default")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--person", type=int, nargs="+", default=[], help="list the events of these people")
+    parser.add_argument("--count", choices=EVENTS, nargs="+", default=[], help="count events in --steps")
+    parser.add_argument("--steps", type=int, nargs=2, metavar=("FIRST", "LAST"), default=None)
+    parser.add_argument("--per-step", choices=EVENTS, nargs="+", default=[], help="count events in every step")
+    args = parser.parse_args()
+
+    index = open_index(args.log, args.index, args.processes)
+    first, last = args.steps or (0, len(index) - 1)
+    if not (args.person or args.count or args.per_step):
+        print(f"{len(index)} steps: " + ", ".join(f"{event} {count}" for event, count in index.totals().items()))
+    for event in args.count:
+        print(f"{event} in steps {first}-{last}: {index.count(event, first, last)}")
+    for event in args.per_step:
+        print(f"{event} per step: " + " ".join(str(count) for count in index.per_step(event)[first:last + 1]))
+    for person_id in args.person:
+        print(f"person {person_id}:")
+        for event in index.events_for(person_id):
+            role = "contacted by" if event.target else "with"
+            other = "" if event.event in ("died", "survived") else f" {role} {event.other}"
+            print(f"  step {event.step}: {event.event}{other}")
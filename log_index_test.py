@@ -0,0 +1,108 @@
+import gzip, os, shutil
+from log_index import LogIndex, open_index, PersonEvent, EVENTS
+from simulation import Simulation
+from virus import Virus
+import pytest
+
+LOG = "test_log_index.txt"
+ARRAYS = ("step_offsets", "counts", "chunk_steps", "chunk_entries", "chunk_people", "person_offsets",
+          "person_steps", "person_kinds", "person_others")
+
+@pytest.fixture(scope="module")
+def sim():
+    sim = Simulation(1000, .5, Virus("Test", .1, .3), 5, file_name=LOG, verbose=False, rng=7,
+                     log_buffer_size=1 << 16)
+    sim.run()
+    yield sim
+    for file_name in (LOG, LOG + ".idx", LOG + ".gz", "test_log_index_cut.txt"):
+        if os.path.exists(file_name):
+            os.remove(file_name)
+
+#Test that the index counts what the simulation counted
+def test_build(sim):
+    index = LogIndex.build(LOG, processes=1)
+    assert len(index) == sim.time_step_counter
+    assert index.metadata == "1000\t0.5\tTest\t0.3\t0.1"
+    assert index.count("vaccine_saved") == sim.vaccine_saved
+    assert index.count("died") == sim.total_dead
+    assert sum(index.per_step("died")) == sim.total_dead
+    assert sum(index.totals()[event] for event in EVENTS[:5]) == sim.total_interactions
+    assert index.count("vaccine_saved", 1, 2) == sum(index.per_step("vaccine_saved")[1:3])
+    assert index.count("died", 3, 2) == 0
+    assert index.person_others.typecode == 'Q' # ids as big as Population takes
+    for steps in ((-1, 2), (0, len(index)), (3, 1)):
+        with pytest.raises(ValueError):
+            index.count("died", *steps)
+    with pytest.raises(ValueError):
+        index.step_lines(-1)
+
+    for step in range(len(index)):
+        assert index.step_lines(step)[-1] == f"Time step {step} ended, beginning {step + 1}"
+
+#Test that chunks indexed in parallel stitch into the same index as one pass
+def test_build_chunks(sim):
+    whole = LogIndex.build(LOG, processes=1)
+    chunked = LogIndex.build(LOG, processes=4, chunk_size=5000)
+    assert len(chunked.chunk_steps) == 4
+    assert (chunked.step_offsets, chunked.counts) == (whole.step_offsets, whole.counts)
+    for person_id in range(1001):
+        assert chunked.events_for(person_id) == whole.events_for(person_id)
+
+#Test that the events of a person are the log lines that name them
+def test_events_for(sim):
+    index = LogIndex.build(LOG, processes=1)
+    person_id = next(person_id for person_id in range(1000)
+                     if any(event.event == "died" for event in index.events_for(person_id)))
+    expected = []
+    for step in range(len(index)):
+        for line in index.step_lines(step):
+            words = line.split()
+            if str(person_id) in (words[0], words[2 if words[1] == "infects" else -1 if words[1] != "didn't" else 3]):
+                expected.append((step, line))
+    events = index.events_for(person_id)
+    assert len(events) == len(expected)
+    assert [event.step for event in events] == [step for step, _ in expected]
+    assert PersonEvent(events[-1].step, "died", person_id, False) == events[-1]
+    assert index.events_for(10 ** 6) == []
+
+def test_save_load(sim):
+    index = LogIndex.build(LOG, processes=1)
+    index.save(LOG + ".idx")
+    loaded = LogIndex.load(LOG + ".idx", LOG)
+    assert (loaded.log_size, loaded.metadata) == (index.log_size, index.metadata)
+    for name in ARRAYS:
+        assert getattr(loaded, name) == getattr(index, name)
+
+    with open("test_log_index_cut.txt", "wb") as f:
+        f.write(b"not an index")
+    with pytest.raises(ValueError):
+        LogIndex.load("test_log_index_cut.txt", LOG)
+
+#Test that open_index reuses a saved index and rebuilds one for a changed log
+def test_open_index(sim):
+    if os.path.exists(LOG + ".idx"):
+        os.remove(LOG + ".idx")
+    index = open_index(LOG, processes=1)
+    assert os.path.exists(LOG + ".idx")
+    assert open_index(LOG).counts == index.counts
+
+    #a log cut off mid-step gets a last, partial step
+    with open(LOG, "rb") as f:
+        data = f.read()
+    cut = index.step_offsets[2] + 100
+    with open("test_log_index_cut.txt", "wb") as f:
+        f.write(data[:cut])
+    partial = open_index("test_log_index_cut.txt", LOG + ".idx", processes=1)
+    assert len(partial) == 3
+    assert partial.step_offsets[-1] == cut
+    assert partial.per_step("not_infected")[:2] == index.per_step("not_infected")[:2]
+
+def test_gzip(sim):
+    with open(LOG, "rb") as f, gzip.open(LOG + ".gz", "wb") as g:
+        shutil.copyfileobj(f, g)
+    index = LogIndex.build(LOG, processes=1)
+    zipped = LogIndex.build(LOG + ".gz")
+    for name in ARRAYS:
+        assert getattr(zipped, name) == getattr(index, name)
+    assert zipped.step_lines(1) == index.step_lines(1)
+
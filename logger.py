@@ -1,14 +1,119 @@
 import os
+from functools import partial
 from person import Person
 
+#Logging levels
+SUMMARY = 1 # metadata and one line per time step
+EVENTS = 2 # every interaction and infection survival as well
+
+def _open_file(file_name, mode, compress):
+    if compress:
+        #The fastest level, so compressing keeps up with the simulation
+        import gzip
+
+        return gzip.open(file_name, mode if 'b' in mode else mode + 't', compresslevel=1)
+    return open(file_name, mode)
+
+def metadata_line(pop_size, vacc_percentage, virus_name, mortality_rate, basic_repro_num):
+    ''' The first line of a log. The rates of several strains, given as lists, take
+    one tab-separated field each: every mortality rate, then every repro rate.
+    '''
+    fields = [pop_size, vacc_percentage, virus_name]
+    for rates in (mortality_rate, basic_repro_num):
+        fields.extend(rates if isinstance(rates, list) else [rates])
+    return "\t".join(str(field) for field in fields) + "\n"
+
 class Logger(object):
     ''' Utility class responsible for logging all interactions during the simulation. '''
 
     # PROTIP: Write your tests before you solve each function, that way you can
     # test them one by one as you write your class.
 
-    def __init__(self, file_name):
+    # Loggers that write bytes set these to 'b' and b''
+    _mode = ''
+    _empty = ''
+
+    def __init__(self, file_name, buffer_size=0, level=EVENTS, compress=False, queue_size=0):
+        ''' Log lines are written through one file handle that stays open between events.
+        Lines are held in memory until buffer_size characters are waiting, then written in
+        one call. The default buffer_size of 0 writes every line straight to the file.
+
+        At the SUMMARY level interactions and infection survivals are not logged. With
+        compress on the log is written as gzip, which cannot be cut back by resume_at.
+
+        A queue_size above 0 hands every buffer to a QueuedFile, whose background thread
+        writes and compresses it while logging carries on, with at most queue_size
+        buffers waiting. close() waits for them all to be written.
+        '''
         self.file_name = file_name
+        self.level = level # SUMMARY or EVENTS
+        self.buffer_size = buffer_size # Int, characters held before writing
+        self.compress = compress # bool
+        self.queue_size = queue_size # Int, buffers waiting for the writer thread, 0 for none
+        self._file = None
+        self._buffer = []
+        self._buffered = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _write(self, line):
+        ''' Queues a line and writes the buffer out once it holds buffer_size characters. '''
+        self._buffer.append(line)
+        self._buffered += len(line)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def _open(self, mode):
+        opener = partial(_open_file, self.file_name, mode + self._mode, self.compress)
+        if self.queue_size:
+            from async_log import QueuedFile #starts threads, so only loaded when asked for
+
+            #opener holds no reference to the logger, so a logger nobody closes can be collected
+            return QueuedFile(opener, self.queue_size)
+        return opener()
+
+    def flush(self):
+        ''' Writes every buffered line to the log file. '''
+        if not self._buffer:
+            return
+        if self._file is None:
+            self._file = self._open('a')
+        self._file.write(self._empty.join(self._buffer))
+        self._file.flush()
+        self._buffer = []
+        self._buffered = 0
+
+    def close(self):
+        ''' Flushes the buffer and closes the log file. Logging again reopens it. '''
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def offset(self):
+        ''' Writes out the buffer and returns how many bytes the log file holds. '''
+        if self.compress:
+            raise ValueError("a compressed log cannot be resumed")
+        self.close()
+        return os.path.getsize(self.file_name)
+
+    def resume_at(self, offset, time_step_number):
+        ''' Cuts the log file back to offset, dropping anything logged after it, so
+        logging carries on from there. time_step_number is the step logging resumes in.
+        '''
+        if self.compress:
+            raise ValueError("a compressed log cannot be resumed")
+        self._buffer = []
+        self._buffered = 0
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        with open(self.file_name, 'r+b') as f:
+            f.truncate(offset)
 
     def write_metadata(self, pop_size, vacc_percentage, virus_name, mortality_rate,
                        basic_repro_num):
@@ -18,14 +123,18 @@ class Logger(object):
         '''
         #Write to file 'w' - writes/overwrites
         #'a' to append new log
-        with open(self.file_name, 'w') as f:
-            f.write(f"{pop_size}\t{vacc_percentage}\t{virus_name}\t{mortality_rate}\t{basic_repro_num}\n")
+        self._buffer = []
+        self._buffered = 0
+        if self._file is not None:
+            self._file.close()
+        self._file = self._open('w')
+        self._write(metadata_line(pop_size, vacc_percentage, virus_name, mortality_rate, basic_repro_num))
             
         # TIP: Use 'w' mode when you open the file. For all other methods, use
         # the 'a' mode to append a new log to the end, since 'w' overwrites the file.
 
     def log_interaction(self, person, random_person, random_person_sick=None,
-                        random_person_vacc=None, did_infect=None):
+                        random_person_vacc=None, did_infect=None, random_person_immune=None):
         '''
         The Simulation object should use this method to log every interaction
         a sick person has during each time step.
@@ -34,23 +143,30 @@ class Logger(object):
 
         or the other edge cases:
             "{person.ID} didn't infect {random_person.ID} because {'vaccinated' or 'already sick'} \n"
+
+        random_person_immune marks someone protected by recovering from a strain, in
+        multi-strain runs.
         '''
-        with open(self.file_name, 'a') as f:
-
-            #Random person is already sick
-            if random_person_sick == True and did_infect == True:
-                f.write(f"{person._id} didn't infect {random_person._id} because already sick \n")
-            #Random person is vaccinated and infected
-            elif random_person_vacc == True and did_infect == True:
-                f.write(f"{person._id} didn't infect {random_person._id} because already vaccinated \n")
-            #Random person was not infected
-            elif did_infect == False:
-                f.write(f"{person._id} didn't infect {random_person._id} \n")
-            #Random person is not vaccinated or sick and is just infected
-            elif did_infect == True:
-                f.write(f"{person._id} infects {random_person._id} \n")
-            else:
-                f.write("SHOULD NOT HAPPEN \n")
+        if self.level < EVENTS:
+            return
+
+        #Random person is already sick
+        if random_person_sick == True and did_infect == True:
+            self._write(f"{person._id} didn't infect {random_person._id} because already sick \n")
+        #Random person is vaccinated and infected
+        elif random_person_vacc == True and did_infect == True:
+            self._write(f"{person._id} didn't infect {random_person._id} because already vaccinated \n")
+        #Random person is immune from an earlier infection
+        elif random_person_immune == True and did_infect == True:
+            self._write(f"{person._id} didn't infect {random_person._id} because immune \n")
+        #Random person was not infected
+        elif did_infect == False:
+            self._write(f"{person._id} didn't infect {random_person._id} \n")
+        #Random person is not vaccinated or sick and is just infected
+        elif did_infect == True:
+            self._write(f"{person._id} infects {random_person._id} \n")
+        else:
+            self._write("SHOULD NOT HAPPEN \n")
 
     def log_infection_survival(self, person, did_die_from_infection):
         ''' The Simulation object uses this method to log the results of every
@@ -59,11 +175,13 @@ class Logger(object):
         The format of the log should be:
             "{person.ID} died from infection\n" or "{person.ID} survived infection.\n"
         '''
-        with open(self.file_name, 'a') as f:
-            if did_die_from_infection:
-                f.write(f"{person._id} died from infection\n")
-            else:
-                f.write(f"{person._id} survived infection\n")
+        if self.level < EVENTS:
+            return
+
+        if did_die_from_infection:
+            self._write(f"{person._id} died from infection\n")
+        else:
+            self._write(f"{person._id} survived infection\n")
 
 
     def log_time_step(self, time_step_number, newly_infected_count, newly_dead_count, total_infected_count, total_dead_count):
@@ -80,9 +198,18 @@ class Logger(object):
 
         The format of this log should be:
             "Time step {time_step_number} ended, beginning {time_step_number + 1}\n"
+
+        At the SUMMARY level, where there are no event lines to count, the line goes on
+        with the step's counts:
+            "...: {newly infected} newly infected, {newly dead} newly dead,
+            {total infected} total infected, {total dead} total dead\n"
         '''
-        with open(self.file_name, 'a') as f:
-            f.write(f"Time step {time_step_number} ended, beginning {time_step_number + 1}\n")
+        if self.level < EVENTS:
+            self._write(f"Time step {time_step_number} ended, beginning {time_step_number + 1}: "
+                        f"{newly_infected_count} newly infected, {newly_dead_count} newly dead, "
+                        f"{total_infected_count} total infected, {total_dead_count} total dead\n")
+            return
+        self._write(f"Time step {time_step_number} ended, beginning {time_step_number + 1}\n")
 
         self.logger = Logger("logfile.txt")
         # Stores created population in self.population attribute
@@ -1,4 +1,4 @@
-from logger import Logger
+from logger import Logger, SUMMARY
 from person import Person
 import os
 import pytest
@@ -64,6 +64,52 @@ def test_log_infection_survival():
 
     os.remove('test4.txt')
 
+def test_buffered_logging():
+    log = Logger('test5.txt', buffer_size=1000)
+    person = Person(1, True)
+    person2 = Person(2, False)
+
+    log.write_metadata(100, 0.5, "Test", 0.25, 0.5)
+    log.log_interaction(person, person2, random_person_sick=False, random_person_vacc=False, did_infect=True)
+    log.log_infection_survival(person2, False)
+
+    #Nothing past the buffer size has been written yet
+    with open('test5.txt', 'r') as f:
+        assert f.read() == ""
+
+    log.flush()
+    with open('test5.txt', 'r') as f:
+        assert f.read() == ("100\t0.5\tTest\t0.25\t0.5\n" +
+                            "1 infects 2 \n" +
+                            "2 survived infection\n")
+
+    #Closing flushes what is left and logging again appends to the file
+    with log:
+        log.log_time_step(0, 1, 0, 1, 0)
+    log.log_infection_survival(person2, True)
+    log.close()
+
+    with open('test5.txt', 'r') as f:
+        lines = f.readlines()
+    assert lines[-2:] == ["Time step 0 ended, beginning 1\n", "2 died from infection\n"]
+
+    os.remove('test5.txt')
+
+def test_summary_level():
+    log = Logger('test6.txt', level=SUMMARY)
+    person = Person(1, True)
+    person2 = Person(2, False)
+
+    log.write_metadata(100, 0.5, "Test", 0.25, 0.5)
+    log.log_interaction(person, person2, random_person_sick=False, random_person_vacc=False, did_infect=True)
+    log.log_infection_survival(person2, False)
+    log.log_time_step(0, 1, 0, 1, 0)
+    log.log_time_step(1, 3, 1, 4, 1)
+    log.close()
 
+    with open('test6.txt', 'r') as f:
+        assert f.read() == ("100\t0.5\tTest\t0.25\t0.5\n" +
+                            "Time step 0 ended, beginning 1: 1 newly infected, 0 newly dead, 1 total infected, 0 total dead\n" +
+                            "Time step 1 ended, beginning 2: 3 newly infected, 1 newly dead, 4 total infected, 1 total dead\n")
 
-    
\ No newline at end of file
+    os.remove('test6.txt')
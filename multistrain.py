@@ -0,0 +1,184 @@
+from array import array
+from itertools import compress
+from simulation import Simulation
+
+
+class MultiStrainSimulation(Simulation):
+    ''' Simulates several strains spreading through one population at once.
+
+    Each person carries at most one strain at a time. Per-person state stays a few
+    bytes whatever the strain count: strain holds the strain of everyone infected
+    (one byte each), and recovered holds one bit per strain each person has survived,
+    packed into one array entry. Vaccinated people are protected from every strain.
+    Survivors are not vaccinated; they are protected from each strain with the
+    chance the Strains cross-immunity matrix gives for the strains they recovered
+    from, and can catch the others.
+
+    Interactions for every strain are drawn and rolled in one batched pass per step,
+    each contact against the repro_rate of the strain its source carries, so K
+    strains cost one simulation rather than K. Per-strain totals are kept in
+    total_infected_by_strain and total_dead_by_strain, and immunity_saved counts the
+    interactions stopped by an earlier infection.
+
+    Contact networks and profiling work as in Simulation. In the time series,
+    recovered counts the living people who are not infected and have survived at
+    least one strain, whatever their protection from the others, and vaccinated
+    counts only the people vaccinated from the start. Checkpoints and initial_state
+    are not supported.
+    '''
+
+    def __init__(self, population_size, v_percentage, strains, initial_infected=None, **kwargs):
+        ''' strains is a Strains object and initial_infected the number of people
+        initially infected with each strain, one each by default. Other arguments are
+        passed on to Simulation, which always runs in batched mode here.
+        '''
+        if initial_infected is None:
+            initial_infected = [1] * len(strains)
+        if len(initial_infected) != len(strains):
+            raise ValueError(f"initial_infected needs a count for each of the {len(strains)} strains")
+        if kwargs.get("checkpoint_every") or kwargs.get("initial_state") is not None:
+            raise ValueError("MultiStrainSimulation does not support checkpoints or initial_state")
+        self.strain_counts = list(initial_infected) # initially infected with each strain
+        self.total_infected_by_strain = list(initial_infected)
+        self.total_dead_by_strain = [0] * len(strains)
+        self.immunity_saved = 0 # Int, interactions where an earlier infection stopped an infection
+        self.num_recovered = 0 # Int, living people not infected who survived a strain
+        self.newly_strains = [] # strain of each entry of newly_infected
+        self._protection = {} # (recovered bits, strain) -> chance of protection
+        super().__init__(population_size, v_percentage, strains, sum(initial_infected), interaction_mode="batched",
+                         **kwargs)
+
+    def _create_population(self, initial_infected):
+        ''' Builds the population as Simulation does, then hands out the strains to
+        the initially infected people in id order.
+        '''
+        population = super()._create_population(initial_infected)
+        size = len(population)
+        self.strain = bytearray(size)
+        typecode = next(code for code in "BHIQ" if array(code).itemsize * 8 >= len(self.virus))
+        self.recovered = array(typecode, bytes(array(typecode).itemsize * size))
+
+        infected_ids = population.infected_ids()
+        start = 0
+        for strain, count in enumerate(self.strain_counts):
+            for person_id in infected_ids[start:start + count]:
+                self.strain[person_id] = strain
+            start += count
+        return population
+
+    def save_checkpoint(self, file_name=None):
+        raise ValueError("MultiStrainSimulation does not support checkpoints")
+
+    def _state_counts(self):
+        return {"recovered": self.num_recovered, "vaccinated": self.population.num_vaccinated_alive}
+
+    def protection(self, person_id, strain):
+        ''' Chance that person_id's earlier infections protect them from strain. '''
+        bits = self.recovered[person_id]
+        if not bits:
+            return 0.0
+        key = (bits, strain)
+        if key not in self._protection:
+            cross_immunity = self.virus.cross_immunity
+            self._protection[key] = max(cross_immunity[earlier][strain] for earlier in range(len(self.virus))
+                                        if bits >> earlier & 1)
+        return self._protection[key]
+
+    def _interaction_phase(self):
+        ''' Draws and rolls the interactions of every infected person, whatever their
+        strain, in one batch.
+        '''
+        population = self.population
+        infected = population.infected
+        is_vaccinated = population.is_vaccinated
+        strain = self.strain
+        repro_rate = self.virus.repro_rate
+        rng = self.rng
+        rand = rng.random
+
+        infected_ids = population.infected_ids()
+        if self.network is None:
+            contacts = rng.choices(population.living, k=100 * len(infected_ids))
+            sources = [person_id for person_id in infected_ids for _ in range(100)]
+        else:
+            contacts = []
+            sources = []
+            for person_id in infected_ids:
+                drawn = self._network_contacts(person_id)
+                contacts.extend(drawn)
+                sources.extend([person_id] * len(drawn))
+        needed = len(contacts)
+        did_infect = [rand() < repro_rate[strain[source]] for source in sources]
+        self.total_interactions += needed
+
+        immune = set()
+        for n in compress(range(needed), did_infect):
+            rand_id = contacts[n]
+            if infected[rand_id]:
+                continue
+            if is_vaccinated[rand_id]:
+                self.vaccine_saved += 1
+                continue
+            source_strain = strain[sources[n]]
+            protection = self.protection(rand_id, source_strain)
+            if protection >= 1 or (protection and rand() < protection):
+                self.immunity_saved += 1
+                immune.add(n)
+                continue
+            self.newly_infected.append(rand_id)
+            self.newly_strains.append(source_strain)
+
+        if not self.log_events:
+            return
+
+        for n, rand_id in enumerate(contacts):
+            self.logger.log_interaction(population[sources[n]], population[rand_id], infected[rand_id] == 1,
+                                        is_vaccinated[rand_id] == 1, did_infect[n], n in immune)
+
+    def _survival_phase(self):
+        ''' Rolls whether every infected person survives, against the mortality_rate of
+        their strain. Survivors recover from that strain.
+        '''
+        population = self.population
+        strain = self.strain
+        recovered = self.recovered
+        mortality_rate = self.virus.mortality_rate
+        log_events = self.log_events
+        rng = self.rng
+
+        for person_id in population.infected_ids():
+            person_strain = strain[person_id]
+            population.set_infected(person_id, 0)
+            self.current_infected -= 1
+            if rng.random() > mortality_rate[person_strain]:
+                recovered[person_id] |= 1 << person_strain
+                self.num_recovered += 1
+                if log_events:
+                    self.logger.log_infection_survival(population[person_id], False)
+            else:
+                population.set_alive(person_id, 0)
+                if log_events:
+                    self.logger.log_infection_survival(population[person_id], True)
+                self.total_dead += 1
+                self.total_dead_by_strain[person_strain] += 1
+                self.newly_dead.append(person_id)
+
+    def _infect_newly_infected(self):
+        ''' Infects each newly exposed person with the first strain that reached them
+        this step.
+        '''
+        population = self.population
+        infected = population.infected
+        for person_id, person_strain in zip(self.newly_infected, self.newly_strains):
+            if not infected[person_id]:
+                population.set_infected(person_id, 1)
+                if self.recovered[person_id]:
+                    self.num_recovered -= 1
+                self.strain[person_id] = person_strain
+                self.current_infected += 1
+                self.total_infected += 1
+                self.total_infected_by_strain[person_strain] += 1
+
+        self.newly_infected = []
+        self.newly_strains = []
+        self.newly_dead = []
@@ -0,0 +1,101 @@
+import json, os
+from logger import SUMMARY
+from virus import Virus, Strains
+from simulation import Simulation
+from multistrain import MultiStrainSimulation
+from binary_log import BinaryLogReader
+import pytest
+
+def test_initial_strains():
+    strains = Strains([Virus("Alpha", .3, .1), Virus("Beta", .5, .2), Virus("Gamma", .2, .3)])
+    sim = MultiStrainSimulation(1000, .5, strains, initial_infected=[2, 3, 1], file_name=os.devnull, verbose=False)
+    infected_ids = sim.population.infected_ids()
+    assert sim.total_infected == sim.initial_infected == 6
+    assert [sim.strain[person_id] for person_id in infected_ids] == [0, 0, 1, 1, 1, 2]
+    assert sim.recovered.typecode == 'B'
+
+    with pytest.raises(ValueError):
+        MultiStrainSimulation(1000, .5, strains, initial_infected=[1, 1], file_name=os.devnull)
+    with pytest.raises(ValueError):
+        Strains([Virus("Alpha", .3, .1)], cross_immunity=[[2.0]])
+
+#Test that two strains spread in one run and keep their own totals
+def test_two_strains():
+    strains = Strains([Virus("Mild", .3, .05), Virus("Severe", .3, .6)], cross_immunity=[[1, .5], [.5, 1]])
+    sim = MultiStrainSimulation(2000, .25, strains, initial_infected=[5, 5], debug=True, file_name="test_strains.log",
+                                verbose=False, rng=8)
+    sim.run()
+
+    sim.population.check_counts()
+    assert sum(sim.total_infected_by_strain) == sim.total_infected
+    assert sum(sim.total_dead_by_strain) == sim.total_dead == sim.population.count_dead()
+    assert all(count > 5 for count in sim.total_infected_by_strain)
+    #the severe strain kills a larger share of the people it infects
+    mild, severe = (dead / infected for dead, infected in zip(sim.total_dead_by_strain, sim.total_infected_by_strain))
+    assert severe > mild
+    #people who caught both strains were reinfected despite cross-immunity
+    assert any(bits == 3 for bits in sim.recovered)
+    assert sim.immunity_saved > 0
+
+    with open("test_strains.log") as f:
+        lines = f.readlines()
+    assert sum("because immune" in line for line in lines) == sim.immunity_saved
+    assert sum("because already vaccinated" in line for line in lines) == sim.vaccine_saved
+
+    os.remove("test_strains.log")
+
+#Test that one strain behaves like Simulation except that survivors stay unvaccinated
+def test_single_strain():
+    v = Virus("Single", .02, .2)
+    sim = MultiStrainSimulation(2000, .3, Strains([v]), initial_infected=[10], log_level=SUMMARY,
+                                file_name=os.devnull, verbose=False, rng=1)
+    sim.run()
+    plain = Simulation(2000, .3, v, initial_infected=10, interaction_mode="batched", log_level=SUMMARY,
+                       file_name=os.devnull, verbose=False, rng=1)
+    plain.run()
+
+    assert (sim.total_infected, sim.total_dead, sim.time_step_counter) == \
+        (plain.total_infected, plain.total_dead, plain.time_step_counter)
+    assert sim.population.num_vaccinated_alive == 600
+
+#Test that immune interactions survive a binary log and its conversion to text
+def test_binary_log_immune():
+    strains = Strains([Virus("Mild", .3, .05), Virus("Severe", .3, .6)], cross_immunity=[[1, .5], [.5, 1]])
+    text_sim = MultiStrainSimulation(500, .25, strains, initial_infected=[3, 3], file_name="test_strains.txt",
+                                     verbose=False, rng=2)
+    text_sim.run()
+    binary_sim = MultiStrainSimulation(500, .25, strains, initial_infected=[3, 3], log_format="binary",
+                                       file_name="test_strains.bin", verbose=False, rng=2)
+    binary_sim.run()
+
+    BinaryLogReader("test_strains.bin").to_text("test_converted.txt")
+    with open("test_strains.txt") as f, open("test_converted.txt") as g:
+        assert f.read() == g.read()
+
+    os.remove("test_strains.txt")
+    os.remove("test_strains.bin")
+    os.remove("test_converted.txt")
+
+#Test that the time series counts survivors as recovered rather than vaccinated
+def test_timeseries():
+    strains = Strains([Virus("Mild", .3, .05), Virus("Severe", .3, .6)], cross_immunity=[[1, .5], [.5, 1]])
+    sim = MultiStrainSimulation(2000, .25, strains, initial_infected=[5, 5], log_level=SUMMARY,
+                                file_name="test_strains.log", verbose=False, rng=8, timeseries="test_strains.jsonl")
+    sim.run()
+
+    with open("test_strains.jsonl") as f:
+        rows = [json.loads(line) for line in f]
+    for row in rows:
+        assert min(row.values()) >= 0
+        assert row["susceptible"] + row["infected"] + row["recovered"] + row["dead"] + row["vaccinated"] == 2000
+        assert row["vaccinated"] == 500
+    population = sim.population
+    assert rows[-1]["recovered"] == sum(1 for person_id in range(2000) if sim.recovered[person_id]
+                                        and population.is_alive[person_id] and not population.infected[person_id])
+
+    #the rates of every strain get a field of their own
+    with open("test_strains.log") as f:
+        assert f.readline() == "2000\t0.25\tMild+Severe\t0.05\t0.6\t0.3\t0.3\n"
+
+    os.remove("test_strains.log")
+    os.remove("test_strains.jsonl")
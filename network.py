@@ -0,0 +1,268 @@
+import os
+import random
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from rng import spawn_seeds
+
+# Network files hold this header (magic, node count, neighbor entry count), then
+# the offsets and neighbors arrays, so a saved network loads straight into memory.
+MAGIC = b"HERDNET1"
+HEADER = struct.Struct('<8sQQ')
+
+
+class ContactNetwork(object):
+    ''' Undirected contact graph stored in compressed sparse row form.
+
+    The neighbors of person i are neighbors[offsets[i]:offsets[i + 1]]. Offsets take 8
+    bytes per person and each edge takes 4 bytes at both of its ends, so 10M people
+    with 100M edges fit in under 1 GB.
+    '''
+
+    def __init__(self, offsets, neighbors):
+        self.offsets = offsets # array('q'), one entry per person plus one
+        self.neighbors = neighbors # array('I'), neighbor ids of every person in turn
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def edge_count(self):
+        return len(self.neighbors) // 2
+
+    def degree(self, index):
+        return self.offsets[index + 1] - self.offsets[index]
+
+    def neighbors_of(self, index):
+        return self.neighbors[self.offsets[index]:self.offsets[index + 1]]
+
+    @classmethod
+    def from_edges(cls, size, sources, targets, processes=None):
+        ''' Builds the network from matching sequences of edge end points with a
+        counting sort, so edges are copied into place without sorting them.
+        Self-loops are dropped, and an edge given more than once is kept once.
+
+        With many edges the work is shared out: worker processes split the edges
+        among ranges of people, then each range is sorted into place by its own
+        worker, and the ranges are put back together in order.
+
+        Args:
+            processes (int): Worker processes, every core when None; 1 builds in
+                this process.
+        '''
+        if len(sources) != len(targets):
+            raise ValueError("sources and targets must be the same length")
+        processes = processes or os.cpu_count()
+        chunks = max(1, min(processes, len(sources) // 100000))
+        width = -(-size // chunks) or 1
+        edge_bounds = [len(sources) * chunk // chunks for chunk in range(chunks + 1)]
+        jobs = [(size, width, chunks, sources[edge_bounds[chunk]:edge_bounds[chunk + 1]],
+                 targets[edge_bounds[chunk]:edge_bounds[chunk + 1]]) for chunk in range(chunks)]
+
+        starts = [min(size, width * chunk) for chunk in range(chunks + 1)]
+        if processes == 1 or chunks == 1:
+            ends = [_split_ends(*job) for job in jobs]
+            rows = [_sort_rows(0, size, ends[0])]
+        else:
+            with ProcessPoolExecutor(processes) as pool:
+                ends = list(pool.map(_split_ends, *zip(*jobs)))
+                rows = list(pool.map(_sort_rows, starts[:-1], starts[1:],
+                                     [[part[chunk] for part in ends] for chunk in range(chunks)]))
+
+        offsets = array('q', [0])
+        neighbors = array('I')
+        for row_offsets, row_neighbors in rows:
+            base = len(neighbors)
+            offsets.extend(base + offset for offset in row_offsets[1:])
+            neighbors += row_neighbors
+        return cls(offsets, neighbors)
+
+    @classmethod
+    def read_edge_list(cls, file_name, size=None):
+        ''' Reads a text file with one "source target" pair of ids per line. Blank
+        lines and lines starting with # are skipped.
+
+        Args:
+            size (int): Number of people, one more than the largest id when None.
+                Every id must be below it.
+        '''
+        sources = array('I')
+        targets = array('I')
+        with open(file_name) as f:
+            for number, line in enumerate(f, 1):
+                fields = line.split()
+                if not fields or fields[0].startswith('#'):
+                    continue
+                if len(fields) < 2:
+                    raise ValueError(f"{file_name} line {number}: expected two ids, got {line.strip()!r}")
+                for field in fields[:2]:
+                    index = int(field)
+                    if index < 0 or (size is not None and index >= size):
+                        raise ValueError(f"{file_name} line {number}: id {index} is not one of {size} people")
+                sources.append(int(fields[0]))
+                targets.append(int(fields[1]))
+        if size is None:
+            size = max(max(sources, default=-1), max(targets, default=-1)) + 1
+        return cls.from_edges(size, sources, targets)
+
+    @classmethod
+    def load(cls, file_name):
+        ''' Reads a network written by save(). '''
+        with open(file_name, 'rb') as f:
+            magic, size, entries = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{file_name} is not a contact network file")
+            offsets = array('q', bytes(8 * (size + 1)))
+            neighbors = array('I', bytes(4 * entries))
+            if f.readinto(offsets) != 8 * (size + 1) or f.readinto(neighbors) != 4 * entries:
+                raise ValueError(f"{file_name} is truncated")
+        return cls(offsets, neighbors)
+
+    def save(self, file_name):
+        with open(file_name, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(self), len(self.neighbors)))
+            f.write(self.offsets)
+            f.write(self.neighbors)
+
+
+def _split_ends(size, width, chunks, sources, targets):
+    ''' Checks a slice of the edges and splits both ends of each among chunks
+    ranges of width people, by the person the end belongs to. Self-loops are
+    dropped.
+
+    Returns:
+        list: For every range, the people and the neighbor of each end in it.
+    '''
+    ends = [(array('I'), array('I')) for _ in range(chunks)]
+    for source, target in zip(sources, targets):
+        if not (0 <= source < size and 0 <= target < size):
+            raise ValueError(f"edge {source}-{target} is not between two of {size} people")
+        if source == target:
+            continue
+        people, others = ends[source // width]
+        people.append(source)
+        others.append(target)
+        people, others = ends[target // width]
+        people.append(target)
+        others.append(source)
+    return ends
+
+
+def _sort_rows(start, end, parts):
+    ''' Counting sort of the ends of people start to end, from every part split by
+    _split_ends, into offsets counted from start and neighbors. A neighbor listed
+    more than once is kept where it first appears.
+    '''
+    offsets = array('q', bytes(8 * (end - start + 1)))
+    for people, _ in parts:
+        for person in people:
+            offsets[person - start + 1] += 1
+    for index in range(end - start):
+        offsets[index + 1] += offsets[index]
+
+    neighbors = array('I', bytes(4 * offsets[-1]))
+    fill = offsets[:-1]
+    for people, others in parts:
+        for person, other in zip(people, others):
+            neighbors[fill[person - start]] = other
+            fill[person - start] += 1
+
+    unique_offsets = array('q', [0])
+    unique = array('I')
+    for index in range(end - start):
+        unique.extend(dict.fromkeys(neighbors[offsets[index]:offsets[index + 1]]))
+        unique_offsets.append(len(unique))
+    return unique_offsets, unique
+
+
+def _ring_edges(size, k, p, seed, start, end):
+    ''' Small-world edges of people start to end: each links to its k // 2 next
+    neighbors around the ring, and each link is rewired to a random person with
+    probability p.
+    '''
+    rng = random.Random(seed)
+    sources = array('I')
+    targets = array('I')
+    for source in range(start, end):
+        for step in range(1, k // 2 + 1):
+            target = (source + step) % size
+            if rng.random() < p:
+                target = rng.randrange(size - 1)
+                if target >= source:
+                    target += 1
+            sources.append(source)
+            targets.append(target)
+    return sources, targets
+
+
+def small_world(size, k=10, p=0.1, seed=None, processes=None):
+    ''' Watts-Strogatz small-world network. The ring is cut into chunks that worker
+    processes generate in parallel, each from its own random stream, so the result
+    depends only on the seed and the number of chunks.
+
+    Args:
+        k (int): Ring neighbors of every person before rewiring.
+        p (float): Chance that each ring link is rewired.
+        processes (int): Worker processes, every core when None; 1 generates in
+            this process.
+    '''
+    processes = processes or os.cpu_count()
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    chunks = max(1, min(processes, size // 10000))
+    bounds = [size * chunk // chunks for chunk in range(chunks + 1)]
+    seeds = spawn_seeds(seed, chunks)
+    jobs = [(size, k, p, seeds[chunk], bounds[chunk], bounds[chunk + 1]) for chunk in range(chunks)]
+
+    if processes == 1 or chunks == 1:
+        parts = [_ring_edges(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            parts = list(pool.map(_ring_edges, *zip(*jobs)))
+
+    sources = array('I')
+    targets = array('I')
+    for part_sources, part_targets in parts:
+        sources += part_sources
+        targets += part_targets
+    return ContactNetwork.from_edges(size, sources, targets, processes)
+
+
+def scale_free(size, m=3, seed=None):
+    ''' Barabasi-Albert scale-free network: each new person links to m people already
+    in the network, chosen in proportion to how many links they have. Each choice
+    depends on all the links before it, so this generator runs in one process.
+    '''
+    rng = random.Random(seed)
+    sources = array('I')
+    targets = array('I')
+    ends = array('I', range(min(m, size))) # every link end so far, for preferential picks
+    for source in range(m, size):
+        chosen = set()
+        while len(chosen) < m:
+            chosen.add(ends[rng.randrange(len(ends))])
+        for target in chosen:
+            sources.append(source)
+            targets.append(target)
+            ends.append(target)
+            ends.append(source)
+    return ContactNetwork.from_edges(size, sources, targets)
+
+
+def layered(size, household_size=4, workplace_size=20, seed=None):
+    ''' Household and workplace layers: people are shuffled into households and,
+    separately, into workplaces, and everyone is linked to everyone else in both.
+    '''
+    rng = random.Random(seed)
+    sources = array('I')
+    targets = array('I')
+    for group_size in (household_size, workplace_size):
+        people = list(range(size))
+        rng.shuffle(people)
+        for start in range(0, size, group_size):
+            group = people[start:start + group_size]
+            for i, source in enumerate(group):
+                for target in group[i + 1:]:
+                    sources.append(source)
+                    targets.append(target)
+    return ContactNetwork.from_edges(size, sources, targets)
@@ -0,0 +1,94 @@
+import os
+from array import array
+from virus import Virus
+from simulation import Simulation
+from network import ContactNetwork, small_world, scale_free, layered
+import pytest
+
+def test_from_edges():
+    network = ContactNetwork.from_edges(5, array('I', [0, 0, 1, 3]), array('I', [1, 2, 2, 4]))
+    assert len(network) == 5
+    assert network.edge_count == 4
+    assert list(network.offsets) == [0, 2, 4, 6, 7, 8]
+    assert sorted(network.neighbors_of(0)) == [1, 2]
+    assert sorted(network.neighbors_of(2)) == [0, 1]
+    assert list(network.neighbors_of(4)) == [3]
+    assert network.degree(1) == 2
+
+    #self-loops and repeated edges are dropped
+    network = ContactNetwork.from_edges(3, [0, 1, 1, 2], [1, 0, 1, 2])
+    assert network.edge_count == 1
+    assert list(network.offsets) == [0, 1, 2, 2]
+    with pytest.raises(ValueError):
+        ContactNetwork.from_edges(3, [0], [3])
+
+#Test that edges sorted in worker processes build the same network
+def test_from_edges_processes():
+    ring = small_world(50000, k=8, p=0.1, seed=2, processes=1)
+    sources = array('I', (index for index in range(len(ring)) for _ in range(ring.degree(index))))
+    serial = ContactNetwork.from_edges(len(ring), sources, ring.neighbors, processes=1)
+    parallel = ContactNetwork.from_edges(len(ring), sources, ring.neighbors, processes=2)
+    assert serial.offsets == ring.offsets
+    assert parallel.offsets == serial.offsets
+    assert parallel.neighbors == serial.neighbors
+
+def test_files():
+    with open('test_edges.txt', 'w') as f:
+        f.write("# two triangles\n0 1\n1 2\n2 0\n\n3 4\n4 5\n5 3\n")
+    network = ContactNetwork.read_edge_list('test_edges.txt')
+    assert len(network) == 6
+    assert sorted(network.neighbors_of(4)) == [3, 5]
+    with pytest.raises(ValueError, match="line 3: id 2 is not one of 2 people"):
+        ContactNetwork.read_edge_list('test_edges.txt', size=2)
+
+    network.save('test_network.bin')
+    loaded = ContactNetwork.load('test_network.bin')
+    assert loaded.offsets == network.offsets
+    assert loaded.neighbors == network.neighbors
+
+    with pytest.raises(ValueError):
+        ContactNetwork.load('test_edges.txt')
+
+    os.remove('test_edges.txt')
+    os.remove('test_network.bin')
+
+def test_generators():
+    ring = small_world(30000, k=6, p=0.1, seed=1, processes=2)
+    assert ring.edge_count == 30000 * 3
+    assert small_world(30000, k=6, p=0.1, seed=1, processes=2).neighbors == ring.neighbors
+    assert sorted(small_world(1000, k=4, p=0.0, seed=1, processes=1).neighbors_of(10)) == [8, 9, 11, 12]
+
+    hubs = scale_free(2000, m=3, seed=1)
+    assert hubs.edge_count == (2000 - 3) * 3
+    assert max(hubs.degree(index) for index in range(2000)) > 30
+
+    groups = layered(100, household_size=4, workplace_size=10, seed=1)
+    #people who share a household and a workplace are linked once
+    assert groups.edge_count <= 25 * 6 + 10 * 45
+    assert all(len(set(groups.neighbors_of(index))) == groups.degree(index) for index in range(100))
+    assert all(groups.degree(index) >= 3 for index in range(100))
+
+#Test that infections only spread along the network
+@pytest.mark.parametrize("interaction_mode", Simulation.INTERACTION_MODES)
+def test_network_simulation(interaction_mode):
+    #two separate triangles with everyone else isolated
+    network = ContactNetwork.from_edges(100, array('I', [0, 1, 2, 50, 51, 52]), array('I', [1, 2, 0, 51, 52, 50]))
+    v = Virus("Network", .5, .1)
+    sim = Simulation(100, 0, v, initial_infected=1, interaction_mode=interaction_mode, rng=1,
+                     network=network, verbose=False)
+    sim.run()
+
+    assert sim.total_infected <= 3
+    assert all(sim.population[index].is_vaccinated is False for index in range(3, 100))
+    with open(sim.file_name) as f:
+        lines = f.readlines()
+    interactions = [line for line in lines if "infect" in line]
+    assert interactions
+    for line in interactions:
+        ids = [int(word) for word in line.split() if word.isdigit()]
+        assert set(ids) <= {0, 1, 2}
+
+    with pytest.raises(ValueError):
+        Simulation(50, 0, v, network=network)
+
+    os.remove(sim.file_name)
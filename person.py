@@ -1,11 +1,16 @@
 
 import random
 from virus import Virus
-random.seed(42)
 
 
 class Person(object):
-    """Person objects will populate the simulation."""
+    """Person objects will populate the simulation.
+
+    Attributes live in __slots__ instead of a per-instance __dict__, which keeps
+    each Person small when many are created.
+    """
+
+    __slots__ = ("_id", "is_alive", "is_vaccinated", "infection")
 
     def __init__(self, _id, is_vaccinated, infection=None):
         """
@@ -23,15 +28,16 @@ class Person(object):
         self.is_vaccinated = is_vaccinated  # boolean
         self.infection = infection # Virus object or None
 
-    def did_survive_infection(self):
+    def did_survive_infection(self, rng=random):
         """
-        Generate a random number and compare to virus's mortality_rate.
+        Generate a random number from rng (the random module unless the
+        simulation passes its own generator) and compare to virus's mortality_rate.
         If random number is smaller, person dies from the disease.
         If Person survives, they become vaccinated and they have no infection.
         Return a boolean value indicating whether they survived the infection.
         """
         #Person Survived
-        if random.random() > self.infection.mortality_rate:
+        if rng.random() > self.infection.mortality_rate:
             self.is_vaccinated = True
             self.infection = None
             return True
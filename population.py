@@ -0,0 +1,322 @@
+import struct
+from array import array
+from itertools import compress
+from person import Person
+
+# State files hold this header, then the is_alive, is_vaccinated and infected flags
+# one byte per person, so they can be read straight into the arrays or memory-mapped.
+STATE_MAGIC = b"HERDPOP1"
+STATE_HEADER = struct.Struct('<8sQ')
+
+
+class Population(object):
+    ''' Stores every person in the simulation as contiguous arrays instead of one
+    Person object each.
+
+    Row i of every array describes the person with _id i. Flags are kept in
+    bytearrays (one byte per person) so whole-population counts run in C through
+    bytearray.count instead of walking Person objects in the interpreter. Ids are a
+    range, since the person in row i always has _id i, and the living index uses
+    4-byte entries while ids fit, so a person costs 11 bytes.
+
+    num_alive, num_infected and num_vaccinated_alive are running totals, so reading
+    them costs nothing. living holds the id of every living person (in no particular
+    order) for partner sampling, and active holds the ids of the living infected, so
+    a time step only touches people who matter to it. Flags must be changed through
+    set_alive, set_vaccinated and set_infected (or a PersonView) to keep the totals
+    and indexes in sync; code that writes the arrays in bulk calls reindex() after.
+    The count_* methods recount by scanning the arrays.
+    '''
+
+    def __init__(self, size, virus=None):
+        self.virus = virus # Virus object shared by every infected person
+        self._id = range(size)
+        self.is_alive = bytearray(b'\x01') * size
+        self.is_vaccinated = bytearray(size)
+        self.infected = bytearray(size)
+        self.num_alive = size # Int
+        self.num_infected = 0 # Int
+        self.num_vaccinated_alive = 0 # Int
+        self._typecode = 'I' if size <= 0xFFFFFFFF else 'q'
+        self.living = array(self._typecode, range(size)) # ids of living people
+        self._living_position = array(self._typecode, range(size)) # where each id sits in living
+        self.active = set() # ids of living infected people
+
+    @classmethod
+    def from_counts(cls, size, vaccinated, infected, virus=None, rng=None):
+        ''' Builds a population with the given numbers of vaccinated and infected
+        people, setting whole runs of the flag arrays at once.
+
+        Args:
+            rng: None puts the vaccinated people first and the infected right after
+                them. A random generator places both at random, sampling whichever of
+                the vaccinated or unvaccinated people is the smaller group.
+
+        Raises ValueError unless there are enough unvaccinated people to infect.
+
+        Returns:
+            Population: The new population.
+        '''
+        if vaccinated < 0 or infected < 0 or vaccinated + infected > size:
+            raise ValueError(f"cannot place {vaccinated} vaccinated and {infected} infected people "
+                             f"in a population of {size}")
+        population = cls(size, virus)
+        is_vaccinated = population.is_vaccinated
+        if rng is None:
+            is_vaccinated[:vaccinated] = b'\x01' * vaccinated
+            population.infected[vaccinated:vaccinated + infected] = b'\x01' * infected
+        elif vaccinated <= size // 2:
+            chosen = rng.sample(range(size), vaccinated + infected)
+            for index in chosen[:vaccinated]:
+                is_vaccinated[index] = 1
+            for index in chosen[vaccinated:]:
+                population.infected[index] = 1
+        else:
+            is_vaccinated[:] = b'\x01' * size
+            unvaccinated = rng.sample(range(size), size - vaccinated)
+            for index in unvaccinated:
+                is_vaccinated[index] = 0
+            for index in unvaccinated[:infected]:
+                population.infected[index] = 1
+        population.reindex()
+        return population
+
+    @classmethod
+    def from_state(cls, is_alive, is_vaccinated, infected, virus=None):
+        ''' Builds a population from precomputed flag arrays, one byte (0 or 1) per
+        person, in any bytes-like form.
+        '''
+        if not len(is_alive) == len(is_vaccinated) == len(infected):
+            raise ValueError("state arrays must all be the same length")
+        population = cls(len(is_alive), virus)
+        population.is_alive[:] = is_alive
+        population.is_vaccinated[:] = is_vaccinated
+        population.infected[:] = infected
+        for flags in (population.is_alive, population.is_vaccinated, population.infected):
+            if flags.count(0) + flags.count(1) != len(flags):
+                raise ValueError("state arrays must only hold 0 and 1")
+        population.reindex()
+        return population
+
+    @classmethod
+    def load(cls, file_name, virus=None):
+        ''' Reads a population written by save(). '''
+        with open(file_name, 'rb') as f:
+            return cls.read_state(f, virus)
+
+    def save(self, file_name):
+        ''' Writes the flag arrays to a state file that load() can read back. '''
+        with open(file_name, 'wb') as f:
+            self.write_state(f)
+
+    @classmethod
+    def read_state(cls, f, virus=None):
+        ''' Reads a population from the state written by write_state at the current
+        position of the binary file f.
+        '''
+        magic, size = STATE_HEADER.unpack(f.read(STATE_HEADER.size))
+        if magic != STATE_MAGIC:
+            raise ValueError(f"{f.name} is not a population state file")
+        population = cls(size, virus)
+        for flags in (population.is_alive, population.is_vaccinated, population.infected):
+            if f.readinto(flags) != size:
+                raise ValueError(f"{f.name} is truncated")
+        population.reindex()
+        return population
+
+    def write_state(self, f):
+        ''' Writes the state header and flag arrays to the binary file f. '''
+        f.write(STATE_HEADER.pack(STATE_MAGIC, len(self)))
+        f.write(self.is_alive)
+        f.write(self.is_vaccinated)
+        f.write(self.infected)
+
+    def restore_living(self, living):
+        ''' Replaces the living index with an earlier copy of it, so partners are drawn
+        in exactly the order they were before. living must hold the same ids as the
+        current index.
+        '''
+        if len(living) != self.num_alive:
+            raise ValueError("living index does not match the population")
+        self.living = array(self._typecode, living)
+        for position, index in enumerate(self.living):
+            self._living_position[index] = position
+
+    def __len__(self):
+        return len(self._id)
+
+    def __getitem__(self, index):
+        ''' Returns a PersonView for the person stored at index. '''
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("population index out of range")
+        return PersonView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield PersonView(self, index)
+
+    def reindex(self):
+        ''' Rebuilds the running totals and indexes by scanning the flag arrays. '''
+        self.num_alive = self.count_alive()
+        self.num_infected = self.count_infected()
+        self.num_vaccinated_alive = self.count_vaccinated_alive()
+
+        if self.num_alive == len(self):
+            #A full living index already holds everyone
+            if len(self.living) != len(self):
+                self.living = array(self._typecode, range(len(self)))
+                self._living_position = array(self._typecode, range(len(self)))
+        else:
+            self.living = array(self._typecode, compress(range(len(self)), self.is_alive))
+            self._living_position = array(self._typecode, bytes(array(self._typecode).itemsize * len(self)))
+            for position, index in enumerate(self.living):
+                self._living_position[index] = position
+
+        is_alive = self.is_alive
+        infected = self.infected
+        self.active = set()
+        index = infected.find(1)
+        while index != -1:
+            if is_alive[index]:
+                self.active.add(index)
+            index = infected.find(1, index + 1)
+
+    def set_alive(self, index, value):
+        value = 1 if value else 0
+        change = value - self.is_alive[index]
+        if not change:
+            return
+        self.is_alive[index] = value
+        self.num_alive += change
+        if self.is_vaccinated[index]:
+            self.num_vaccinated_alive += change
+
+        if value:
+            self._living_position[index] = len(self.living)
+            self.living.append(index)
+            if self.infected[index]:
+                self.active.add(index)
+        else:
+            #Move the last living id into the hole left by this one
+            position = self._living_position[index]
+            last = self.living.pop()
+            if last != index:
+                self.living[position] = last
+                self._living_position[last] = position
+            self.active.discard(index)
+
+    def set_vaccinated(self, index, value):
+        value = 1 if value else 0
+        change = value - self.is_vaccinated[index]
+        if change:
+            self.is_vaccinated[index] = value
+            if self.is_alive[index]:
+                self.num_vaccinated_alive += change
+
+    def set_infected(self, index, value):
+        value = 1 if value else 0
+        change = value - self.infected[index]
+        if not change:
+            return
+        self.infected[index] = value
+        self.num_infected += change
+        if not value:
+            self.active.discard(index)
+        elif self.is_alive[index]:
+            self.active.add(index)
+
+    def infected_ids(self):
+        ''' Returns a list of the ids of every living infected person in id order. '''
+        return sorted(self.active)
+
+    def count_alive(self):
+        return self.is_alive.count(1)
+
+    def count_dead(self):
+        return len(self) - self.is_alive.count(1)
+
+    def count_infected(self):
+        return self.infected.count(1)
+
+    def count_vaccinated_alive(self, chunk_size=1 << 20):
+        ''' Counts people that are both alive and vaccinated by and-ing the two flag
+        arrays as big integers, which keeps the work out of the interpreter loop.
+        Flags are 0 or 1 per byte, so the bytes of the result can be counted as they
+        are. The arrays are taken chunk_size people at a time, so the temporaries stay
+        small however big the population is.
+        '''
+        total = 0
+        for start in range(0, len(self.is_alive), chunk_size):
+            end = start + chunk_size
+            both = (int.from_bytes(self.is_alive[start:end], 'little')
+                    & int.from_bytes(self.is_vaccinated[start:end], 'little'))
+            total += both.to_bytes(min(end, len(self.is_alive)) - start, 'little').count(1)
+        return total
+
+    def check_counts(self):
+        ''' Recounts the population with a full scan and checks the running totals
+        and indexes against it.
+        '''
+        assert self.num_alive == self.count_alive(), "num_alive is out of sync"
+        assert self.num_infected == self.count_infected(), "num_infected is out of sync"
+        assert self.num_vaccinated_alive == self.count_vaccinated_alive(), "num_vaccinated_alive is out of sync"
+        assert sorted(self.living) == list(compress(range(len(self)), self.is_alive)), "living is out of sync"
+        assert all(self.living[self._living_position[index]] == index for index in self.living), "living positions are out of sync"
+        assert self.active == {index for index in self.living if self.infected[index]}, "active is out of sync"
+
+
+class PersonView(Person):
+    ''' Person adapter that reads and writes one row of a Population.
+
+    Existing callers (Logger, the tests) keep using person._id, person.is_alive,
+    person.is_vaccinated and person.infection, while the data itself lives in the
+    population arrays.
+    '''
+
+    __slots__ = ("_population", "_index")
+
+    def __init__(self, population, index):
+        self._population = population
+        self._index = index
+
+    @property
+    def _id(self):
+        return self._population._id[self._index]
+
+    @property
+    def is_alive(self):
+        return self._population.is_alive[self._index] == 1
+
+    @is_alive.setter
+    def is_alive(self, value):
+        self._population.set_alive(self._index, value)
+
+    @property
+    def is_vaccinated(self):
+        return self._population.is_vaccinated[self._index] == 1
+
+    @is_vaccinated.setter
+    def is_vaccinated(self, value):
+        self._population.set_vaccinated(self._index, value)
+
+    @property
+    def infection(self):
+        if self._population.infected[self._index]:
+            return self._population.virus
+        return None
+
+    @infection.setter
+    def infection(self, virus):
+        if virus is not None:
+            self._population.virus = virus
+        self._population.set_infected(self._index, virus is not None)
+
+    def __eq__(self, other):
+        if isinstance(other, PersonView):
+            return self._population is other._population and self._index == other._index
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self._population), self._index))
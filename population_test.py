@@ -0,0 +1,184 @@
+import os, random
+from person import Person
+from population import Population, STATE_HEADER
+from virus import Virus
+import pytest
+
+#Test constructor
+def test_constructor():
+    v = Virus("Test", .25, .25)
+    population = Population(10, v)
+    assert len(population) == 10
+    assert population.virus is v
+    assert population.count_alive() == 10
+    assert population.count_dead() == 0
+    assert population.count_infected() == 0
+    assert population.count_vaccinated_alive() == 0
+
+#Test that person views read and write the population arrays
+def test_person_view():
+    v = Virus("Test", .25, .25)
+    population = Population(10, v)
+    person = population[3]
+
+    assert isinstance(person, Person)
+    assert person._id == 3
+    assert person.is_alive is True
+    assert person.is_vaccinated is False
+    assert person.infection is None
+
+    person.infection = v
+    person.is_vaccinated = True
+    assert population.infected[3] == 1
+    assert population.is_vaccinated[3] == 1
+    assert population[3].infection is v
+
+    person.is_alive = False
+    assert population.is_alive[3] == 0
+    assert population[-7] == person
+
+    with pytest.raises(IndexError):
+        population[10]
+
+def test_counts():
+    v = Virus("Test", .25, .25)
+    population = Population(10, v)
+
+    for person in population:
+        if person._id < 4:
+            person.is_vaccinated = True
+        if person._id in (4, 5):
+            person.infection = v
+
+    #kill off a vaccinated person and an infected person
+    population[0].is_alive = False
+    population[5].is_alive = False
+
+    assert population.count_dead() == 2
+    assert population.count_alive() == 8
+    assert population.count_vaccinated_alive() == 3
+    #counted a few people at a time, including a short last chunk
+    assert population.count_vaccinated_alive(chunk_size=3) == 3
+    assert population.count_infected() == 2
+    assert population.infected_ids() == [4]
+
+def test_did_survive_infection():
+    v = Virus("Test", .25, .5)
+    population = Population(10, v)
+    person = population[2]
+    person.infection = v
+
+    survived = person.did_survive_infection()
+    assert population.infected[2] == 0
+    if survived:
+        assert population.is_alive[2] == 1
+        assert population.is_vaccinated[2] == 1
+    else:
+        assert population.is_alive[2] == 0
+        assert population.is_vaccinated[2] == 0
+
+def test_running_totals():
+    v = Virus("Test", .25, .25)
+    population = Population(10, v)
+
+    population[1].is_vaccinated = True
+    population[1].is_vaccinated = True
+    population[2].infection = v
+    population[2].infection = v
+    assert population.num_vaccinated_alive == 1
+    assert population.num_infected == 1
+
+    #vaccinated person dies, then is set dead again
+    population[1].is_alive = False
+    population[1].is_alive = False
+    assert population.num_alive == 9
+    assert population.num_vaccinated_alive == 0
+
+    population[2].did_survive_infection()
+    population.check_counts()
+
+    #writing the arrays directly without updating the totals is caught
+    population.infected[5] = 1
+    with pytest.raises(AssertionError):
+        population.check_counts()
+
+def test_living_and_active_index():
+    v = Virus("Test", .25, .25)
+    population = Population(10, v)
+    population[3].infection = v
+    population[7].infection = v
+    assert population.active == {3, 7}
+
+    #dead people leave both indexes
+    population[7].is_alive = False
+    population[0].is_alive = False
+    assert population.active == {3}
+    assert sorted(population.living) == [1, 2, 3, 4, 5, 6, 8, 9]
+
+    #coming back to life restores them
+    population[7].is_alive = True
+    assert population.infected_ids() == [3, 7]
+    population.check_counts()
+
+    #bulk writes are picked up by reindex
+    population.infected[5] = 1
+    population.is_alive[2] = 0
+    population.reindex()
+    assert population.infected_ids() == [3, 5, 7]
+    assert 2 not in population.living
+    population.check_counts()
+
+#Test that people carry no per-instance __dict__
+def test_slots():
+    v = Virus("Test", .25, .25)
+    assert not hasattr(Person(1, False, v), "__dict__")
+    assert not hasattr(Population(10, v)[3], "__dict__")
+    with pytest.raises(AttributeError):
+        Person(1, False).nickname = "Bob"
+
+def test_from_counts():
+    v = Virus("Test", .25, .25)
+    ordered = Population.from_counts(10, 4, 2, v)
+    assert list(ordered.is_vaccinated) == [1, 1, 1, 1, 0, 0, 0, 0, 0, 0]
+    assert ordered.infected_ids() == [4, 5]
+
+    #random placement, sampling the vaccinated or the unvaccinated side
+    for vaccinated in (30, 80):
+        population = Population.from_counts(100, vaccinated, 5, v, random.Random(1))
+        population.check_counts()
+        assert population.num_vaccinated_alive == vaccinated
+        assert population.num_infected == 5
+        assert not any(population.is_vaccinated[index] for index in population.active)
+    assert Population.from_counts(100, 30, 5, v, random.Random(1)).infected_ids() != [30, 31, 32, 33, 34]
+
+    #there must be enough unvaccinated people to infect, whichever the placement
+    for rng in (None, random.Random(1)):
+        with pytest.raises(ValueError):
+            Population.from_counts(10, 8, 3, v, rng)
+
+def test_from_state_and_files():
+    v = Virus("Test", .25, .25)
+    population = Population.from_state(b'\x01\x01\x00\x01', b'\x00\x01\x00\x00', b'\x01\x00\x00\x01', v)
+    population.check_counts()
+    assert population.infected_ids() == [0, 3]
+    assert population.num_alive == 3
+
+    with pytest.raises(ValueError):
+        Population.from_state(b'\x01\x01', b'\x00', b'\x00\x00')
+    with pytest.raises(ValueError):
+        Population.from_state(b'\x02', b'\x00', b'\x00')
+
+    population.save('test_state.bin')
+    loaded = Population.load('test_state.bin', v)
+    loaded.check_counts()
+    assert loaded.is_alive == population.is_alive
+    assert loaded.is_vaccinated == population.is_vaccinated
+    assert loaded.infected == population.infected
+    assert loaded.virus is v
+
+    with open('test_state.bin', 'r+b') as f:
+        f.truncate(STATE_HEADER.size + 5)
+    with pytest.raises(ValueError):
+        Population.load('test_state.bin')
+
+    os.remove('test_state.bin')
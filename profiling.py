@@ -0,0 +1,55 @@
+import json
+import os
+
+PHASES = ("should_continue", "interactions", "survival", "logging", "infect_newly_infected")
+
+
+class StepProfile(object):
+    ''' Wall time and call count of every phase of one time step, and the state of the
+    population when the step ended.
+
+    calls counts the work each phase did: interactions resolved, survival rolls,
+    newly infected people processed, or 1 for the termination check and the time step
+    log line.
+    '''
+
+    def __init__(self, time_step):
+        self.time_step = time_step # Int
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self.counts = {}
+
+    def add(self, phase, seconds, calls):
+        self.seconds[phase] += seconds
+        self.calls[phase] += calls
+
+    @property
+    def total_seconds(self):
+        return sum(self.seconds.values())
+
+    def as_dict(self):
+        return {"time_step": self.time_step, "seconds": self.seconds, "calls": self.calls,
+                "counts": self.counts}
+
+
+class ProfileWriter(object):
+    ''' Observer that writes every StepProfile it is given as one line of JSON.
+
+    A writer starting at a later step keeps the lines of the earlier steps and
+    replaces the rest, so a run resumed from a checkpoint carries on the same file.
+    '''
+
+    def __init__(self, file_name, start_step=0):
+        self.file_name = file_name
+        kept = []
+        if start_step and os.path.exists(file_name):
+            with open(file_name) as f:
+                kept = [line for line in f if json.loads(line)["time_step"] < start_step]
+        self._file = open(file_name, 'w')
+        self._file.writelines(kept)
+
+    def __call__(self, profile):
+        self._file.write(json.dumps(profile.as_dict()) + "\n")
+
+    def close(self):
+        self._file.close()
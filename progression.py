@@ -0,0 +1,108 @@
+from simulation import Simulation
+from virus import Progression
+
+#Stage changes, in the order a course of infection goes through them
+BECOME_INFECTIOUS = 0
+END_INFECTIOUS = 1
+RESOLVE = 2
+
+
+class ProgressionSimulation(Simulation):
+    ''' Runs Simulation with the multi-step course of infection in virus.progression:
+    a latent stage, an infectious stage and a recovery stage, each lasting a number of
+    time steps drawn per person, with survival rolled when recovery ends.
+
+    Stage changes are kept in a bucket queue: due maps each time step to the list of
+    (person id, change) pairs that fall due at its end, with one change queued per
+    sick person. A step therefore only visits the people whose stage changes, plus
+    the infectious people's interactions, however long the stages are. People
+    infected at the start are infectious from the first step. A stage of length 0
+    is passed through in the same step, so the default Progression gives exactly
+    the course and the random draws of Simulation.
+    Checkpoints are not supported.
+    '''
+
+    PROGRESSION = True
+
+    def __init__(self, population_size, v_percentage, v, *args, **kwargs):
+        self.progression = v.progression or Progression() # Progression of every infection
+        if kwargs.get("checkpoint_every"):
+            raise ValueError("ProgressionSimulation does not support checkpoints")
+        self.due = {} # time step -> [(person id, stage change)] due at its end
+        self.infectious = set() # ids of the people interacting each step
+        super().__init__(population_size, v_percentage, v, *args, **kwargs)
+        for person_id in self.population.infected_ids():
+            self._become_infectious(person_id, -1)
+
+    def save_checkpoint(self, file_name=None):
+        raise ValueError("ProgressionSimulation does not support checkpoints")
+
+    def _infectious_ids(self):
+        return sorted(self.infectious)
+
+    def _schedule(self, person_id, change, stage, time_step):
+        ''' Queues change for the end of the stage that starts after time_step, or
+        makes it straight away if the stage lasts no time.
+        '''
+        length = self.progression.draw(stage, self.rng)
+        if length:
+            self.due.setdefault(time_step + length, []).append((person_id, change))
+        elif change == BECOME_INFECTIOUS:
+            self._become_infectious(person_id, time_step)
+        elif change == END_INFECTIOUS:
+            self._end_infectious(person_id, time_step)
+        else:
+            self._resolve(person_id)
+
+    def _become_infectious(self, person_id, time_step):
+        self.infectious.add(person_id)
+        self._schedule(person_id, END_INFECTIOUS, "infectious", time_step)
+
+    def _end_infectious(self, person_id, time_step):
+        self.infectious.discard(person_id)
+        self._schedule(person_id, RESOLVE, "recovery", time_step)
+
+    def _resolve(self, person_id):
+        ''' Rolls whether person_id survives their infection, as Simulation does. '''
+        population = self.population
+        population.set_infected(person_id, 0)
+        self.current_infected -= 1
+
+        #Person survived infection -> becomes vaccinated
+        if self.rng.random() > self.virus.mortality_rate:
+            population.set_vaccinated(person_id, 1)
+            if self.log_events:
+                self.logger.log_infection_survival(population[person_id], False)
+        #Person has died
+        else:
+            population.set_alive(person_id, 0)
+            if self.log_events:
+                self.logger.log_infection_survival(population[person_id], True)
+            self.total_dead += 1
+            self.newly_dead.append(person_id)
+
+    def _survival_phase(self):
+        ''' Makes the stage changes due at the end of this step, in id order. '''
+        time_step = self.time_step_counter
+        for person_id, change in sorted(self.due.pop(time_step, ())):
+            if change == BECOME_INFECTIOUS:
+                self._become_infectious(person_id, time_step)
+            elif change == END_INFECTIOUS:
+                self._end_infectious(person_id, time_step)
+            else:
+                self._resolve(person_id)
+
+    def _infect_newly_infected(self):
+        ''' Infects each newly exposed person once and starts their latent stage. '''
+        population = self.population
+        infected = population.infected
+        time_step = self.time_step_counter
+        for person_id in self.newly_infected:
+            if not infected[person_id]:
+                population.set_infected(person_id, 1)
+                self.current_infected += 1
+                self.total_infected += 1
+                self._schedule(person_id, BECOME_INFECTIOUS, "latent", time_step)
+
+        self.newly_infected = []
+        self.newly_dead = []
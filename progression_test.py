@@ -0,0 +1,54 @@
+import os
+from logger import SUMMARY
+from virus import Virus, Progression
+from simulation import Simulation
+from progression import ProgressionSimulation
+import pytest
+
+#Test that the default one-step course reproduces Simulation exactly
+@pytest.mark.parametrize("interaction_mode", Simulation.INTERACTION_MODES)
+def test_default_matches_simulation(interaction_mode):
+    results = []
+    for engine, progression in ((Simulation, None), (ProgressionSimulation, Progression())):
+        v = Virus("Course", .3, .3, progression)
+        sim = engine(1000, .5, v, initial_infected=5, interaction_mode=interaction_mode, log_level=SUMMARY,
+                     file_name=os.devnull, verbose=False, rng=5)
+        sim.run()
+        results.append((sim.time_step_counter, sim.total_infected, sim.total_dead, sim.vaccine_saved))
+    assert results[0] == results[1]
+
+#Test that people only spread during their infectious stage
+def test_stages():
+    v = Virus("Stages", .3, .2, Progression(latent=2, infectious=3, recovery={1: 1, 2: 1}))
+    sim = ProgressionSimulation(2000, .25, v, initial_infected=3, interaction_mode="batched", debug=True,
+                                log_level=SUMMARY, file_name=os.devnull, verbose=False, rng=2)
+    assert sim.infectious == {500, 501, 502}
+    assert sim.due == {2: [(500, 1), (501, 1), (502, 1)]}
+
+    #the first people infected are latent through steps 1 and 2, and the first
+    #infectious people stop spreading after step 2
+    sim.time_step()
+    sim._infect_newly_infected()
+    sim.time_step_counter += 1
+    first = {person_id for person_id in sim.population.infected_ids() if person_id not in (500, 501, 502)}
+    assert first and not first & sim.infectious
+    assert sorted(sim.due[2]) == sorted([(500, 1), (501, 1), (502, 1)] + [(person_id, 0) for person_id in first])
+
+    sim.run()
+    sim.population.check_counts()
+    assert not sim.due and not sim.infectious
+    assert sim.total_dead == sim.population.count_dead()
+    #each course lasts at least six steps
+    assert sim.time_step_counter >= 6
+
+    with pytest.raises(ValueError):
+        Simulation(100, .5, v, file_name=os.devnull)
+    with pytest.raises(ValueError):
+        Progression(latent=-1)
+
+#Test that lengths drawn by a callable are checked rather than queued where no step reaches them
+@pytest.mark.parametrize("length", [-1, 1.5, True])
+def test_bad_drawn_length(length):
+    v = Virus("Staged", .3, .3, Progression(infectious=lambda rng: length))
+    with pytest.raises(ValueError):
+        ProgressionSimulation(100, .5, v, file_name=os.devnull, verbose=False).run()
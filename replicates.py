@@ -0,0 +1,205 @@
+import argparse, math, os
+from bisect import bisect_right, insort
+from logger import SUMMARY
+from rng import spawn_seeds
+from simulation import Simulation
+from virus import Virus
+
+METRICS = ("total_infected", "total_dead", "time_steps")
+
+
+class RunningStats(object):
+    ''' Mean and variance of a stream of values, updated one value at a time with
+    Welford's algorithm so no values are kept.
+    '''
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0 # sum of squared differences from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def variance(self):
+        ''' Sample variance, 0 until there are two values. '''
+        if self.count < 2:
+            return 0.0
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def ci_half_width(self, z=1.96):
+        ''' Half the width of the normal confidence interval of the mean. '''
+        if self.count < 2:
+            return math.inf
+        return z * self.std / math.sqrt(self.count)
+
+
+class P2Quantile(object):
+    ''' Streaming estimate of one quantile with the P-square algorithm of Jain and
+    Chlamtac: five markers track the minimum, the maximum, the quantile and the points
+    half way to it, so memory stays constant however many values are added.
+    '''
+
+    def __init__(self, p):
+        self.p = p # quantile to estimate, between 0 and 1
+        self.count = 0
+        self._heights = []
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, value):
+        self.count += 1
+        heights = self._heights
+        if len(heights) < 5:
+            insort(heights, value)
+            return
+
+        positions = self._positions
+        #Find the cell the value falls in, stretching the ends if it is outside
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = bisect_right(heights, value) - 1
+
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        #Move the middle markers towards where they should be
+        for i in (1, 2, 3):
+            off = self._desired[i] - positions[i]
+            if (off >= 1 and positions[i + 1] - positions[i] > 1) or (off <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if off > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def _parabolic(self, i, step):
+        heights = self._heights
+        positions = self._positions
+        return heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+            (positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i]) / (positions[i + 1] - positions[i]) +
+            (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1]) / (positions[i] - positions[i - 1]))
+
+    @property
+    def value(self):
+        ''' The current estimate, exact while five or fewer values have been added. '''
+        if not self._heights:
+            return math.nan
+        if self.count <= 5:
+            return self._heights[min(int(self.p * self.count), self.count - 1)]
+        return self._heights[2]
+
+
+class ReplicateSummary(object):
+    ''' Streaming statistics of every metric in METRICS across replicates. '''
+
+    def __init__(self, quantiles=(0.05, 0.5, 0.95)):
+        self.replicates = 0
+        self.stats = {metric: RunningStats() for metric in METRICS}
+        self.quantiles = {metric: [P2Quantile(p) for p in quantiles] for metric in METRICS}
+
+    def add(self, sim):
+        ''' Folds the final statistics of a finished Simulation into the summary. '''
+        self.replicates += 1
+        values = {"total_infected": sim.total_infected, "total_dead": sim.total_dead,
+                  "time_steps": sim.time_step_counter}
+        for metric in METRICS:
+            self.stats[metric].add(values[metric])
+            for quantile in self.quantiles[metric]:
+                quantile.add(values[metric])
+
+    def converged(self, rel_ci_width):
+        ''' True once every metric's confidence interval is at most rel_ci_width times
+        its mean wide.
+        '''
+        return all(2 * stats.ci_half_width() <= rel_ci_width * abs(stats.mean)
+                   for stats in self.stats.values())
+
+    def table(self):
+        ''' Returns one row per metric with its mean, spread and quantiles. '''
+        rows = []
+        for metric in METRICS:
+            stats = self.stats[metric]
+            row = {"metric": metric, "replicates": stats.count, "mean": stats.mean, "std": stats.std,
+                   "ci_half_width": stats.ci_half_width(), "min": stats.min, "max": stats.max}
+            for quantile in self.quantiles[metric]:
+                row[f"p{quantile.p * 100:g}"] = quantile.value
+            rows.append(row)
+        return rows
+
+
+def run_replicates(pop_size, vacc_percentage, virus, initial_infected=1, replicates=100, seed=42,
+                   rel_ci_width=None, min_replicates=10, quantiles=(0.05, 0.5, 0.95),
+                   log_file=os.devnull, **simulation_args):
+    ''' Runs up to replicates simulations of one configuration, each from its own
+    random stream, and folds each result into a ReplicateSummary as soon as it ends.
+    Finished simulations are dropped, so memory does not grow with the replicate count.
+
+    Args:
+        rel_ci_width (float): Stop early, after at least min_replicates runs, once the
+            95% confidence interval of every metric is narrower than this fraction of
+            its mean. None always runs every replicate.
+        log_file (str): Log file every replicate writes to in turn.
+        simulation_args: Passed on to Simulation.
+
+    Returns:
+        ReplicateSummary: The summary of the replicates that ran.
+    '''
+    summary = ReplicateSummary(quantiles)
+    simulation_args.setdefault("log_level", SUMMARY)
+    simulation_args.setdefault("interaction_mode", "batched")
+    for stream_seed in spawn_seeds(seed, replicates):
+        sim = Simulation(pop_size, vacc_percentage, virus, initial_infected, file_name=log_file,
+                         verbose=False, rng=stream_seed, **simulation_args)
+        sim.run()
+        summary.add(sim)
+        del sim
+
+        if rel_ci_width is not None and summary.replicates >= min_replicates and summary.converged(rel_ci_width):
+            break
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run replicates of one herd immunity simulation.")
+    parser.add_argument("pop_size", type=int)
+    parser.add_argument("vacc_percentage", type=float)
+    parser.add_argument("virus_name")
+    parser.add_argument("mortality_rate", type=float)
+    parser.add_argument("repro_rate", type=float)
+    parser.add_argument("initial_infected", type=int, nargs="?", default=1)
+    parser.add_argument("--replicates", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rel-ci-width", type=float, default=None)
+    parser.add_argument("--min-replicates", type=int, default=10)
+    args = parser.parse_args()
+
+    virus = Virus(args.virus_name, args.repro_rate, args.mortality_rate)
+    summary = run_replicates(args.pop_size, args.vacc_percentage, virus, args.initial_infected,
+                             args.replicates, args.seed, args.rel_ci_width, args.min_replicates)
+
+    print(f"Ran {summary.replicates} replicates.\n")
+    for row in summary.table():
+        print("\t".join(f"{name}={value:g}" if isinstance(value, float) else f"{name}={value}"
+                        for name, value in row.items()))
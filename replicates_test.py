@@ -0,0 +1,56 @@
+import random, statistics
+from virus import Virus
+from replicates import RunningStats, P2Quantile, run_replicates
+
+#Test Welford statistics against the statistics module
+def test_running_stats():
+    rng = random.Random(1)
+    values = [rng.gauss(10, 3) for _ in range(50)]
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+
+    assert stats.count == len(values)
+    assert abs(stats.mean - statistics.mean(values)) < 1e-9
+    assert abs(stats.variance - statistics.variance(values)) < 1e-9
+    assert stats.min == min(values)
+    assert stats.max == max(values)
+
+def test_p2_quantile():
+    rng = random.Random(2)
+    values = [rng.random() for _ in range(5000)]
+    median = P2Quantile(0.5)
+    high = P2Quantile(0.9)
+    for value in values:
+        median.add(value)
+        high.add(value)
+
+    assert abs(median.value - 0.5) < 0.03
+    assert abs(high.value - 0.9) < 0.03
+
+    #exact for the first few values
+    small = P2Quantile(0.5)
+    for value in (3, 1, 2):
+        small.add(value)
+    assert small.value == 2
+
+def test_run_replicates():
+    v = Virus("Replicates", .3, .3)
+    summary = run_replicates(500, .5, v, initial_infected=5, replicates=8, seed=1)
+    assert summary.replicates == 8
+
+    rows = {row["metric"]: row for row in summary.table()}
+    assert rows["total_infected"]["replicates"] == 8
+    assert rows["total_infected"]["min"] <= rows["total_infected"]["p50"] <= rows["total_infected"]["max"]
+    assert rows["time_steps"]["mean"] > 0
+
+    #the same seed gives the same summary
+    again = run_replicates(500, .5, v, initial_infected=5, replicates=8, seed=1)
+    assert again.table() == summary.table()
+
+def test_replicates_stop_early():
+    v = Virus("Replicates", .3, .3)
+    summary = run_replicates(500, .5, v, initial_infected=5, replicates=200, seed=1,
+                             rel_ci_width=0.5, min_replicates=5)
+    assert 5 <= summary.replicates < 200
+    assert summary.converged(0.5)
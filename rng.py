@@ -0,0 +1,40 @@
+import random
+
+
+def make_rng(rng=None):
+    ''' Returns the random number generator a simulation draws from.
+
+    Args:
+        rng: None for a generator seeded from the operating system, an int, str or
+            bytes seed, or a generator object to use as is. Any object with the
+            random(), randrange() and choices() methods of random.Random will do.
+
+    Returns:
+        The generator.
+    '''
+    if rng is None or isinstance(rng, (int, str, bytes)):
+        return random.Random(rng)
+    return rng
+
+
+def spawn_seeds(seed, count):
+    ''' Splits one seed into count seeds for independent streams.
+
+    Each seed is a SHA-512 digest of the parent seed and the stream's index, so the
+    streams are unrelated to each other and to random.Random(seed), and stream i is
+    the same however many streams are spawned.
+
+    Returns:
+        list: count int seeds.
+    '''
+    import hashlib #only spawning needs it, so plain runs start without it
+
+    return [int.from_bytes(hashlib.sha512(f"{seed}/{index}".encode()).digest()[:16], 'little')
+            for index in range(count)]
+
+
+def spawn(seed, count):
+    ''' Returns count independent generators split from one seed, one per worker or
+    replicate.
+    '''
+    return [random.Random(stream_seed) for stream_seed in spawn_seeds(seed, count)]
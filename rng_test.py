@@ -0,0 +1,21 @@
+import random
+from rng import make_rng, spawn, spawn_seeds
+
+def test_make_rng():
+    generator = random.Random(5)
+    assert make_rng(generator) is generator
+    assert make_rng(5).random() == random.Random(5).random()
+    assert isinstance(make_rng(), random.Random)
+
+#Test that split streams are reproducible and independent of each other
+def test_spawn():
+    seeds = spawn_seeds(42, 4)
+    assert len(set(seeds)) == 4
+    assert spawn_seeds(42, 2) == seeds[:2]
+    assert spawn_seeds(43, 4) != seeds
+
+    streams = spawn(42, 4)
+    draws = [[stream.random() for _ in range(5)] for stream in streams]
+    first = random.Random(seeds[0])
+    assert draws[0] == [first.random() for _ in range(5)]
+    assert len({tuple(d) for d in draws}) == 4
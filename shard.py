@@ -0,0 +1,285 @@
+import argparse, sys
+from itertools import compress
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Client, Listener
+from logger import Logger, SUMMARY
+from population import Population
+from rng import make_rng, spawn_seeds
+
+#Commands the coordinator sends to shard workers
+INIT = "init"
+INTERACT = "interact"
+RESOLVE = "resolve"
+STOP = "stop"
+
+
+class Shard(object):
+    ''' One slice of a partitioned population, with its own random stream.
+
+    Every step runs in two halves. interact() rolls the interactions of this shard's
+    infected people and returns how many infecting contacts land on each shard.
+    resolve() is then given the contacts that landed here, from every shard, picks
+    who they reached among its own living people, and finishes the step locally.
+    '''
+
+    def __init__(self, size, vaccinated, infected, virus, seed, placement="ordered"):
+        self.rng = make_rng(seed)
+        rng = self.rng if placement == "random" else None
+        self.population = Population.from_counts(size, vaccinated, infected, virus, rng)
+        self.virus = virus
+
+    def counts(self):
+        ''' Returns this shard's partial counts: alive, infected, vaccinated alive. '''
+        population = self.population
+        return [population.num_alive, population.num_infected, population.num_vaccinated_alive]
+
+    def interact(self, living_counts):
+        ''' Draws 100 contacts for every living infected person here, each on a shard
+        chosen in proportion to its living people, and rolls every infection.
+
+        Args:
+            living_counts (list): Living people on every shard at the start of the step.
+
+        Returns:
+            tuple: Infecting contacts bound for each shard, and the interactions rolled.
+        '''
+        needed = 100 * len(self.population.active)
+        if not needed:
+            return [0] * len(living_counts), 0
+
+        rng = self.rng
+        targets = rng.choices(range(len(living_counts)), weights=living_counts, k=needed)
+        repro_rate = self.virus.repro_rate
+        rand = rng.random
+        did_infect = [rand() < repro_rate for _ in range(needed)]
+
+        hits = [0] * len(living_counts)
+        for target in compress(targets, did_infect):
+            hits[target] += 1
+        return hits, needed
+
+    def resolve(self, incoming):
+        ''' Applies the infecting contacts that landed on this shard, then rolls the
+        survival of the people who were infected when the step began and infects the
+        newly exposed, as Simulation.time_step does.
+
+        Returns:
+            list: counts() after the step, then the step's newly infected, newly dead
+            and interactions vaccination saved.
+        '''
+        population = self.population
+        infected = population.infected
+        is_vaccinated = population.is_vaccinated
+        rng = self.rng
+
+        contacts = rng.choices(population.living, k=incoming) if incoming else []
+        exposed = [index for index in contacts if not infected[index]]
+        infections = [index for index in exposed if not is_vaccinated[index]]
+        saved = len(exposed) - len(infections)
+
+        newly_dead = 0
+        mortality_rate = self.virus.mortality_rate
+        for index in population.infected_ids():
+            population.set_infected(index, 0)
+            if rng.random() > mortality_rate:
+                population.set_vaccinated(index, 1)
+            else:
+                population.set_alive(index, 0)
+                newly_dead += 1
+
+        newly_infected = 0
+        for index in infections:
+            if not infected[index]:
+                population.set_infected(index, 1)
+                newly_infected += 1
+        return self.counts() + [newly_infected, newly_dead, saved]
+
+
+def serve(connection):
+    ''' Runs one shard worker, answering the coordinator's commands on connection
+    until it is told to stop.
+    '''
+    shard = None
+    while True:
+        command, argument = connection.recv()
+        if command == INIT:
+            shard = Shard(*argument)
+            connection.send(shard.counts())
+        elif command == INTERACT:
+            connection.send(shard.interact(argument))
+        elif command == RESOLVE:
+            connection.send(shard.resolve(argument))
+        elif command == STOP:
+            connection.close()
+            return
+        else:
+            raise ValueError(f"unknown shard command {command!r}")
+
+
+class LocalTransport(object):
+    ''' Runs every shard worker in a child process on this machine, connected to the
+    coordinator by a pipe.
+    '''
+
+    def __init__(self, shards):
+        self.connections = []
+        self.processes = []
+        for _ in range(shards):
+            connection, worker_end = Pipe()
+            process = Process(target=serve, args=(worker_end,), daemon=True)
+            process.start()
+            worker_end.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def exchange(self, messages):
+        ''' Sends every shard its message, then waits for every reply, so the shards
+        work on a step at the same time.
+        '''
+        for connection, message in zip(self.connections, messages):
+            connection.send(message)
+        return [connection.recv() for connection in self.connections]
+
+    def close(self):
+        for connection in self.connections:
+            connection.send((STOP, None))
+            connection.close()
+        for process in self.processes:
+            process.join()
+
+
+class SocketTransport(LocalTransport):
+    ''' Waits for shard workers on other hosts to connect to address, each started
+    with "python shard.py HOST PORT --authkey KEY". listener, a Listener already open,
+    is used instead of opening one on address, so the port can be picked by the
+    system and handed to the workers first.
+    '''
+
+    def __init__(self, shards, address, authkey, listener=None):
+        self.processes = []
+        with listener or Listener(address, authkey=authkey) as listener:
+            self.connections = [listener.accept() for _ in range(shards)]
+
+    def close(self):
+        for connection in self.connections:
+            connection.send((STOP, None))
+            connection.close()
+
+
+def _apportion(total, sizes):
+    ''' Splits total into one share per size, in proportion to the sizes, with the
+    shares summing to total exactly.
+    '''
+    whole = sum(sizes)
+    shares = []
+    before = 0
+    for size in sizes:
+        shares.append(total * (before + size) // whole - total * before // whole)
+        before += size
+    return shares
+
+
+class ShardedSimulation(object):
+    ''' Runs the batched simulation with the population split into shards, each held
+    by its own worker.
+
+    Only infecting contacts cross between shards, batched into one count per shard
+    each step, and the coordinator reduces the shards' partial counts into the
+    global totals that decide whether the run goes on. The shards share out the
+    vaccinated and infected people in proportion to their sizes. The coordinator
+    logs the metadata and time steps; interactions and survivals are not logged.
+    Results depend on the seed and the number of shards.
+    '''
+
+    def __init__(self, population_size, v_percentage, v, initial_infected=1, shards=2, transport=None,
+                 file_name=None, verbose=True, seed=None, placement="ordered"):
+        ''' transport defaults to a LocalTransport with one process per shard. '''
+        self.virus = v # Virus object
+        self.pop_size = population_size # Int
+        self.vacc_percentage = v_percentage # float between 0 and 1
+        self.initial_infected = initial_infected # Int
+        self.total_infected = initial_infected # Int
+        self.current_infected = initial_infected # Int
+        self.total_dead = 0 # Int
+        self.time_step_counter = 0 # Int
+        self.total_interactions = 0 # Int
+        self.vaccine_saved = 0 # Int
+        self.shards = shards # Int
+        sizes = _apportion(population_size, [1] * shards)
+        vaccinated = _apportion(int(population_size * v_percentage), sizes)
+        unvaccinated = [size - count for size, count in zip(sizes, vaccinated)]
+        if not 0 <= initial_infected <= sum(unvaccinated):
+            raise ValueError(f"initial_infected must be at most the {sum(unvaccinated)} unvaccinated people, "
+                             f"not {initial_infected}")
+        infected = _apportion(initial_infected, unvaccinated)
+
+        self.transport = transport or LocalTransport(shards)
+        self.file_name = file_name or f"{v.name}_sharded_pop_{population_size}_vp_{v_percentage}_infected_{initial_infected}.txt"
+        self.verbose = verbose # bool
+        if seed is None:
+            seed = make_rng(None).getrandbits(64)
+
+        seeds = spawn_seeds(seed, shards)
+        self.counts = self.transport.exchange([(INIT, (sizes[index], vaccinated[index], infected[index], v,
+                                                       seeds[index], placement)) for index in range(shards)])
+
+        self.logger = Logger(self.file_name, 1 << 16, SUMMARY)
+        self.logger.write_metadata(population_size, v_percentage, v.name, v.mortality_rate, v.repro_rate)
+
+    def _totals(self):
+        return [sum(column) for column in zip(*self.counts)]
+
+    def _simulation_should_continue(self):
+        ''' Same rule as Simulation, on the counts reduced from every shard. '''
+        alive, infected, vaccinated_alive = self._totals()[:3]
+        return alive > 0 and infected > 0 and vaccinated_alive != alive
+
+    def time_step(self):
+        ''' Runs one step on every shard at once.
+
+            Returns:
+                tuple: The step's newly infected and newly dead counts.
+        '''
+        living_counts = [counts[0] for counts in self.counts]
+        outgoing = self.transport.exchange([(INTERACT, living_counts)] * self.shards)
+        incoming = [sum(hits[index] for hits, _ in outgoing) for index in range(self.shards)]
+        self.total_interactions += sum(needed for _, needed in outgoing)
+
+        self.counts = self.transport.exchange([(RESOLVE, count) for count in incoming])
+        totals = self._totals()
+        newly_infected, newly_dead, saved = totals[3:]
+        self.total_infected += newly_infected
+        self.total_dead += newly_dead
+        self.current_infected = totals[1]
+        self.vaccine_saved += saved
+        return newly_infected, newly_dead
+
+    def run(self):
+        ''' Runs steps until the shards' reduced counts say to stop, then stops the
+        shard workers.
+        '''
+        try:
+            with self.logger:
+                while self._simulation_should_continue():
+                    newly_infected, newly_dead = self.time_step()
+                    self.logger.log_time_step(self.time_step_counter, newly_infected, newly_dead,
+                                              self.total_infected, self.total_dead)
+                    self.time_step_counter += 1
+        finally:
+            self.transport.close()
+
+        if self.verbose:
+            print(f"The simulation has ended after {self.time_step_counter} turns.\n")
+            print(f"Population: {self.pop_size} Total Dead: {self.total_dead} Total Infected: {self.total_infected}\n")
+            print(f"Interactions: {self.total_interactions} Saved by Vaccination: {self.vaccine_saved}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a shard worker for a ShardedSimulation on another host.")
+    parser.add_argument("host")
+    parser.add_argument("port", type=int)
+    parser.add_argument("--authkey", required=True)
+    args = parser.parse_args()
+
+    serve(Client((args.host, args.port), authkey=args.authkey.encode()))
+    sys.exit(0)
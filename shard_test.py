@@ -0,0 +1,82 @@
+import os, time
+from multiprocessing import Process
+from multiprocessing.connection import Client, Listener
+from virus import Virus
+from shard import Shard, ShardedSimulation, SocketTransport, serve, _apportion
+import pytest
+
+def test_apportion():
+    assert _apportion(10, [1, 1, 1]) == [3, 3, 4]
+    assert _apportion(7, [5, 0, 5]) == [3, 0, 4]
+    assert sum(_apportion(999, [3, 8, 13, 2])) == 999
+
+#Test that a shard keeps its own counts through a step
+def test_shard():
+    v = Virus("Shard", .5, .5)
+    shard = Shard(100, 20, 5, v, seed=1)
+    assert shard.counts() == [100, 5, 20]
+
+    hits, needed = shard.interact([100, 300])
+    assert needed == 500
+    assert len(hits) == 2 and 0 < hits[0] < hits[1]
+
+    alive, infected, vaccinated_alive, newly_infected, newly_dead, saved = shard.resolve(hits[0])
+    assert alive == 100 - newly_dead
+    assert infected == newly_infected
+    assert vaccinated_alive == 20 + 5 - newly_dead
+    shard.population.check_counts()
+
+def test_sharded_simulation():
+    v = Virus("Sharded", .3, .2)
+    sim = ShardedSimulation(3000, .5, v, initial_infected=10, shards=3, file_name="test_sharded.txt",
+                            verbose=False, seed=1)
+    assert sim._totals()[:3] == [3000, 10, 1500]
+    sim.run()
+
+    assert sim.time_step_counter > 0
+    assert 10 <= sim.total_infected <= 1500
+    assert sim.total_dead <= sim.total_infected
+    assert sim.total_interactions >= 1000
+    assert not sim._simulation_should_continue()
+    with open("test_sharded.txt") as f:
+        assert len(f.readlines()) == sim.time_step_counter + 1
+
+    #the same seed and shard count give the same run
+    again = ShardedSimulation(3000, .5, v, initial_infected=10, shards=3, file_name="test_sharded.txt",
+                              verbose=False, seed=1)
+    again.run()
+    assert (again.total_infected, again.total_dead, again.time_step_counter) == \
+           (sim.total_infected, sim.total_dead, sim.time_step_counter)
+
+    #more infected than there are unvaccinated people is refused, as Simulation does
+    with pytest.raises(ValueError, match="at most the 1500 unvaccinated"):
+        ShardedSimulation(3000, .5, v, initial_infected=1501, shards=3, file_name=os.devnull, verbose=False)
+
+    os.remove("test_sharded.txt")
+
+def connect_and_serve(address, authkey):
+    for _ in range(100):
+        try:
+            connection = Client(address, authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            time.sleep(.05)
+    serve(connection)
+
+#Test workers that connect over sockets, as they would from other hosts
+def test_socket_transport():
+    listener = Listener(("127.0.0.1", 0), authkey=b"test")
+    workers = [Process(target=connect_and_serve, args=(listener.address, b"test")) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    transport = SocketTransport(2, listener.address, b"test", listener=listener)
+
+    v = Virus("Socket", .3, .2)
+    sim = ShardedSimulation(1000, .25, v, initial_infected=5, shards=2, transport=transport,
+                            file_name="test_socket_sharded.txt", verbose=False, seed=1)
+    sim.run()
+    for worker in workers:
+        worker.join()
+    assert 5 <= sim.total_infected <= 750
+
+    os.remove("test_socket_sharded.txt")
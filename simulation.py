@@ -1,9 +1,14 @@
-import random, sys
-random.seed(42)
-from person import Person
-from logger import Logger
+import os, random, sys
+from itertools import compress
+from time import perf_counter
+from population import Population
+from logger import Logger, SUMMARY, EVENTS
+from rng import make_rng
 from virus import Virus
 
+#Binary logs, profiling, time series and checkpoints are imported where they are
+#used, so runs that do not ask for them do not pay to load them
+
 
 class Simulation(object):
     ''' Main class that will run the herd immunity simulation program.
@@ -13,7 +18,16 @@ class Simulation(object):
     population that are vaccinated, the size of the population, and the amount of initially
     infected people in a population are all variables that can be set when the program is run.
     '''
-    def __init__(self, population_size, v_percentage, v, initial_infected=1):
+    INTERACTION_MODES = ("pairwise", "batched")
+    LOG_FORMATS = ("text", "binary")
+    PLACEMENTS = ("ordered", "random")
+    PROGRESSION = False # whether this engine runs a Virus progression
+
+    def __init__(self, population_size, v_percentage, v, initial_infected=1, interaction_mode="pairwise",
+                 log_buffer_size=0, log_format="text", log_level=EVENTS, debug=False,
+                 file_name=None, verbose=True, rng=None, profile=False, placement="ordered",
+                 initial_state=None, checkpoint_every=0, checkpoint_file=None, network=None,
+                 log_queue_size=0, log_compress=False, timeseries=None, metrics_address=None):
         ''' Logger object logger records all events during the simulation.
         Population represents all Persons in the population.
         The next_person_id is the next available id for all created Persons,
@@ -26,10 +40,69 @@ class Simulation(object):
         You will also need to keep track of the number of people that have died as a result
         of the infection.
 
+        The interaction mode chooses how time_step resolves contacts: "pairwise" calls
+        interaction() for every pair, "batched" draws and resolves every infected
+        person's contacts for the step at once.
+
+        The log buffer size is how many characters of log lines the logger holds in
+        memory before writing them out; 0 writes every event as it happens. The log
+        format is "text" for the readable log or "binary" for fixed-width records
+        written by BinaryLogger to a .bin file. The log level is EVENTS to log every
+        interaction and survival roll, or SUMMARY to log only the time steps; either way
+        the simulation counts interactions and the ones where vaccination saved someone.
+
+        A log_queue_size above 0 moves writing the log to a background thread, with up
+        to that many buffers queued for it, so a slow disk does not hold up the time
+        steps; run() waits for the queue to drain before it returns. log_compress
+        writes the log as gzip and adds ".gz" to the default file name; compressed
+        logs cannot be checkpointed.
+
+        In debug mode every termination check also recounts the population with a full
+        scan and checks it against the running totals.
+
+        file_name overrides the log file name built from the parameters, so runs that
+        share parameters can log to separate files. With verbose off, run() does not
+        print its summary.
+
+        rng is the random number generator every draw of this simulation comes from: a
+        seed, a generator object, or None to seed from the operating system. Give each
+        simulation its own generator (see rng.spawn) to run them side by side and still
+        reproduce every run exactly.
+
+        With profile on, run() times every phase of every time step and writes the
+        profiles as JSON lines to the log file name plus ".profile.jsonl". Observers
+        added with add_observer get the same StepProfile objects as the run goes.
+
+        timeseries names a file that run() writes one row of counts to after every time
+        step (S/I/R/D, new infections and deaths, vaccine-saved interactions), as CSV or,
+        if the name ends in .jsonl, JSON lines. metrics_address serves the latest row
+        while the run goes: a (host, port) pair for HTTP, or a Unix socket path.
+
+        placement is "ordered" to put the vaccinated people first and the infected right
+        after them, or "random" to scatter both through the population. initial_state
+        skips both and starts from a Population, or the name of a state file written by
+        Population.save; its infected people replace initial_infected.
+
+        With checkpoint_every set, run() saves a checkpoint to checkpoint_file (the log
+        file name plus ".ckpt" by default) every that many time steps, and
+        Simulation.resume picks the run up from it.
+
+        network is a ContactNetwork to draw partners from instead of mixing uniformly:
+        each infected person's 100 interactions are then drawn from their living
+        neighbors, and people with no living neighbors have none.
+
         All arguments will be passed as command-line arguments when the file is run.
         HINT: Look in the if __name__ == "__main__" function at the bottom.
         '''
+        if getattr(v, "progression", None) is not None and not self.PROGRESSION:
+            raise ValueError(f"{type(self).__name__} cannot run a virus progression; use ProgressionSimulation")
         # Stores created population in self.population attribute
+        if isinstance(initial_state, str):
+            initial_state = Population.load(initial_state, v)
+        if initial_state is not None:
+            if len(initial_state) != population_size:
+                raise ValueError(f"initial_state holds {len(initial_state)} people, not {population_size}")
+            initial_infected = len(initial_state.active)
     
         self.next_person_id = 0 # Int
         self.virus = v # Virus object
@@ -39,15 +112,72 @@ class Simulation(object):
         self.current_infected = initial_infected # Int
         self.vacc_percentage = v_percentage # float between 0 and 1
         self.total_dead = 0 # Int
+        self.time_step_counter = 0 # Int, time steps run so far
         self.file_name = f"{self.virus.name}_simulation_pop_{self.pop_size}_vp_{self.vacc_percentage}_infected_{self.initial_infected}.txt"
         self.newly_infected = []
         self.newly_dead = []
+        self.total_interactions = 0 # Int
+        self.vaccine_saved = 0 # Int, interactions where vaccination stopped an infection
+        if interaction_mode not in self.INTERACTION_MODES:
+            raise ValueError(f"interaction_mode must be one of {self.INTERACTION_MODES}, not {interaction_mode!r}")
+        self.interaction_mode = interaction_mode
+        if log_format not in self.LOG_FORMATS:
+            raise ValueError(f"log_format must be one of {self.LOG_FORMATS}, not {log_format!r}")
+        if log_format == "binary":
+            from binary_log import MAX_PEOPLE
+
+            #Checked before the population is built, which for this many people takes a while
+            if population_size > MAX_PEOPLE:
+                raise ValueError(f"binary logs hold at most {MAX_PEOPLE} people, not {population_size}")
+            self.file_name = self.file_name[:-len(".txt")] + ".bin"
+        if log_compress:
+            self.file_name += ".gz"
+        if file_name is not None:
+            self.file_name = file_name
+        if log_level not in (SUMMARY, EVENTS):
+            raise ValueError(f"log_level must be SUMMARY or EVENTS, not {log_level!r}")
+        self.log_events = log_level == EVENTS
+        self.log_level = log_level
+        self.log_format = log_format
+        self.log_buffer_size = log_buffer_size # Int
+        self.log_queue_size = log_queue_size # Int
+        self.log_compress = log_compress # bool
+        self.debug = debug # bool
+        self.verbose = verbose # bool
+        self.rng = make_rng(rng) # random.Random or compatible generator
+        self.profile = profile # bool
+        self.observers = [] # callables given a StepProfile after every time step
+        self.timeseries = timeseries # str or None
+        self.metrics_address = metrics_address # (host, port), socket path or None
+        if placement not in self.PLACEMENTS:
+            raise ValueError(f"placement must be one of {self.PLACEMENTS}, not {placement!r}")
+        self.placement = placement
+        self.initial_state = initial_state # Population or None
+        if checkpoint_every and log_compress:
+            raise ValueError("compressed logs cannot be checkpointed")
+        if checkpoint_every:
+            from checkpoint import rng_state
+
+            rng_state(self.rng) #fails now, not at the first checkpoint, for generators it cannot save
+        self.checkpoint_every = checkpoint_every # Int, 0 for never
+        self.checkpoint_file = checkpoint_file or self.file_name + ".ckpt"
+        if network is not None and len(network) != population_size:
+            raise ValueError(f"network holds {len(network)} people, not {population_size}")
+        self.network = network # ContactNetwork or None
         self.population = self._create_population(self.initial_infected)
 
         #Create Logger and write metadata
-        self.logger = Logger(self.file_name)
+        self.logger = self._create_logger()
         self.logger.write_metadata(self.pop_size,self.vacc_percentage,self.virus.name, self.virus.mortality_rate, self.virus.repro_rate)
 
+    def _create_logger(self):
+        if self.log_format == "binary":
+            from binary_log import BinaryLogger
+
+            return BinaryLogger(self.file_name, self.log_buffer_size, self.log_level, self.log_compress,
+                                self.log_queue_size)
+        return Logger(self.file_name, self.log_buffer_size, self.log_level, self.log_compress, self.log_queue_size)
+
     def _create_population(self, initial_infected):
         '''This method will create the initial population.
             Args:
@@ -55,29 +185,24 @@ class Simulation(object):
                 will begin with.
 
             Returns:
-                list: A list of Person objects.
+                Population: Array-backed population indexable like a list of Person objects.
         '''
-        
-        #Array of persons
-        self.population = []
-        #Get count of vaccinated people
-        vacc_count = int(self.pop_size * self.vacc_percentage)
-        #Add vaccinated people to population
-        for i in range(vacc_count):
-            self.population.append(Person(self.next_person_id, True))
-            self.next_person_id += 1
-        
-        #Add infected people to population
-        for i in range(self.initial_infected):
-            self.population.append(Person(self.next_person_id, False, self.virus))
-            self.next_person_id += 1
-
-        #Add rest of population
-        for person in range(self.pop_size - vacc_count - initial_infected):
-            self.population.append(Person(self.next_person_id, False))
-            self.next_person_id += 1
-        
-        #List of population
+
+        #Population given up front
+        if self.initial_state is not None:
+            self.population = self.initial_state
+            self.population.virus = self.virus
+
+        else:
+            #Get count of vaccinated people
+            vacc_count = int(self.pop_size * self.vacc_percentage)
+            #Arrays of person state, one row per person, built in one pass. Ordered
+            #placement puts vaccinated people first, then infected people, then the rest
+            rng = self.rng if self.placement == "random" else None
+            self.population = Population.from_counts(self.pop_size, vacc_count, initial_infected, self.virus, rng)
+        self.next_person_id = self.pop_size
+
+        #Population of person views
         return self.population
 
     def _simulation_should_continue(self):
@@ -87,27 +212,16 @@ class Simulation(object):
             Returns:
                 bool: True for simulation should continue, False if it should end.
         '''
-        #Get count of population that is alive and vaccinated
-        vacc_count = 0
-        self.total_dead = 0
-        infected_count = 0
-        
-        for person in self.population:
-            if person.is_alive and person.is_vaccinated:
-                vacc_count += 1
-
-            if person.is_alive == False:
-                self.total_dead += 1
-
-            if person.infection is not None:
-                infected_count += 1
+        population = self.population
+        if self.debug:
+            population.check_counts()
 
         #Check if everyone is dead or no more people are infected
-        if self.total_dead == self.pop_size or infected_count == 0:
+        if population.num_alive == 0 or population.num_infected == 0:
             return False
 
         #Check if all survivors are vaccinated 
-        if vacc_count == self.pop_size - self.total_dead:
+        if population.num_vaccinated_alive == population.num_alive:
             #All survivors are vaccinated
             return False
 
@@ -121,21 +235,183 @@ class Simulation(object):
         ''' This method should run the simulation until all requirements for ending
         the simulation are met.
         '''
-        time_step_counter = 0
+        writers = []
+        if self.profile:
+            from profiling import ProfileWriter
+
+            writers.append(ProfileWriter(self.file_name + ".profile.jsonl", self.time_step_counter))
+        if self.timeseries is not None:
+            from timeseries import TimeSeriesWriter
+
+            writers.append(TimeSeriesWriter(self.timeseries, self.time_step_counter))
+        if self.metrics_address is not None:
+            from timeseries import MetricsServer
+
+            writers.append(MetricsServer(self.metrics_address))
+        for writer in writers:
+            self.add_observer(writer)
+
+        try:
+            #Logger flushes and closes the log file when the run ends
+            with self.logger:
+                #Profiling is only paid for when someone is watching
+                if self.observers:
+                    while self._profiled_step():
+                        self._checkpoint_if_due()
+
+                else:
+                    while self._simulation_should_continue():
+                        #Round of simulation
+                        self.time_step()
+
+                        newly_dead = len(self.newly_dead)
+                        total_infected = self.total_infected
+                        self._infect_newly_infected()
+
+                        #Log the current timestep, counting each newly infected person once
+                        self.logger.log_time_step(self.time_step_counter, self.total_infected - total_infected, newly_dead,
+                                                  self.total_infected, self.total_dead)
+                        #increment time step
+                        self.time_step_counter += 1
+                        self._checkpoint_if_due()
+        finally:
+            for writer in writers:
+                self.remove_observer(writer)
+                writer.close()
+
+        if self.verbose:
+            print(f"The simulation has ended after {self.time_step_counter} turns.\n")
+            print(f"Population: {self.pop_size} Total Dead: {self.total_dead} Total Infected: {self.total_infected}\n")
+            print(f"Interactions: {self.total_interactions} Saved by Vaccination: {self.vaccine_saved}\n")
+
+    def _checkpoint_if_due(self):
+        if self.checkpoint_every and self.time_step_counter % self.checkpoint_every == 0:
+            self.save_checkpoint()
+
+    def save_checkpoint(self, file_name=None):
+        ''' Saves everything needed to carry on this run between time steps: the
+        population arrays and living index, the counters, the random generator state
+        and how far the log file has got.
+        '''
+        from checkpoint import write_checkpoint, rng_state
+
+        virus = self.virus
+        state = {
+            "population_size": self.pop_size, "v_percentage": self.vacc_percentage,
+            "virus": [virus.name, virus.repro_rate, virus.mortality_rate],
+            "interaction_mode": self.interaction_mode, "log_buffer_size": self.log_buffer_size,
+            "log_format": self.log_format, "log_level": self.log_level, "log_queue_size": self.log_queue_size,
+            "debug": self.debug, "file_name": self.file_name, "verbose": self.verbose, "profile": self.profile,
+            "placement": self.placement, "checkpoint_every": self.checkpoint_every,
+            "checkpoint_file": self.checkpoint_file,
+            "initial_infected": self.initial_infected, "total_infected": self.total_infected,
+            "current_infected": self.current_infected, "total_dead": self.total_dead,
+            "time_step_counter": self.time_step_counter, "total_interactions": self.total_interactions,
+            "vaccine_saved": self.vaccine_saved, "rng": rng_state(self.rng),
+            "log_offset": self.logger.offset(), "network": self.network is not None,
+            "timeseries": self.timeseries, "metrics_address": self.metrics_address,
+        }
+        write_checkpoint(file_name or self.checkpoint_file, state, self.population)
+
+    @classmethod
+    def resume(cls, file_name, network=None):
+        ''' Rebuilds a Simulation from a checkpoint. Calling run() on it carries on
+        exactly as the checkpointed run would have, and the log file is cut back to
+        where it was at the checkpoint. Checkpoints do not hold the contact network,
+        so a run that had one needs the same network passed back in.
+        '''
+        from checkpoint import read_checkpoint, set_rng_state
+
+        state, population = read_checkpoint(file_name)
+        if state["network"] and network is None:
+            raise ValueError(f"{file_name} was saved from a run with a contact network; pass it to resume")
+        virus = Virus(*state["virus"])
+        sim = cls(state["population_size"], state["v_percentage"], virus, interaction_mode=state["interaction_mode"],
+                  log_buffer_size=state["log_buffer_size"], log_format=state["log_format"],
+                  log_level=state["log_level"], log_queue_size=state["log_queue_size"], debug=state["debug"],
+                  file_name=os.devnull, verbose=state["verbose"], rng=random.Random(), profile=state["profile"],
+                  placement=state["placement"], initial_state=population,
+                  checkpoint_every=state["checkpoint_every"], checkpoint_file=state["checkpoint_file"],
+                  network=network, timeseries=state["timeseries"], metrics_address=state["metrics_address"])
+
+        for name in ("initial_infected", "total_infected", "current_infected", "total_dead",
+                     "time_step_counter", "total_interactions", "vaccine_saved"):
+            setattr(sim, name, state[name])
+        set_rng_state(sim.rng, state["rng"])
+
+        sim.file_name = state["file_name"]
+        sim.logger.close()
+        sim.logger = sim._create_logger()
+        sim.logger.resume_at(state["log_offset"], sim.time_step_counter)
+        return sim
+
+    def add_observer(self, observer):
+        ''' Calls observer with the StepProfile of every time step run() runs. '''
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        self.observers.remove(observer)
+
+    def _profiled_step(self):
+        ''' Runs one round of run() with every phase timed, then hands the profile to
+        the observers.
+
+            Returns:
+                bool: False once the simulation should end, like _simulation_should_continue.
+        '''
+        from profiling import StepProfile
 
-        while self._simulation_should_continue():
-            #Round of simulation
-            self.time_step()
+        population = self.population
+        profile = StepProfile(self.time_step_counter)
 
-            #Log the current timestep
-            self.logger.log_time_step(time_step_counter, len(self.newly_infected), len(self.newly_dead),self.total_infected, self.total_dead)
+        start = perf_counter()
+        should_continue = self._simulation_should_continue()
+        end = perf_counter()
+        profile.add("should_continue", end - start, 1)
+        if not should_continue:
+            return False
 
-            self._infect_newly_infected()
-            #increment time step
-            time_step_counter += 1
+        interactions = self.total_interactions
+        vaccine_saved = self.vaccine_saved
+        total_infected = self.total_infected
+        start = perf_counter()
+        self._interaction_phase()
+        end = perf_counter()
+        profile.add("interactions", end - start, self.total_interactions - interactions)
+
+        rolls = len(population.active)
+        start = perf_counter()
+        self._survival_phase()
+        end = perf_counter()
+        profile.add("survival", end - start, rolls)
+
+        newly_infected = len(self.newly_infected)
+        newly_dead = len(self.newly_dead)
+        start = perf_counter()
+        self._infect_newly_infected()
+        end = perf_counter()
+        profile.add("infect_newly_infected", end - start, newly_infected)
+
+        start = perf_counter()
+        self.logger.log_time_step(self.time_step_counter, self.total_infected - total_infected, newly_dead,
+                                  self.total_infected, self.total_dead)
+        end = perf_counter()
+        profile.add("logging", end - start, 1)
+
+        profile.counts = {"alive": population.num_alive, "dead": len(population) - population.num_alive,
+                          "infected": population.num_infected, "vaccinated_alive": population.num_vaccinated_alive,
+                          "newly_infected": self.total_infected - total_infected, "newly_dead": newly_dead,
+                          "total_infected": self.total_infected, "total_dead": self.total_dead,
+                          "vaccine_saved": self.vaccine_saved - vaccine_saved, "total_vaccine_saved": self.vaccine_saved}
+        profile.counts.update(self._state_counts())
+        self.time_step_counter += 1
+        for observer in self.observers:
+            observer(profile)
+        return True
 
-        print(f"The simulation has ended after {time_step_counter} turns.\n")
-        print(f"Population: {self.pop_size} Total Dead: {self.total_dead} Total Infected: {self.total_infected}\n")
+    def _state_counts(self):
+        ''' Counts engines add to every StepProfile; see timeseries.step_row. '''
+        return {}
 
     def time_step(self):
         ''' This method should contain all the logic for computing one time step
@@ -148,38 +424,77 @@ class Simulation(object):
                 Since we don't interact with dead people, this does not count as an interaction.
             3. Otherwise call simulation.interaction(person, random_person) and
                 increment interaction counter by 1.
+
+        Partners are drawn straight from the population's index of living people and
+        only the living infected are visited, so a step costs time in proportion to
+        the active cases, not the population size.
             '''
+        self._interaction_phase()
+        self._survival_phase()
 
-        for person in self.population:
-            #If person is alive and has infection, interact
-            if person.is_alive and person.infection:
-                
-                interactions = 0
-                while(interactions < 100):
-                    #randomly select member  of the population
-                    rand_person = self.population[random.randrange(0, self.pop_size)]
-
-                    #counts as an interaction
-                    if rand_person.is_alive:
-                        interactions +=1
-                        self.interaction(person, rand_person)
-                
-
-
-        #roll population survival 
-        for person in self.population:
-            #if person is infected 
-            if person.is_alive and person.infection:
-                
-                #Person survived infection -> becomes vaccinated
-                if person.did_survive_infection():
-                    self.logger.log_infection_survival(person, False)
-                #Person has died
-                else:
-                    self.logger.log_infection_survival(person, True)
-                    self.current_infected -= 1
-                    self.total_dead += 1
-                    self.newly_dead.append(person._id)
+    def _infectious_ids(self):
+        ''' Returns the ids of the people who interact this step, in id order. '''
+        return self.population.infected_ids()
+
+    def _interaction_phase(self):
+        ''' Gives every living infected person their 100 interactions for this step. '''
+        population = self.population
+        rng = self.rng
+        infectious_ids = self._infectious_ids()
+
+        if self.interaction_mode == "batched":
+            self._batched_interactions(infectious_ids)
+
+        elif self.network is not None:
+            for person_id in infectious_ids:
+                person = population[person_id]
+                for rand_id in self._network_contacts(person_id):
+                    self.interaction(person, population[rand_id])
+
+        else:
+            living = population.living
+            for person_id in infectious_ids:
+                person = population[person_id]
+
+                for _ in range(100):
+                    #randomly select a living member of the population
+                    rand_id = living[rng.randrange(len(living))]
+                    self.interaction(person, population[rand_id])
+
+    def _network_contacts(self, person_id):
+        ''' Draws the 100 contacts of person_id for this step from their living
+        neighbors in the contact network.
+        '''
+        is_alive = self.population.is_alive
+        neighbors = [neighbor for neighbor in self.network.neighbors_of(person_id) if is_alive[neighbor]]
+        if not neighbors:
+            return []
+        return self.rng.choices(neighbors, k=100)
+
+    def _survival_phase(self):
+        ''' Rolls whether every living infected person survives their infection. '''
+        population = self.population
+        log_events = self.log_events
+        rng = self.rng
+
+        #roll population survival
+        mortality_rate = self.virus.mortality_rate
+        for person_id in population.infected_ids():
+            population.set_infected(person_id, 0)
+            self.current_infected -= 1
+
+            #Person survived infection -> becomes vaccinated
+            if rng.random() > mortality_rate:
+                population.set_vaccinated(person_id, 1)
+                if log_events:
+                    self.logger.log_infection_survival(population[person_id], False)
+            #Person has died
+            else:
+                population.set_alive(person_id, 0)
+                if log_events:
+                    self.logger.log_infection_survival(population[person_id], True)
+                self.total_dead += 1
+                self.newly_dead.append(person_id)
 
 
 
@@ -204,26 +519,85 @@ class Simulation(object):
             r_person_sick = True
 
 
+        self.total_interactions += 1
+
         #Chance to infect
         #Person has been infected by chance
-        if random.random() < self.virus.repro_rate:
-            self.logger.log_interaction(person, random_person, r_person_sick, random_person.is_vaccinated, did_infect=True)
+        if self.rng.random() < self.virus.repro_rate:
+            if self.log_events:
+                self.logger.log_interaction(person, random_person, r_person_sick, random_person.is_vaccinated, did_infect=True)
             #random_person has no immunity and is now infected
             if random_person.is_vaccinated is False and r_person_sick is False:
                 self.newly_infected.append(random_person._id)
+            #Vaccination saved random_person
+            elif r_person_sick is False:
+                self.vaccine_saved += 1
 
         #Did not infect
-        else:
+        elif self.log_events:
             self.logger.log_interaction(person, random_person, r_person_sick ,random_person.is_vaccinated, did_infect=False)
 
+    def _batched_interactions(self, infected_ids):
+        ''' Resolves the interactions of every infected person for this step in one batch.
+
+        All contacts are drawn together from the living people (or from each person's
+        living neighbors in network mode), and the infection rolls are compared against
+        the virus repro_rate in one pass. Contacts are dealt out 100 per infected person
+        in id order, so the results follow the same distribution as calling
+        interaction() for each pair, without the per-call overhead. The random draws
+        come in a different order, though, so a seed gives different results in the
+        two interaction modes.
+
+        Args:
+            infected_ids (list): Ids of the living infected people, in id order.
+        '''
+        population = self.population
+        is_vaccinated = population.is_vaccinated
+        infected = population.infected
+        if self.network is None:
+            #Draw 100 living contacts for every infected person
+            contacts = self.rng.choices(population.living, k=100 * len(infected_ids))
+            sources = None
+        else:
+            contacts = []
+            sources = []
+            for person_id in infected_ids:
+                drawn = self._network_contacts(person_id)
+                contacts.extend(drawn)
+                sources.extend([person_id] * len(drawn))
+        needed = len(contacts)
+
+        #Roll every interaction at once
+        repro_rate = self.virus.repro_rate
+        rand = self.rng.random
+        did_infect = [rand() < repro_rate for _ in range(needed)]
+
+        #Only people with no immunity who are not already sick become infected
+        exposed = [rand_id for rand_id in compress(contacts, did_infect) if not infected[rand_id]]
+        infections = [rand_id for rand_id in exposed if not is_vaccinated[rand_id]]
+        self.newly_infected.extend(infections)
+        self.total_interactions += needed
+        self.vaccine_saved += len(exposed) - len(infections)
+
+        if not self.log_events:
+            return
+
+        for n, rand_id in enumerate(contacts):
+            source = infected_ids[n // 100] if sources is None else sources[n]
+            self.logger.log_interaction(population[source], population[rand_id],
+                                        infected[rand_id] == 1, is_vaccinated[rand_id] == 1, did_infect[n])
+
     def _infect_newly_infected(self):
         ''' This method should iterate through the list of ._id stored in self.newly_infected
         and update each Person object with the disease. '''
-        #infect each person
+        #infect each person, once even if several people infected them this step
+        population = self.population
+        infected = population.infected
         for person_id in self.newly_infected:
-            self.population[person_id].infection = self.virus
-            self.current_infected += 1
-            self.total_infected += 1
+            if not infected[person_id]:
+                population.set_infected(person_id, 1)
+                self.current_infected += 1
+                self.total_infected += 1
 
         #reset newly lists
         self.newly_infected = []
@@ -245,6 +619,6 @@ if __name__ == "__main__":
         initial_infected = 1
 
     virus = Virus(virus_name, repro_num, mortality_rate)
-    sim = Simulation(pop_size, vacc_percentage, virus,initial_infected)
+    sim = Simulation(pop_size, vacc_percentage, virus,initial_infected, log_buffer_size=1 << 20, rng=42)
 
     sim.run()
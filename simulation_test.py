@@ -1,7 +1,7 @@
-import random, sys
+import random, sys, os
 random.seed(42)
 from person import Person
-from logger import Logger
+from logger import Logger, SUMMARY
 from virus import Virus
 from simulation import Simulation
 import pytest
@@ -76,3 +76,165 @@ def test_simulation_should_continue():
     sim2.population[86].is_alive = False
     sim2.total_dead = 3
     assert sim2._simulation_should_continue() == False
+
+#Test batched interaction mode
+def test_batched_time_step():
+    v = Virus("Batched", .5, .25)
+    sim = Simulation(1000, .5, v, initial_infected=10, interaction_mode="batched")
+    sim.time_step()
+
+    #only unvaccinated people that were not already sick can be newly infected
+    assert len(sim.newly_infected) > 0
+    for person_id in sim.newly_infected:
+        assert sim.population[person_id].is_vaccinated is False
+        assert 510 <= person_id < 1000
+
+    #every infected person logs 100 interactions and one survival roll
+    with open(sim.file_name, 'r') as f:
+        lines = f.readlines()
+    assert len(lines) == 1 + 10 * 100 + 10
+
+    os.remove(sim.file_name)
+
+def test_interaction_mode_validation():
+    v = Virus("Test", .25, .25)
+    with pytest.raises(ValueError):
+        Simulation(100, .25, v, initial_infected=4, interaction_mode="sometimes")
+
+#Test summary logging keeps counters instead of event lines
+def test_summary_log_level():
+    events_sim = Simulation(1000, .5, Virus("Events", .5, .25), initial_infected=10, rng=3)
+    events_sim.time_step()
+    summary_sim = Simulation(1000, .5, Virus("Summary", .5, .25), initial_infected=10, log_level=SUMMARY, rng=3)
+    summary_sim.time_step()
+
+    assert summary_sim.newly_infected == events_sim.newly_infected
+    assert summary_sim.total_interactions == events_sim.total_interactions == 1000
+    assert summary_sim.vaccine_saved == events_sim.vaccine_saved > 0
+
+    #vaccine saved interactions match the vaccinated lines of the event log
+    with open(events_sim.file_name, 'r') as f:
+        lines = f.readlines()
+    assert sum("because already vaccinated" in line for line in lines) == events_sim.vaccine_saved
+
+    #only the metadata line is logged at the summary level
+    with open(summary_sim.file_name, 'r') as f:
+        assert len(f.readlines()) == 1
+
+    os.remove(events_sim.file_name)
+    os.remove(summary_sim.file_name)
+
+def test_batched_vaccine_saved():
+    v = Virus("Batched", .5, .25)
+    sim = Simulation(1000, .5, v, initial_infected=10, interaction_mode="batched")
+    sim.time_step()
+
+    with open(sim.file_name, 'r') as f:
+        lines = f.readlines()
+    assert sum("because already vaccinated" in line for line in lines) == sim.vaccine_saved
+
+    os.remove(sim.file_name)
+
+#Test running totals stay in sync with a full population scan
+def test_debug_counts():
+    v = Virus("Debug", .3, .3)
+    sim = Simulation(1000, .5, v, initial_infected=5, log_level=SUMMARY, debug=True)
+    sim.run()
+
+    population = sim.population
+    population.check_counts()
+    assert sim.total_dead == population.count_dead()
+    assert sim.total_infected <= sim.pop_size
+    assert sim.current_infected == 0
+
+    os.remove(sim.file_name)
+
+#Test that simulations with the same seed reproduce each other
+def test_rng_reproducible():
+    v = Virus("Seeded", .3, .3)
+    results = []
+    for rng in (11, random.Random(11), 12):
+        sim = Simulation(1000, .5, v, initial_infected=5, log_level=SUMMARY, verbose=False, rng=rng)
+        sim.run()
+        results.append((sim.time_step_counter, sim.total_infected, sim.total_dead, sim.vaccine_saved))
+
+    assert results[0] == results[1]
+    assert results[0] != results[2]
+
+    os.remove(sim.file_name)
+
+#Test that profiling hooks report every phase of every step
+def test_profile_observer():
+    v = Virus("Profiled", .3, .3)
+    sim = Simulation(1000, .5, v, initial_infected=5, log_level=SUMMARY, verbose=False, rng=5, profile=True)
+    profiles = []
+    sim.add_observer(profiles.append)
+    sim.run()
+
+    assert [profile.time_step for profile in profiles] == list(range(sim.time_step_counter))
+    assert sum(profile.calls["interactions"] for profile in profiles) == sim.total_interactions
+    assert profiles[0].calls["survival"] == 5
+    assert profiles[-1].counts["total_dead"] == sim.total_dead
+    for profile in profiles:
+        assert all(seconds >= 0 for seconds in profile.seconds.values())
+        assert profile.counts["alive"] + profile.counts["dead"] == 1000
+
+    #the profiles were also written next to the log file
+    with open(sim.file_name + ".profile.jsonl") as f:
+        lines = f.readlines()
+    assert len(lines) == len(profiles)
+
+    #profiling does not change the outcome
+    plain = Simulation(1000, .5, v, initial_infected=5, log_level=SUMMARY, verbose=False, rng=5)
+    plain.run()
+    assert (plain.time_step_counter, plain.total_infected, plain.total_dead) == \
+        (sim.time_step_counter, sim.total_infected, sim.total_dead)
+
+    os.remove(sim.file_name)
+    os.remove(sim.file_name + ".profile.jsonl")
+
+#Test building the population with random placement or from a saved state
+def test_population_placement():
+    v = Virus("Placed", .3, .3)
+    sim = Simulation(1000, .25, v, initial_infected=10, placement="random", verbose=False, rng=2)
+    assert sim.population.num_vaccinated_alive == 250
+    assert len(sim.population.infected_ids()) == 10
+    assert sim.population.infected_ids() != list(range(250, 260))
+
+    sim.population.save('test_state.bin')
+    restored = Simulation(1000, .25, v, initial_infected=1, initial_state='test_state.bin', verbose=False)
+    assert restored.population.infected_ids() == sim.population.infected_ids()
+    assert restored.initial_infected == restored.total_infected == 10
+
+    with pytest.raises(ValueError):
+        Simulation(500, .25, v, initial_state=sim.population)
+    with pytest.raises(ValueError):
+        Simulation(1000, .25, v, placement="sideways")
+
+    os.remove(sim.file_name)
+    os.remove('test_state.bin')
+
+#Test that the summary log holds the totals of every time step
+@pytest.mark.parametrize("profile", [False, True])
+def test_summary_log_totals(profile):
+    sim = Simulation(1000, .5, Virus("Summary", .3, .25), initial_infected=10, log_level=SUMMARY,
+                     file_name="test_summary_totals.txt", verbose=False, rng=4, profile=profile)
+    sim.run()
+
+    with open("test_summary_totals.txt") as f:
+        lines = f.readlines()[1:]
+    assert len(lines) == sim.time_step_counter
+    assert lines[-1].endswith(f"{sim.total_infected} total infected, {sim.total_dead} total dead\n")
+    assert sum(int(line.split(", ")[2].split()[0]) for line in lines) == sim.total_dead
+
+    #each person is counted once, on the step they were infected, and the totals include them
+    total_infected = sim.initial_infected
+    for line in lines:
+        newly_infected = int(line.split(", ")[1].split(": ")[1].split()[0])
+        total_infected += newly_infected
+        assert int(line.split(", ")[3].split()[0]) == total_infected
+    assert total_infected == sim.total_infected
+
+    os.remove("test_summary_totals.txt")
+    if profile:
+        os.remove("test_summary_totals.txt.profile.jsonl")
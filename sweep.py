@@ -0,0 +1,162 @@
+import argparse, csv, os, sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from itertools import product
+from logger import SUMMARY, EVENTS
+from rng import spawn_seeds
+from simulation import Simulation
+from virus import Virus
+
+PARAMETERS = ("pop_size", "vacc_percentage", "repro_rate", "mortality_rate", "initial_infected")
+RESULTS = ("run", "seed") + PARAMETERS + ("time_steps", "total_infected", "total_dead",
+                                          "total_interactions", "vaccine_saved", "log_file", "error")
+
+
+def make_jobs(grid, replicates=1, seed=42, virus_name="Sweep", log_dir="sweep_logs", log_level=SUMMARY):
+    ''' Expands a parameter grid into one job per grid point and replicate.
+
+    Args:
+        grid (dict): Maps every name in PARAMETERS to the list of values to sweep.
+        replicates (int): Runs for each grid point.
+        seed (int): Seed the per-run seeds are drawn from, so a sweep can be repeated.
+
+    Returns:
+        list: Job dicts, each with its own run number, seed and log file.
+    '''
+    points = list(product(*(grid[name] for name in PARAMETERS)))
+    seeds = spawn_seeds(seed, len(points) * replicates)
+    jobs = []
+    for values in points:
+        for _ in range(replicates):
+            job = dict(zip(PARAMETERS, values))
+            job["run"] = len(jobs)
+            job["seed"] = seeds[job["run"]]
+            job["virus_name"] = virus_name
+            job["log_level"] = log_level
+            job["log_file"] = os.path.join(log_dir, f"{virus_name}_run_{job['run']}.txt")
+            jobs.append(job)
+    return jobs
+
+
+def run_one(job):
+    ''' Runs the simulation for one job and returns its row of the results table. '''
+    virus = Virus(job["virus_name"], job["repro_rate"], job["mortality_rate"])
+    sim = Simulation(job["pop_size"], job["vacc_percentage"], virus, job["initial_infected"],
+                     interaction_mode="batched", log_buffer_size=1 << 20, log_level=job["log_level"],
+                     file_name=job["log_file"], verbose=False, rng=job["seed"])
+    sim.run()
+
+    row = {name: job[name] for name in ("run", "seed") + PARAMETERS}
+    row.update(time_steps=sim.time_step_counter, total_infected=sim.total_infected,
+               total_dead=sim.total_dead, total_interactions=sim.total_interactions,
+               vaccine_saved=sim.vaccine_saved, log_file=job["log_file"], error="")
+    return row
+
+
+def sweep(jobs, results_file, processes=None, retries=1):
+    ''' Runs every job across a pool of worker processes.
+
+    Each row is written to results_file as soon as its run finishes, so finished
+    results survive anything that happens later. A worker process dying breaks the
+    whole pool, so the runs it took down are tried again, each in a pool of its own,
+    up to retries more times; runs that still fail are recorded with their error.
+
+    Args:
+        jobs (list): Job dicts from make_jobs.
+        results_file (str): CSV file the results table is written to.
+        processes (int): Worker processes, every core when None.
+        retries (int): Extra attempts for runs lost to a dead worker.
+
+    Returns:
+        list: Result rows ordered by run number.
+    '''
+    processes = processes or os.cpu_count()
+    for job in jobs:
+        log_dir = os.path.dirname(job["log_file"])
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+    rows = []
+    with open(results_file, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULTS)
+        writer.writeheader()
+
+        def record(row):
+            rows.append(row)
+            writer.writerow(row)
+            f.flush()
+
+        with ProcessPoolExecutor(processes) as pool:
+            lost = _collect({pool.submit(run_one, job): job for job in jobs}, record)
+
+        #Retry lost runs one per pool, so a run that kills its worker only loses itself
+        for _ in range(retries):
+            lost_again = []
+            for start in range(0, len(lost), processes):
+                pools = [ProcessPoolExecutor(1) for _ in lost[start:start + processes]]
+                try:
+                    futures = {pool.submit(run_one, job): job for pool, job in zip(pools, lost[start:])}
+                    lost_again += _collect(futures, record)
+                finally:
+                    for pool in pools:
+                        pool.shutdown()
+            lost = lost_again
+
+        for job in lost:
+            record(_failed_row(job, BrokenProcessPool("worker process died during the run")))
+
+    rows.sort(key=lambda row: row["run"])
+    return rows
+
+
+def _collect(futures, record):
+    ''' Records the row of every finished future and returns the jobs lost to a
+    broken pool.
+    '''
+    lost = []
+    for future in as_completed(futures):
+        job = futures[future]
+        try:
+            row = future.result()
+        except BrokenProcessPool:
+            lost.append(job)
+            continue
+        except Exception as error:
+            row = _failed_row(job, error)
+        record(row)
+    lost.sort(key=lambda job: job["run"])
+    return lost
+
+
+def _failed_row(job, error):
+    row = {name: job[name] for name in ("run", "seed") + PARAMETERS}
+    row.update(log_file=job["log_file"], error=repr(error))
+    return row
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a grid of herd immunity simulations in parallel.")
+    parser.add_argument("--pop-size", type=int, nargs="+", required=True)
+    parser.add_argument("--vacc-percentage", type=float, nargs="+", required=True)
+    parser.add_argument("--repro-rate", type=float, nargs="+", required=True)
+    parser.add_argument("--mortality-rate", type=float, nargs="+", required=True)
+    parser.add_argument("--initial-infected", type=int, nargs="+", default=[1])
+    parser.add_argument("--replicates", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--virus-name", default="Sweep")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--log-dir", default="sweep_logs")
+    parser.add_argument("--events", action="store_true", help="log every interaction, not just time steps")
+    parser.add_argument("--results", default="sweep_results.csv")
+    args = parser.parse_args()
+
+    grid = {"pop_size": args.pop_size, "vacc_percentage": args.vacc_percentage,
+            "repro_rate": args.repro_rate, "mortality_rate": args.mortality_rate,
+            "initial_infected": args.initial_infected}
+    jobs = make_jobs(grid, args.replicates, args.seed, args.virus_name, args.log_dir,
+                     EVENTS if args.events else SUMMARY)
+    rows = sweep(jobs, args.results, args.processes)
+
+    failed = sum(1 for row in rows if row["error"])
+    print(f"Finished {len(rows) - failed} of {len(rows)} runs, results in {args.results}\n")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,55 @@
+import os, csv, shutil
+import sweep
+from sweep import make_jobs, sweep as run_sweep
+import pytest
+
+GRID = {"pop_size": [500], "vacc_percentage": [.25, .75], "repro_rate": [.3],
+        "mortality_rate": [.3], "initial_infected": [5]}
+
+#Test that the grid expands into jobs with their own seeds and log files
+def test_make_jobs():
+    jobs = make_jobs(GRID, replicates=2, seed=1, log_dir="test_sweep_logs")
+    assert len(jobs) == 4
+    assert [job["run"] for job in jobs] == [0, 1, 2, 3]
+    assert [job["vacc_percentage"] for job in jobs] == [.25, .25, .75, .75]
+    assert len({job["seed"] for job in jobs}) == 4
+    assert len({job["log_file"] for job in jobs}) == 4
+    assert make_jobs(GRID, replicates=2, seed=1, log_dir="test_sweep_logs") == jobs
+
+def test_sweep():
+    jobs = make_jobs(GRID, replicates=2, seed=1, log_dir="test_sweep_logs")
+    rows = run_sweep(jobs, "test_sweep.csv", processes=2)
+
+    assert [row["run"] for row in rows] == [0, 1, 2, 3]
+    for row in rows:
+        assert row["error"] == ""
+        assert 5 <= row["total_infected"] <= 500
+        assert os.path.exists(row["log_file"])
+
+    with open("test_sweep.csv", newline='') as f:
+        assert len(list(csv.DictReader(f))) == 4
+
+    #the same seeds give the same results
+    assert run_sweep(jobs, "test_sweep.csv", processes=2) == rows
+
+    os.remove("test_sweep.csv")
+    shutil.rmtree("test_sweep_logs")
+
+run_one = sweep.run_one
+
+def crash_on_second_run(job):
+    if job["run"] == 1:
+        os._exit(1)
+    return run_one(job)
+
+#Test that a dead worker does not lose the other runs
+def test_sweep_survives_crash(monkeypatch):
+    monkeypatch.setattr(sweep, "run_one", crash_on_second_run)
+    jobs = make_jobs(GRID, replicates=2, seed=1, log_dir="test_sweep_logs")
+    rows = run_sweep(jobs, "test_sweep.csv", processes=2)
+
+    assert [row["run"] for row in rows] == [0, 1, 2, 3]
+    assert [bool(row["error"]) for row in rows] == [False, True, False, False]
+
+    os.remove("test_sweep.csv")
+    shutil.rmtree("test_sweep_logs")
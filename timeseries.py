@@ -0,0 +1,144 @@
+import csv
+import json
+import os
+import threading
+
+COLUMNS = ("time_step", "susceptible", "infected", "recovered", "dead", "vaccinated", "new_infections",
+           "new_deaths", "vaccine_saved", "total_infected", "total_dead", "total_vaccine_saved", "seconds")
+
+
+def step_row(profile):
+    ''' Turns the StepProfile of one time step into a row of the time series.
+
+    susceptible, infected, recovered, dead and vaccinated count the people in each
+    state when the step ended; recovered people survived an infection and vaccinated
+    people were vaccinated from the start. new_infections, new_deaths and
+    vaccine_saved count what happened during the step.
+
+    Engines whose survivors are not vaccinated put their own recovered and vaccinated
+    counts in the profile; otherwise every survivor is taken to be vaccinated.
+    '''
+    counts = profile.counts
+    recovered = counts.get("recovered", counts["total_infected"] - counts["infected"] - counts["total_dead"])
+    vaccinated = counts.get("vaccinated", counts["vaccinated_alive"] - recovered)
+    return {
+        "time_step": profile.time_step,
+        "susceptible": counts["alive"] - counts["infected"] - recovered - vaccinated,
+        "infected": counts["infected"], "recovered": recovered, "dead": counts["dead"],
+        "vaccinated": vaccinated,
+        "new_infections": counts["newly_infected"], "new_deaths": counts["newly_dead"],
+        "vaccine_saved": counts["vaccine_saved"], "total_infected": counts["total_infected"],
+        "total_dead": counts["total_dead"], "total_vaccine_saved": counts["total_vaccine_saved"],
+        "seconds": profile.total_seconds,
+    }
+
+
+class TimeSeriesWriter(object):
+    ''' Observer that writes one row per time step as the run goes, as CSV or, for
+    file names ending in .jsonl, as JSON lines. Every row is flushed once written, so
+    the file can be watched while the run is going.
+
+    A writer starting at a later step keeps the rows of the earlier steps and
+    replaces the rest, so a run resumed from a checkpoint carries on the same file.
+    '''
+
+    def __init__(self, file_name, start_step=0):
+        self.file_name = file_name
+        self.jsonl = file_name.endswith(".jsonl") # bool, JSON lines instead of CSV
+        kept = self._rows_before(start_step) if start_step else []
+        self._file = open(file_name, 'w', newline='')
+        if not self.jsonl:
+            self._csv = csv.DictWriter(self._file, fieldnames=COLUMNS)
+            self._csv.writeheader()
+        for row in kept:
+            self._write(row)
+        self._file.flush()
+
+    def _rows_before(self, step):
+        if not os.path.exists(self.file_name):
+            return []
+        with open(self.file_name, newline='') as f:
+            rows = [json.loads(line) for line in f] if self.jsonl else list(csv.DictReader(f))
+        return [row for row in rows if int(row["time_step"]) < step]
+
+    def _write(self, row):
+        if self.jsonl:
+            self._file.write(json.dumps(row) + "\n")
+        else:
+            self._csv.writerow(row)
+
+    def __call__(self, profile):
+        self._write(step_row(profile))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _metrics_handler():
+    ''' Returns the HTTP request handler class of MetricsServer. http.server is only
+    imported here, since it takes longer to import than the rest of the simulation.
+    '''
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            body = json.dumps(self.server.metrics.current).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+def _socket_handler():
+    import socketserver
+
+    class SocketHandler(socketserver.StreamRequestHandler):
+
+        def handle(self):
+            self.wfile.write(json.dumps(self.server.metrics.current).encode() + b"\n")
+
+    return SocketHandler
+
+
+class MetricsServer(object):
+    ''' Observer that serves the latest time series row, as JSON, from a background
+    thread while the run goes on.
+
+    Args:
+        address: A (host, port) pair to answer HTTP GET requests on, or the path of
+            a Unix socket that sends the row as one line to every connection. Port 0
+            picks a free port; address holds the one in use.
+    '''
+
+    def __init__(self, address):
+        import socketserver
+        from http.server import ThreadingHTTPServer
+
+        self.current = {} # latest row, replaced whole after every step
+        if isinstance(address, str):
+            self._server = socketserver.ThreadingUnixStreamServer(address, _socket_handler())
+        else:
+            self._server = ThreadingHTTPServer(tuple(address), _metrics_handler())
+        self._server.daemon_threads = True
+        self._server.metrics = self
+        self.address = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+
+    def __call__(self, profile):
+        self.current = step_row(profile)
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        if isinstance(self.address, str):
+            os.remove(self.address)
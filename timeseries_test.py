@@ -0,0 +1,70 @@
+import csv, json, os, socket
+from urllib.request import urlopen
+from virus import Virus
+from simulation import Simulation
+from timeseries import TimeSeriesWriter, MetricsServer, COLUMNS
+import pytest
+
+#Test that every step's row adds up and matches the run's totals
+@pytest.mark.parametrize("file_name", ["test_series.csv", "test_series.jsonl"])
+def test_timeseries(file_name):
+    v = Virus("Series", .3, .3)
+    sim = Simulation(1000, .5, v, initial_infected=5, interaction_mode="batched", file_name="test_series.log",
+                     verbose=False, rng=3, timeseries=file_name)
+    sim.run()
+
+    with open(file_name, newline='') as f:
+        if file_name.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f]
+        else:
+            rows = [{name: float(value) for name, value in row.items()} for row in csv.DictReader(f)]
+    assert len(rows) == sim.time_step_counter
+    assert [row["time_step"] for row in rows] == list(range(sim.time_step_counter))
+    for row in rows:
+        assert row["susceptible"] + row["infected"] + row["recovered"] + row["dead"] + row["vaccinated"] == 1000
+        assert row["vaccinated"] == 500
+    assert sum(row["new_infections"] for row in rows) == sim.total_infected - 5
+    assert sum(row["new_deaths"] for row in rows) == rows[-1]["dead"] == sim.total_dead
+    assert sum(row["vaccine_saved"] for row in rows) == sim.vaccine_saved
+    assert not sim.observers
+
+    #a writer starting at a later step keeps only the earlier rows
+    TimeSeriesWriter(file_name, start_step=2).close()
+    with open(file_name, newline='') as f:
+        assert len(f.readlines()) == (3 if file_name.endswith(".csv") else 2)
+
+    os.remove(file_name)
+    os.remove("test_series.log")
+
+class Step(object):
+    ''' StepProfile stand-in with the counts step_row reads. '''
+
+    time_step = 4
+    total_seconds = 0.5
+    counts = {"alive": 90, "dead": 10, "infected": 5, "vaccinated_alive": 60, "newly_infected": 2,
+              "newly_dead": 1, "total_infected": 30, "total_dead": 10, "vaccine_saved": 3,
+              "total_vaccine_saved": 7}
+
+def test_metrics_server_http():
+    server = MetricsServer(("127.0.0.1", 0))
+    server(Step())
+    host, port = server.address
+    with urlopen(f"http://{host}:{port}/") as response:
+        metrics = json.loads(response.read())
+    server.close()
+
+    assert set(metrics) == set(COLUMNS)
+    assert metrics["time_step"] == 4
+    assert metrics["recovered"] == 15
+    assert metrics["susceptible"] == 25
+
+def test_metrics_server_unix_socket():
+    server = MetricsServer("test_metrics.sock")
+    server(Step())
+    with socket.socket(socket.AF_UNIX) as client:
+        client.connect("test_metrics.sock")
+        metrics = json.loads(client.makefile().readline())
+    server.close()
+
+    assert metrics["dead"] == 10
+    assert not os.path.exists("test_metrics.sock")
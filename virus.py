@@ -1,10 +1,77 @@
 class Virus(object):
-    '''Properties and attributes of the virus used in Simulation.'''
+    '''Properties and attributes of the virus used in Simulation.
 
-    def __init__(self, name, repro_rate, mortality_rate):
+    progression, if given, is a Progression describing how long each stage of an
+    infection lasts; run it with ProgressionSimulation.'''
+
+    def __init__(self, name, repro_rate, mortality_rate, progression=None):
         self.name = name
         self.repro_rate = repro_rate
         self.mortality_rate = mortality_rate
+        self.progression = progression
+
+
+class Progression(object):
+    '''Lengths in time steps of the three stages of an infection: latent (infected but
+    not yet infectious), infectious (interacting and spreading the virus) and recovery
+    (no longer infectious, survival not yet decided).
+
+    Each length is an int, a dict mapping lengths to their relative weights, or a
+    callable that takes the simulation's random generator and returns a length. The
+    defaults, 0, 1 and 0, are the one-step course Simulation uses.'''
+
+    STAGES = ("latent", "infectious", "recovery")
+
+    def __init__(self, latent=0, infectious=1, recovery=0):
+        self.latent = latent
+        self.infectious = infectious
+        self.recovery = recovery
+        for stage in self.STAGES:
+            length = getattr(self, stage)
+            lengths = length.keys() if isinstance(length, dict) else [] if callable(length) else [length]
+            if any(not isinstance(value, int) or isinstance(value, bool) or value < 0 for value in lengths):
+                raise ValueError(f"{stage} lengths must be whole numbers of time steps")
+
+    def draw(self, stage, rng):
+        '''Returns a length for stage ("latent", "infectious" or "recovery"). Raises
+        ValueError if a callable returns anything but a whole number of time steps.'''
+        length = getattr(self, stage)
+        if isinstance(length, dict):
+            return rng.choices(list(length), list(length.values()))[0]
+        if callable(length):
+            drawn = length(rng)
+            if not isinstance(drawn, int) or isinstance(drawn, bool) or drawn < 0:
+                raise ValueError(f"{stage} lengths must be whole numbers of time steps, not {drawn!r}")
+            return drawn
+        return length
+
+
+class Strains(object):
+    '''Co-circulating strains, each a Virus with its own rates, and the cross-immunity
+    between them.
+
+    cross_immunity[i][j] is the chance that someone who recovered from strain i is
+    protected from an infection with strain j. It defaults to full protection from
+    the strain recovered from and none from the others.'''
+
+    def __init__(self, viruses, cross_immunity=None):
+        self.viruses = list(viruses)
+        count = len(self.viruses)
+        if not 0 < count <= 64:
+            raise ValueError("there must be between 1 and 64 strains")
+        if cross_immunity is None:
+            cross_immunity = [[1.0 if i == j else 0.0 for j in range(count)] for i in range(count)]
+        if len(cross_immunity) != count or any(len(row) != count for row in cross_immunity):
+            raise ValueError(f"cross_immunity must be a {count} by {count} matrix")
+        if any(not 0 <= value <= 1 for row in cross_immunity for value in row):
+            raise ValueError("cross_immunity values must be between 0 and 1")
+        self.cross_immunity = [list(row) for row in cross_immunity]
+        self.name = "+".join(virus.name for virus in self.viruses)
+        self.repro_rate = [virus.repro_rate for virus in self.viruses]
+        self.mortality_rate = [virus.mortality_rate for virus in self.viruses]
+
+    def __len__(self):
+        return len(self.viruses)
 
 
 def test_virus_instantiation():
@@ -18,3 +85,23 @@ def test_virus_instantiation():
     assert virus2.name == "pox"
     assert virus2.repro_rate == 0.3
     assert virus2.mortality_rate == 0.7
+
+
+def test_strains_instantiation():
+    '''Check that strains keep each virus's rates and default to same-strain immunity.'''
+    strains = Strains([Virus("Alpha", 0.4, 0.1), Virus("Beta", 0.6, 0.2)])
+    assert len(strains) == 2
+    assert strains.name == "Alpha+Beta"
+    assert strains.repro_rate == [0.4, 0.6]
+    assert strains.mortality_rate == [0.1, 0.2]
+    assert strains.cross_immunity == [[1.0, 0.0], [0.0, 1.0]]
+
+
+def test_progression_draws():
+    '''Check that each kind of stage length draws as described.'''
+    import random
+    progression = Progression(latent=2, infectious={3: 1, 5: 1}, recovery=lambda rng: 4)
+    rng = random.Random(1)
+    assert progression.draw("latent", rng) == 2
+    assert {progression.draw("infectious", rng) for _ in range(50)} == {3, 5}
+    assert progression.draw("recovery", rng) == 4